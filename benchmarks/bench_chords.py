@@ -0,0 +1,40 @@
+"""Times Tune.chords on a corpus of 1400 tunes, the size of the Jazz 1400 playlist, with an empty and a warm table of
+parsed chord symbols.
+
+Run from the repository root:
+
+    python benchmarks/bench_chords.py
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyRealParser import Tune  # noqa: E402
+from pyRealParser.chords import chord_table  # noqa: E402
+import corpus  # noqa: E402
+
+
+def main():
+    tunes = [Tune(song) for song in corpus.songs(1400)]
+
+    def chords():
+        start = time.perf_counter()
+        for tune in tunes:
+            tune.__dict__.pop('chords', None)
+            tune.chords
+        return time.perf_counter() - start
+
+    chord_table.clear()
+    cold = chords()
+    symbols = len(chord_table)
+    warm = min(chords() for _ in range(5))
+    count = sum(len(measure.split(' ')) for tune in tunes for measure in tune.measures_as_strings if measure)
+    print('1400 tunes, {} chords, {} different symbols'.format(count, symbols))
+    print('empty table  {:8.1f}ms'.format(cold * 1e3))
+    print('warm table   {:8.1f}ms'.format(warm * 1e3))
+
+
+if __name__ == '__main__':
+    main()
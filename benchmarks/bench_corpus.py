@@ -0,0 +1,68 @@
+"""Compares the ways of getting a corpus of tunes at startup: parsing an iReal url, unpickling a list of tunes, and
+opening a corpus file written by Tune.dump_corpus.
+
+Run from the repository root:
+
+    python benchmarks/bench_corpus.py
+"""
+import contextlib
+import io
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyRealParser import Tune  # noqa: E402
+import corpus  # noqa: E402
+
+
+def _time(function):
+    times = []
+    for _ in range(5):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(count=2000):
+    url = corpus.ireal_url(corpus.songs(count))
+    with contextlib.redirect_stdout(io.StringIO()):
+        tunes = Tune.parse_ireal_url(url)
+    directory = tempfile.mkdtemp()
+    pickle_path = os.path.join(directory, 'tunes.pickle')
+    corpus_path = os.path.join(directory, 'tunes.irlc')
+    with open(pickle_path, 'wb') as file:
+        pickle.dump(tunes, file)
+    Tune.dump_corpus(tunes, corpus_path)
+
+    def parse():
+        with contextlib.redirect_stdout(io.StringIO()):
+            Tune.parse_ireal_url(url)
+
+    def unpickle():
+        with open(pickle_path, 'rb') as file:
+            pickle.load(file)
+
+    def open_corpus():
+        Tune.load_corpus(corpus_path).close()
+
+    def read_corpus():
+        with Tune.load_corpus(corpus_path) as tunes_on_disk:
+            list(tunes_on_disk)
+
+    print('{} tunes: url {:.0f}kB, pickle {:.0f}kB, corpus file {:.0f}kB'.format(
+        count, len(url) / 1e3, os.path.getsize(pickle_path) / 1e3, os.path.getsize(corpus_path) / 1e3))
+    for name, function in [('parse_ireal_url', parse), ('pickle.load', unpickle), ('load_corpus', open_corpus),
+                           ('load_corpus, read all', read_corpus)]:
+        print('{:24} {:>10.2f}ms'.format(name, _time(function) * 1e3))
+    os.remove(pickle_path)
+    os.remove(corpus_path)
+    os.rmdir(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Times ChartEditor.replace_measures on charts of growing length, compared with parsing the edited chart again, and
+checks that both give the same measures.
+
+Run from the repository root:
+
+    python benchmarks/bench_edit.py
+"""
+import random
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyRealParser import Tune, ChartEditor  # noqa: E402
+import corpus  # noqa: E402
+
+
+def long_song(rng, sections):
+    """Joins the charts of several synthetic songs into one long chart"""
+    chart = ''.join(corpus.chart(rng).rstrip(' ZU') + ' ]' for _ in range(sections)) + 'Z '
+    return 'Long=Composer, Synthetic==Medium Swing=C==1r34LbKcu7{}=='.format(Tune._unscramble_chord_string(chart))
+
+
+def main():
+    rng = random.Random(0)
+    print('sections  measures   replace_measures   parse again')
+    for sections in (4, 16, 64, 256):
+        tune = Tune(long_song(rng, sections))
+        editor = ChartEditor(tune)
+        # edit measures that can be changed without parsing again, all over the chart
+        editable = [index for index, editable in enumerate(editor._editable) if editable]
+        edits = [(index, corpus._measure(rng, 4)) for index in rng.choices(editable, k=50)]
+        edits = [(index, text) for index, text in edits if text.strip() != 'r']
+        start = time.perf_counter()
+        for index, text in edits:
+            editor.replace_measures(index, index + 1, text)
+        edit_time = (time.perf_counter() - start) / len(edits)
+        start = time.perf_counter()
+        song = 'Long=Composer, Synthetic==Medium Swing=C==1r34LbKcu7{}=='.format(
+            Tune._unscramble_chord_string(tune.raw_chord_string))
+        for _ in range(5):
+            fresh = Tune(song)
+        parse_time = (time.perf_counter() - start) / 5
+        assert fresh.measures_as_strings == tune.measures_as_strings
+        print('{:8d}  {:8d}  {:14.1f}us  {:11.1f}us'.format(sections, len(tune.measures_as_strings), edit_time * 1e6,
+                                                           parse_time * 1e6))
+
+
+if __name__ == '__main__':
+    main()
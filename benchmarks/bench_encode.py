@@ -0,0 +1,61 @@
+"""Measures how fast parsed tunes are written back to iReal songs and urls, and checks that every song of the corpus
+comes out as it went in.
+
+Run from the repository root:
+
+    python benchmarks/bench_encode.py
+"""
+import sys
+import os
+import io
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyRealParser import Tune  # noqa: E402
+import corpus  # noqa: E402
+
+
+def _time(function, number=5):
+    best = None
+    for _ in range(number):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def rescrambled(tunes):
+    """Encodes the tunes as if they had all been edited, so their chords have to be scrambled again"""
+    for tune in tunes:
+        tune.__dict__.pop('_chords_scrambled', None)
+    return [tune.to_song() for tune in tunes]
+
+
+def main():
+    songs = corpus.songs(10000)
+    url = corpus.ireal_url(songs)
+    tunes = Tune.parse_ireal_url(url)
+    assert [tune.to_song() for tune in tunes] == songs
+    assert rescrambled(tunes) == songs
+    assert [tune.to_song() for tune in Tune.parse_ireal_url(Tune.to_ireal_url(tunes, 'Synthetic'))] == songs
+    print('{} songs, {:.1f}MB url, round trip ok'.format(len(songs), len(url) / 1e6))
+
+    print('parse_ireal_url                 {:8.1f}ms'.format(_time(lambda: Tune.parse_ireal_url(url), 1) * 1e3))
+    print('to_song                         {:8.1f}ms'.format(
+        _time(lambda: [tune.to_song() for tune in tunes]) * 1e3))
+    print('to_song, chords scrambled again {:8.1f}ms'.format(_time(lambda: rescrambled(tunes)) * 1e3))
+    print('to_ireal_url                    {:8.1f}ms'.format(
+        _time(lambda: Tune.to_ireal_url(tunes, 'Synthetic')) * 1e3))
+    print('write_ireal                     {:8.1f}ms'.format(
+        _time(lambda: Tune.write_ireal(io.BytesIO(), tunes, 'Synthetic')) * 1e3))
+    # normalizing a playlist only keeps one tune at a time in memory
+    data = url.encode()
+    print('iter_ireal -> write_ireal       {:8.1f}ms'.format(
+        _time(lambda: Tune.write_ireal(io.BytesIO(), Tune.iter_ireal(io.BytesIO(data), lazy=True), 'Synthetic'),
+              1) * 1e3))
+
+
+if __name__ == '__main__':
+    main()
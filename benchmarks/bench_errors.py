@@ -0,0 +1,61 @@
+"""Checks that strict mode and reporting do not slow down parsing a playlist of songs that work, and measures what a
+failed song costs, now that the stage that failed is looked up.
+
+Run from the repository root:
+
+    python benchmarks/bench_errors.py
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyRealParser import Tune, ParseReport  # noqa: E402
+import corpus  # noqa: E402
+
+
+def plain(url):
+    """What parse_ireal_url did before, without the prints"""
+    tunes = []
+    for song in Tune._split_ireal_url(url):
+        try:
+            tunes.append(Tune(song))
+        except Exception:
+            pass
+    return tunes
+
+
+def _time(function, number=5):
+    best = None
+    for _ in range(number):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    songs = corpus.songs(2000)
+    url = corpus.ireal_url(songs)
+    print('2000 songs')
+    print('try/except only              {:8.1f}ms'.format(_time(lambda: plain(url)) * 1e3))
+    print('parse_ireal_url              {:8.1f}ms'.format(_time(lambda: Tune.parse_ireal_url(url)) * 1e3))
+    print('parse_ireal_url, strict      {:8.1f}ms'.format(
+        _time(lambda: Tune.parse_ireal_url(url, strict=True)) * 1e3))
+    print('parse_ireal_url with report  {:8.1f}ms'.format(
+        _time(lambda: Tune.parse_ireal_url(url, report=ParseReport())) * 1e3))
+    # every tenth song loses the marker in front of its chords
+    broken = corpus.ireal_url([song.replace('1r34LbKcu7', '') if number % 10 == 0 else song
+                               for number, song in enumerate(songs)])
+    import logging
+    logging.getLogger('pyRealParser').disabled = True
+    report = ParseReport(slowest=3)
+    print('10% broken, with report      {:8.1f}ms'.format(
+        _time(lambda: Tune.parse_ireal_url(broken, report=report), number=1) * 1e3))
+    print(report)
+
+
+if __name__ == '__main__':
+    main()
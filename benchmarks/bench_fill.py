@@ -0,0 +1,112 @@
+"""Compares the single-pass filling of slashes and one- and two-measure repeats with the previous implementations,
+on long charts with dense slashes and repeats.
+
+Run from the repository root:
+
+    python benchmarks/bench_fill.py
+"""
+import random
+import re
+import sys
+import os
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyRealParser import Tune  # noqa: E402
+
+
+def fill_single_double_repeats_slicing(measures):
+    """The previous implementation: the whole list is rebuilt for every two-measure repeat"""
+    for i in range(1, len(measures)):
+        if measures[i] == 'x':
+            measures[i] = Tune._remove_markers(measures[i - 1])
+    i = 2
+    while i < len(measures):
+        if measures[i] == 'r':
+            first = Tune._remove_markers(measures[i-2])
+            second = Tune._remove_markers(measures[i-1])
+            measures = measures[:i] + [first, second] + measures[i+1:]
+            i += 1
+        i += 1
+    return measures
+
+
+def fill_slashes_rescanning(measures):
+    """The previous implementation: the measure is searched again, and rebuilt, for every slash"""
+    for i in range(1, len(measures)):
+        while measures[i].find('p') != -1:
+            slash = measures[i].find('p')
+            if slash == 0:
+                prev_chord = Tune.chord_regex.findall(measures[i - 1])[-1]
+                measures[i] = prev_chord + measures[i][1:]
+                measures[i] = re.sub(r'^(p+)', prev_chord, measures[i])
+            else:
+                prev_chord = Tune.chord_regex.findall(measures[i][:slash])[-1]
+                measures[i] = measures[i][:slash] + prev_chord + measures[i][slash + 1:]
+    return measures
+
+
+def _result(function, measures):
+    try:
+        return function(list(measures))
+    except Exception as error:
+        return type(error)
+
+
+def check(rng, count):
+    """Compares both implementations on random measures, including ones that make no sense"""
+    pieces = ['C', 'Db7', 'F#-7', 'Bb^7', 'E7/G#', 'A/C#', 'n', 'N1', 'S', 'Q', 'U', 'p', 'pp', 'x', 'r', '/', 'b',
+              '7', 'sus', 'alt']
+    for _ in range(count):
+        measures = [''.join(rng.choice(pieces) for _ in range(rng.randint(0, 4))) for _ in range(rng.randint(0, 12))]
+        measures = [measure if rng.random() < 0.7 else rng.choice(['x', 'r']) for measure in measures]
+        assert _result(fill_slashes_rescanning, measures) == _result(Tune._fill_slashes, measures), measures
+        assert _result(fill_single_double_repeats_slicing, measures) == \
+            _result(Tune._fill_single_double_repeats, measures), measures
+
+
+def fill_slashes_cold(measures):
+    """Measures with slashes are cached, this clears the cache first"""
+    Tune._fill_slashes_in_measure.cache_clear()
+    return Tune._fill_slashes(measures)
+
+
+def long_chart(rng, bars, repeats):
+    """Makes the measures of a long chart, with one- and two-measure repeats or with slashes in most measures"""
+    chords = ['C^7', 'A-7', 'D-7', 'G7', 'E-7/B', 'Bb7#11', 'Ab^7', 'Db7b9', 'n']
+    measures = []
+    for index in range(bars):
+        r = rng.random()
+        if repeats and index > 1 and r < 0.3:
+            measures.append(rng.choice(['x', 'r']))
+        elif r < 0.15:
+            measures.append(rng.choice(chords))
+        elif r < 0.3:
+            measures.append('p' + rng.choice(chords) + 'pp')
+        else:
+            measures.append(rng.choice(chords) + rng.choice(['p', 'ppp', 'p' + rng.choice(chords) + 'p']))
+    return measures
+
+
+def main():
+    rng = random.Random(0)
+    check(rng, 20000)
+    functions = [('_fill_slashes', False, fill_slashes_rescanning, Tune._fill_slashes),
+                 ('_fill_slashes (cold)', False, fill_slashes_rescanning, fill_slashes_cold),
+                 ('_fill_single_double_repeats', True, fill_single_double_repeats_slicing,
+                  Tune._fill_single_double_repeats)]
+    print('{:>6} {:28} {:>12} {:>12} {:>8}'.format('bars', '', 'before', 'after', 'speed-up'))
+    for bars in (32, 256, 1024, 4096):
+        for name, repeats, before, after in functions:
+            measures = long_chart(rng, bars, repeats)
+            assert before(list(measures)) == after(list(measures))
+            number = max(1, 20000 // bars)
+            before_time = min(timeit.repeat(lambda: before(list(measures)), number=number, repeat=5)) / number
+            after_time = min(timeit.repeat(lambda: after(list(measures)), number=number, repeat=5)) / number
+            print('{:>6} {:28} {:>10.1f}us {:>10.1f}us {:>7.2f}x'.format(bars, name, before_time * 1e6,
+                                                                      after_time * 1e6, before_time / after_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""Compares parsing the form of a chart and unrolling it into the measures as they are played with the previous
+implementation of ``Form``, which looked at every measure with regular expressions and unrolled the chart measure by
+measure, on a synthetic corpus and on long charts.
+
+Run from the repository root:
+
+    python benchmarks/bench_form.py
+"""
+import random
+import re
+import sys
+import os
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyRealParser import Tune  # noqa: E402
+from pyRealParser.form import Form, Repeat  # noqa: E402
+import corpus  # noqa: E402
+
+
+class PreviousForm(Form):
+    """The previous implementation: every piece of the chart is cleaned up and searched for markers, and the texts of
+    every measure, for the first time and again, are made before the measures are unrolled"""
+
+    _split_regex = re.compile(r'([{}|]|\*\w)')
+    _jump_marker_regex = re.compile(r'[SQ]|N\d')
+
+    @classmethod
+    def parse(cls, chord_string):
+        form = cls()
+        form._sections = []
+        pending = []
+        repeat_start = None
+        section = None
+        content = ''
+        previous_separator = None
+        pieces = cls._split_regex.split(chord_string)
+        for text, separator in zip(pieces[::2], pieces[1::2] + [None]):
+            content += text
+            if separator is not None and separator[0] == '*':
+                section = separator[1]
+                continue
+            content = content.replace('+*', '+').replace(' ', '')
+            if content:
+                markers = [(match.group(), bool(cls._jump_marker_regex.sub('', content[:match.start()])))
+                           for match in cls._jump_marker_regex.finditer(content)]
+                measure = cls._jump_marker_regex.sub('', content) if markers else content
+                if measure == 'U':
+                    measure = ''
+                if measure:
+                    index = len(form._written)
+                    form._written.append(content)
+                    form.measures.append(measure.replace('U', ''))
+                    if section is not None:
+                        form._sections.append((index, section))
+                        section = None
+                    for marker, after in pending + markers:
+                        form._add_marker(marker, index, after)
+                    pending = []
+                else:
+                    for marker, after in markers:
+                        if marker[0] != 'N' and previous_separator == '|' and form._written:
+                            form._add_marker(marker, len(form._written) - 1, True)
+                        else:
+                            pending.append((marker, False))
+            content = ''
+            if separator == '{' and repeat_start is None:
+                repeat_start = len(form._written)
+            elif separator == '}' and repeat_start is not None:
+                form.repeats.append(Repeat(repeat_start, len(form._written), {}))
+                repeat_start = None
+            previous_separator = separator
+        for marker, after in pending:
+            if form._written:
+                form._add_marker(marker, len(form._written) - 1, True)
+        form._assign_endings()
+        return form
+
+    def _walk(self):
+        played = []
+        repeats = {repeat.start: repeat for repeat in self.repeats if repeat.end > repeat.start}
+        before_ending = {}
+        for repeat in repeats.values():
+            if repeat.endings:
+                body = range(repeat.start, repeat.endings[1])
+                for index in repeat.endings.values():
+                    if index >= repeat.end:
+                        before_ending[index] = body
+        starts = {}
+        ends = {}
+        index = 0
+        while index < len(self._written):
+            repeat = repeats.get(index)
+            if repeat is not None:
+                for measure in range(repeat.start, repeat.end):
+                    starts[measure] = len(played)
+                    played.append((measure, True))
+                    ends[measure] = len(played)
+                if not repeat.endings:
+                    played.extend((measure, False) for measure in range(repeat.start, repeat.end))
+                index = repeat.end
+                continue
+            starts[index] = len(played)
+            played.extend((measure, False) for measure in before_ending.get(index, ()))
+            played.append((index, True))
+            ends[index] = len(played)
+            index += 1
+        codas = sorted((ends if after else starts)[measure] for measure, after in self.codas)
+        segno = None
+        if self.segno is not None:
+            segno = (ends if self.segno[1] else starts)[self.segno[0]]
+        if len(codas) >= 2:
+            played = played[:codas[-1]] + played[segno or 0:codas[0]] + played[codas[-1]:]
+        return played, len(codas)
+
+    def _flatten(self):
+        played, coda_count = self._walk()
+        first_time = []
+        for measure in self._written:
+            # the markers of endings outside of repeats used to be kept; they are taken out here as well, so that the
+            # results can be compared
+            measure = self._endings_regex.sub('', measure)
+            if coda_count:
+                measure = measure.replace('Q', '')
+                if coda_count > 1:
+                    measure = measure.replace('S', '')
+            first_time.append(measure)
+        again = [self._all_markers_regex.sub('', measure) for measure in self._written]
+        measures = [first_time[index] if first else again[index] for index, first in played]
+        return [measure for measure in measures if measure]
+
+
+def long_chart(rng, sections):
+    """Joins the charts of several synthetic songs into one long chart"""
+    return ''.join(corpus.chart(rng).rstrip(' ZU') + ' ]' for _ in range(sections)) + 'Z '
+
+
+def main():
+    rng = random.Random(0)
+    cases = [('corpus', [corpus.chart(rng) for _ in range(1000)])] + \
+        [('{} x'.format(sections), [long_chart(rng, sections)]) for sections in (4, 16, 64, 256)]
+    print('{:>9} {:>9} {:>12} {:>12} {:>8}'.format('charts', 'measures', 'before', 'after', 'speed-up'))
+    for name, charts in cases:
+        # what Form.parse gets from Tune._get_form_from_tokens
+        chord_strings = [''.join(map(Tune._measure_table.__getitem__, Tune._tokenize(chart))) for chart in charts]
+        for chord_string in chord_strings:
+            assert PreviousForm.parse(chord_string)._flatten() == Form.parse(chord_string)._flatten(), chord_string
+            assert PreviousForm.parse(chord_string).sections == Form.parse(chord_string).sections, chord_string
+        measures = sum(len(Form.parse(chord_string)._flatten()) for chord_string in chord_strings) // len(charts)
+        number = max(1, 20000 // (len(charts) * measures))
+        before_time, after_time = (
+            min(timeit.repeat(lambda: [form.parse(chord_string)._flatten() for chord_string in chord_strings],
+                              number=number, repeat=5)) / number / len(charts)
+            for form in (PreviousForm, Form))
+        print('{:>9} {:>9} {:>10.1f}us {:>10.1f}us {:>7.2f}x'.format(name, measures, before_time * 1e6,
+                                                                   after_time * 1e6, before_time / after_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Times a cold start in fresh interpreters: ``import pyRealParser``, and from there to the first parsed tune, both
+of a single song and of an irealb:// url. The target for the time from the start of the import to the first parsed
+tune is 50ms.
+
+Run from the repository root:
+
+    python benchmarks/bench_import.py
+"""
+import json
+import statistics
+import subprocess
+import sys
+import os
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+TARGET = 0.05
+
+sys.path.insert(0, ROOT)
+
+import corpus  # noqa: E402
+
+_script = """
+import sys
+import time
+start = time.perf_counter()
+import pyRealParser
+imported = time.perf_counter()
+{parse}
+parsed = time.perf_counter()
+print(json.dumps([imported - start, parsed - start, sorted(name for name in ('asyncio', 'concurrent.futures',
+      'sqlite3', 'pickle', 'mmap', 'numpy') if name in sys.modules)]))
+"""
+
+
+def _run(parse, song, runs):
+    results = []
+    for _ in range(runs):
+        # the song is passed in the environment, so it is not part of the timed code
+        output = subprocess.run([sys.executable, '-c', 'import json, os\n' + _script.format(parse=parse)],
+                                cwd=ROOT, env=dict(os.environ, SONG=song), check=True, capture_output=True,
+                                text=True).stdout
+        # parse_ireal_url prints the name of the playlist
+        results.append(json.loads(output.splitlines()[-1]))
+    return results
+
+
+def main(runs=20):
+    songs = corpus.songs(10)
+    cases = [('Tune(song)', "pyRealParser.Tune(os.environ['SONG'])", songs[0]),
+             ('Tune.parse_ireal_url(url)', "pyRealParser.Tune.parse_ireal_url(os.environ['SONG'])",
+              corpus.ireal_url(songs))]
+    print('{:28} {:>10} {:>16}  {}'.format('', 'import', 'first tune', 'heavy modules loaded'))
+    for name, parse, song in cases:
+        results = _run(parse, song, runs)
+        imported = statistics.median(result[0] for result in results)
+        parsed = statistics.median(result[1] for result in results)
+        print('{:28} {:>8.1f}ms {:>8.1f}ms {:4}  {}'.format(name, imported * 1e3, parsed * 1e3,
+                                                          'ok' if parsed < TARGET else 'SLOW',
+                                                          ', '.join(results[0][2]) or '-'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Times building a TuneIndex over 20000 synthetic tunes, and queries on it compared with a linear scan of the tunes.
+
+Run from the repository root:
+
+    python benchmarks/bench_index.py
+"""
+import sys
+import os
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyRealParser import Tune, TuneIndex  # noqa: E402
+import corpus  # noqa: E402
+
+
+def scan(tunes, style=None, chords=None, measure=None):
+    """What the index replaces: look at every tune"""
+    result = []
+    for tune_id, tune in enumerate(tunes):
+        if style is not None and tune.style != style:
+            continue
+        if measure is not None and measure not in tune.measures_as_strings:
+            continue
+        if chords is not None:
+            sequence = ' {} '.format(' '.join(symbol for measure in tune.measures_as_strings if measure
+                                              for symbol in measure.split(' ')))
+            if ' {} '.format(chords) not in sequence:
+                continue
+        result.append(tune_id)
+    return result
+
+
+def _time(function, number=20):
+    start = time.perf_counter()
+    for _ in range(number):
+        result = function()
+    return (time.perf_counter() - start) / number, result
+
+
+def main(count=20000):
+    tunes = Tune.parse_many(corpus.songs(count))
+    start = time.perf_counter()
+    index = TuneIndex(tunes)
+    print('{} tunes, index built in {:.2f}s'.format(count, time.perf_counter() - start))
+    # the chords are random, so take longer sequences from one of the tunes
+    chords = TuneIndex._chord_sequence(tunes[0])
+    queries = [{'style': 'Bossa Nova'}, {'chords': 'Eb-7'}, {'chords': ' '.join(chords[:2])},
+               {'style': tunes[0].style, 'chords': ' '.join(chords[2:5])}, {'measure': tunes[0].measures_as_strings[1]},
+               {'chords': ' '.join(chords[:6])}]
+    print('{:56} {:>7} {:>10} {:>10}'.format('query', 'tunes', 'index', 'scan'))
+    for query in queries:
+        index_time, found = _time(lambda: index.search(**query))
+        scan_time, scanned = _time(lambda: scan(tunes, **query), number=1)
+        assert found == scanned, query
+        print('{:56} {:>7} {:>8.2f}ms {:>8.1f}ms'.format(repr(query), len(found), index_time * 1e3, scan_time * 1e3))
+    path = os.path.join(tempfile.mkdtemp(), 'index.pickle')
+    start = time.perf_counter()
+    index.save(path)
+    saved = time.perf_counter() - start
+    start = time.perf_counter()
+    TuneIndex.load(path)
+    print('save {:.2f}s, load {:.2f}s, {:.1f}MB'.format(saved, time.perf_counter() - start,
+                                                       os.path.getsize(path) / 1e6))
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
+
+
+if __name__ == '__main__':
+    main()
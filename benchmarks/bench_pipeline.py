@@ -0,0 +1,134 @@
+"""Times every stage of the parser on a synthetic corpus (see corpus.py), as well as the throughput and the peak
+memory of parsing the whole corpus. The results can be saved as a baseline, and later runs compared against it:
+
+    python benchmarks/bench_pipeline.py --save baseline.json
+    (make changes)
+    python benchmarks/bench_pipeline.py --compare baseline.json
+
+With --compare, the exit status is 1 if any stage got slower by more than the tolerance (10% by default).
+Baselines are only comparable on the same machine and Python version.
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import os
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyRealParser import Tune  # noqa: E402
+import corpus  # noqa: E402
+
+
+def _inputs(songs):
+    """The input of every stage, as the pipeline passes it on"""
+    tunes = [Tune(song, lazy=True) for song in songs]
+    inputs = {'scrambled': [tune._chords_scrambled for tune in tunes],
+              'raw': [tune.raw_chord_string for tune in tunes]}
+    inputs['tokens'] = [Tune._tokenize(raw) for raw in inputs['raw']]
+    inputs['cleaned'] = [Tune._cleanup_chord_string(raw) for raw in inputs['raw']]
+    inputs['annotations removed'] = [Tune._remove_annotations(cleaned) for cleaned in inputs['cleaned']]
+    inputs['measures'] = [Tune._get_form_from_tokens(tokens)._flatten() for tokens in inputs['tokens']]
+    return inputs
+
+
+def _stages(songs, url):
+    inputs = _inputs(songs)
+    return [
+        ('_unscramble_chord_string', lambda: [Tune._unscramble_chord_string(s) for s in inputs['scrambled']]),
+        ('_tokenize', lambda: [Tune._tokenize(s) for s in inputs['raw']]),
+        ('_cleanup_chord_string', lambda: [Tune._cleanup_chord_string(s) for s in inputs['raw']]),
+        ('_remove_annotations', lambda: [Tune._remove_annotations(s) for s in inputs['cleaned']]),
+        ('form', lambda: [Tune._get_form_from_tokens(tokens)._flatten() for tokens in inputs['tokens']]),
+        ('_fill_single_double_repeats', lambda: [Tune._fill_single_double_repeats(m) for m in inputs['measures']]),
+        ('_fill_slashes', lambda: [Tune._fill_slashes(m) for m in inputs['measures']]),
+        ('Tune', lambda: [Tune(song) for song in songs]),
+        ('parse_ireal_url', lambda: Tune.parse_ireal_url(url)),
+    ]
+
+
+def run(count, seed, repeat):
+    """Runs the benchmarks
+
+    :param count: The number of songs in the corpus
+    :param seed: The random seed of the corpus
+    :param repeat: How often to time every stage (the fastest run counts)
+    :return: A dict of the results
+    """
+    songs = corpus.songs(count, seed)
+    url = corpus.ireal_url(songs)
+    results = {'python': platform.python_version(), 'songs': count, 'seed': seed, 'stages': {}}
+    # parse_ireal_url prints every title
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, stage in _stages(songs, url):
+            seconds = min(timeit.repeat(stage, number=1, repeat=repeat))
+            results['stages'][name] = seconds / count * 1e6
+        results['tunes_per_second'] = 1e6 / results['stages']['parse_ireal_url']
+        tracemalloc.start()
+        tunes = Tune.parse_ireal_url(url)
+        results['peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    assert len(tunes) == count
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Prints the results next to the baseline
+
+    :return: The names of the stages that got slower by more than the tolerance
+    """
+    regressions = []
+    print('{:30} {:>12} {:>12} {:>8}'.format('per tune', 'baseline', 'now', 'change'))
+    for name, now in results['stages'].items():
+        before = baseline['stages'].get(name)
+        if before is None:
+            print('{:30} {:>12} {:>10.2f}us'.format(name, '-', now))
+            continue
+        change = now / before - 1
+        flag = ''
+        if change > tolerance:
+            regressions.append(name)
+            flag = '  slower'
+        print('{:30} {:>10.2f}us {:>10.2f}us {:>+7.1%}{}'.format(name, before, now, change, flag))
+    print('{:30} {:>12.0f} {:>12.0f}'.format('tunes/s', baseline['tunes_per_second'], results['tunes_per_second']))
+    print('{:30} {:>10.1f}MB {:>10.1f}MB'.format('peak memory', baseline['peak_memory_mb'], results['peak_memory_mb']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--songs', type=int, default=1000, help='number of songs in the corpus')
+    parser.add_argument('--seed', type=int, default=0, help='random seed of the corpus')
+    parser.add_argument('--repeat', type=int, default=5, help='number of timing runs per stage')
+    parser.add_argument('--save', metavar='PATH', help='save the results as a baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare the results with a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='allowed slow-down before failing')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        results = run(baseline['songs'], baseline['seed'], args.repeat)
+        regressions = compare(results, baseline, args.tolerance)
+    else:
+        results = run(args.songs, args.seed, args.repeat)
+        regressions = []
+        print('{:30} {:>12}'.format('per tune', 'time'))
+        for name, microseconds in results['stages'].items():
+            print('{:30} {:>10.2f}us'.format(name, microseconds))
+        print('{:30} {:>12.0f}'.format('tunes/s', results['tunes_per_second']))
+        print('{:30} {:>10.1f}MB'.format('peak memory', results['peak_memory_mb']))
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(results, file, indent=2)
+    if regressions:
+        print('slower than the baseline:', ', '.join(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
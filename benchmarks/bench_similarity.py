@@ -0,0 +1,44 @@
+"""Times a SimilarityIndex over 10000 synthetic tunes: building the vectors, the latency of a single query, a batch
+of queries, and the 10 nearest neighbours of every tune. Transposed copies of some tunes are searched for as well,
+and have to come out on top.
+
+Run from the repository root:
+
+    python benchmarks/bench_similarity.py
+"""
+import sys
+import os
+import time
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyRealParser import Tune, SimilarityIndex  # noqa: E402
+import corpus  # noqa: E402
+
+
+def main(count=10000):
+    tunes = Tune.parse_many(corpus.songs(count))
+    start = time.perf_counter()
+    index = SimilarityIndex(tunes)
+    print('{} tunes, {} dimensions, vectors made in {:.2f}s'.format(count, index.dim, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    for position in range(100):
+        index.most_similar(position)
+    print('single query           {:8.2f}ms'.format((time.perf_counter() - start) / 100 * 1e3))
+    start = time.perf_counter()
+    index.nearest(index.vectors[:100])
+    print('batch of 100 queries   {:8.2f}ms'.format((time.perf_counter() - start) * 1e3))
+    start = time.perf_counter()
+    index.nearest(index.vectors)
+    print('all {} tunes        {:8.2f}s'.format(count, time.perf_counter() - start))
+
+    # only compact_chords is used to make the vectors
+    copies = [types.SimpleNamespace(compact_chords=compact) for compact in Tune.transpose_many(tunes[:100], 5)]
+    positions, _ = index.nearest(index.vectorize(copies), k=1)
+    print('transposed copies found: {}/100'.format(sum(positions[:, 0] == range(100))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Times making the timelines of 10000 synthetic tunes in one call, compared with working them out tune by tune
+from measures_as_strings, and writing all tunes to a MIDI file with the peak memory it needs.
+
+Run from the repository root:
+
+    python benchmarks/bench_timeline.py
+"""
+import sys
+import os
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyRealParser import Tune  # noqa: E402
+from pyRealParser.timeline import timelines, write_midi  # noqa: E402
+import corpus  # noqa: E402
+
+
+def by_hand(tunes, bpm=120):
+    """What the timelines replace: a list of (onset, duration, symbol, measure) for every tune"""
+    result = []
+    for tune in tunes:
+        beats = tune.time_signature[0]
+        events = []
+        for index, measure in enumerate(tune.measures_as_strings):
+            symbols = measure.split(' ') if measure else []
+            for position, symbol in enumerate(symbols):
+                onset = index * beats + position * beats // len(symbols)
+                if events:
+                    events[-1][1] = onset - events[-1][0]
+                events.append([onset, 0, symbol, index])
+        if events:
+            events[-1][1] = len(tune.measures_as_strings) * beats - events[-1][0]
+        result.append([(onset * 60 / bpm, duration * 60 / bpm, symbol, measure)
+                       for onset, duration, symbol, measure in events])
+    return result
+
+
+def _time(function, number=3):
+    best = None
+    for _ in range(number):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    tunes = [Tune(song) for song in corpus.songs(10000)]
+    for tune in tunes:
+        tune.compact_chords
+    elapsed, events = _time(lambda: timelines(tunes, sections=False))
+    print('10000 tunes, {} chords'.format(len(events)))
+    print('timelines                  {:8.1f}ms'.format(elapsed * 1e3))
+    print('by hand, tune by tune      {:8.1f}ms'.format(_time(lambda: by_hand(tunes))[0] * 1e3))
+    print('timelines with sections    {:8.1f}ms (first run parses the forms)'.format(
+        _time(lambda: timelines(tunes), number=1)[0] * 1e3))
+    print('timelines with sections    {:8.1f}ms'.format(_time(lambda: timelines(tunes))[0] * 1e3))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'corpus.mid')
+        elapsed = _time(lambda: write_midi(path, tunes), number=1)[0]
+        print('write_midi                 {:8.1f}ms, {:.1f}MB file'.format(elapsed * 1e3, os.path.getsize(path) / 1e6))
+        # the memory does not grow with the number of tunes, only with block_size
+        for block_size in (100, 1000):
+            tracemalloc.start()
+            write_midi(path, tunes, block_size=block_size)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print('  peak memory, block_size={:<5d}{:6.0f}kB'.format(block_size, peak / 1e3))
+
+if __name__ == '__main__':
+    main()
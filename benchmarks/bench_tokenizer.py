@@ -0,0 +1,184 @@
+"""Compares the single-pass tokenizer with the chained re.sub passes it replaced, per tune and per stage.
+
+Run from the repository root:
+
+    python benchmarks/bench_tokenizer.py
+"""
+import re
+import sys
+import os
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyRealParser import Tune  # noqa: E402
+
+
+class ReSubTune(Tune):
+    """The previous implementation: about ten uncompiled re.sub passes per stage, and every measure
+    handled on its own."""
+
+    _long_repeat_regex = re.compile(r'{(.+?)}')
+    _ending_regex = re.compile(r'N\d')
+    _bar_after_repeat_regex = re.compile(r'\}\s*\|')
+    _before_ending_regex = re.compile(r'([^N]+)N\d')
+    _ending_after_bar_regex = re.compile(r'[|}]\s*N\d')
+    _bar_ending_regex = re.compile(r'\|\s*N\d')
+    _jump_regex = re.compile(r'[QS]')
+
+    @classmethod
+    def _cleanup_chord_string(cls, chord_string):
+        chord_string = re.sub(r'LZ|K', '|', chord_string)
+        chord_string = re.sub(r'cl', 'x', chord_string)
+        chord_string = re.sub(r'\*\s*\*', '', chord_string)
+        chord_string = re.sub(r'Y+', '', chord_string)
+        chord_string = re.sub(r'XyQ|,', ' ', chord_string)
+        chord_string = re.sub(r'\|\s*\|', '|', chord_string)
+        chord_string = re.sub(r'Z', '', chord_string)
+        chord_string = re.sub(r'\|\s+', '|', chord_string)
+        chord_string = re.sub(r'\s+', ' ', chord_string)
+        return chord_string.rstrip()
+
+    @classmethod
+    def _remove_annotations(cls, chord_string):
+        chord_string = re.sub(r'[\[\]]', '|', chord_string)
+        chord_string = re.sub(r'\|\s*\|', '|', chord_string)
+        chord_string = re.sub(r'<.*?>', '', chord_string)
+        chord_string = re.sub(r'\([^)]*\)', '', chord_string)
+        chord_string = re.sub(r'f', '', chord_string)
+        chord_string = re.sub(r'(?<!a)l(?!t)', '', chord_string)
+        chord_string = re.sub(r'(?<!su)s(?!us)', '', chord_string)
+        chord_string = re.sub(r'\*\w', '', chord_string)
+        chord_string = re.sub(r'T\d+', '', chord_string)
+        return re.sub(r'\+\*', '+', chord_string)
+
+    @classmethod
+    def _get_measures(cls, chord_string):
+        chord_string = cls._cleanup_chord_string(chord_string)
+        chord_string = cls._remove_annotations(chord_string)
+        chord_string = cls._fill_long_repeats(chord_string)
+        chord_string = cls._fill_codas(chord_string)
+        measures = re.split(r'\||LZ|K|Z|{|}|\[|\]', chord_string)
+        measures = [measure.replace(' ', '') for measure in measures if measure.strip() != '']
+        measures = cls._fill_single_double_repeats(measures)
+        measures = cls._fill_slashes(measures)
+        measures = [' '.join(cls.chord_regex.findall(measure)) for measure in measures]
+        return [measure.replace('nn', 'N.C.').replace('n', 'N.C.') for measure in measures]
+
+    @classmethod
+    def _fill_long_repeats(cls, chord_string):
+        """Replaces long repeats with multiple endings with the appropriate chords.
+        :param chord_string: A chord string
+        :return: A chord string with filled repeats
+        """
+        repeat_match = cls._long_repeat_regex.search(chord_string)
+        if repeat_match is None:
+            return chord_string
+        # is there a first ending in the repeat?
+        number_match = cls._ending_regex.search(repeat_match.group(1))
+        if number_match is not None:
+            first_repeat = repeat_match.group(1)
+            # first, get rid of the first repeat number and the curly braces
+            first_repeat = cls._ending_regex.sub('', first_repeat)
+            # add bar line after curly brace if required:
+            if cls._bar_after_repeat_regex.match(chord_string, repeat_match.end() - 1):
+                bar_line = ''
+            else:
+                bar_line = '|'
+            new_chord_string = chord_string[:repeat_match.start()] + '|' + first_repeat + bar_line + \
+                               chord_string[repeat_match.end():]
+
+            # remove the first repeat ending as well as segnos and codas from the saved repeat
+            repeat = cls._remove_markers(cls._before_ending_regex.search(repeat_match.group(1)).group(1))
+            # find the next repeat ending markers and insert the repeated chords before them
+            while True:
+                if cls._ending_after_bar_regex.search(new_chord_string) is None:
+                    break
+                new_chord_string = cls._bar_ending_regex.sub('|' + repeat, new_chord_string)
+            return new_chord_string
+        else:
+            # it's only a simple repeat: easy!
+            new_chord_string = chord_string[:repeat_match.start()] + '|' + repeat_match.group(1) + \
+                               ' |' + cls._remove_markers(repeat_match.group(1)) + chord_string[
+                                                                                   repeat_match.end():] + '|'
+            # there could be another repeat somewhere, so:
+            new_chord_string = cls._fill_long_repeats(new_chord_string)
+            return new_chord_string
+
+    @classmethod
+    def _fill_codas(cls, chord_string):
+        """Flatten D.C. al Coda and D.S. al Coda.
+        :param chord_string: A chord string
+        :return: A chord string with filled D.C. or D.S.
+        """
+
+        qs = chord_string.count('Q')
+        if qs > 2:
+            raise RuntimeError('Could not parse codas: number of Qs expected to be 0, 1 or 2, not {}!'.format(qs))
+
+        # coda is used to indicate an outro: just get rid of it!
+        if qs == 1:
+            chord_string = chord_string.replace('Q', '')
+
+        # this implies a repeat from the head or a segno to the first 'Q' and then a jump to the second 'Q'
+        if qs == 2:
+            q1, q2 = [pos for pos, char in enumerate(chord_string) if char == 'Q']
+            segno = chord_string.find('S')
+            if segno == -1:
+                segno = 0
+            coda = chord_string[q2 + 1:]
+            repeat = chord_string[segno + 1:q1]
+            new_chord_string = chord_string[:q2] + repeat + ' |' + coda
+            new_chord_string = cls._jump_regex.sub('', new_chord_string)
+            return new_chord_string
+        return chord_string
+
+    def __init__(self, tune_string):
+        parts = re.split(r"=+", tune_string)
+        self.raw_chord_string = self._unscramble_chord_string(parts[4].split(self._chords_prefix)[1])
+        self.chord_string = self._cleanup_chord_string(self.raw_chord_string)
+        self.time_signature = self._get_time_signature(self.chord_string)
+        self.measures_as_strings = self._get_measures(self.chord_string)
+
+
+# unscrambled charts; scrambling is the same operation as unscrambling
+CHARTS = [
+    ('Dear Old Stockholm', '*A{T44D- |Eh7 A7b9|G-7 C7|F^7 |Eh7 A7b9|D- |Eh7 |A7b9 |N1D-7 |D-6 }XyQXyQ Y|N2D-7 '
+                           '|D-6 ]*B[F^7 |G-7 C7|F^7 |Eh7 A7b9 ]*C[D- |Eh7 A7b9|G-7 C7|F^7 |Eh7 A7b9|D- |C7sus '
+                           '|x |C7sus |x |x |x |C7sus A7b9|D- |x Z'),
+    ('Blues', '[T44F7XyQ|Bb7XyQ|F7XyQ|C-7 F7|Bb7XyQ|Bo7XyQ|F7XyQ|A-7 D7|G-7XyQ|C7XyQ|F7 D7|G-7 C7 Z'),
+    ('Coda', '*A[T44C^7XyQ|Q<D.C. al Coda>D-7 G7,|E-7 A7(Bb7)|D-7 G7 ]*B[F^7XyQKcl LZF-7 Bb7|E-7 A7|D-7 G7 Q]'
+             'Y[C^7 pp|A-7 ppXyQ|n XyQ|C6 Z'),
+]
+SONGS = ['{}=Composer==Medium Swing=C==1r34LbKcu7{}==0=0'.format(title, Tune._unscramble_chord_string(chart))
+         for title, chart in CHARTS]
+
+
+def _time(function, number):
+    return min(timeit.repeat(function, number=number, repeat=7)) / number
+
+
+def main():
+    for (title, chart), song in zip(CHARTS, SONGS):
+        # the previous implementation joined the measures around a coda, which Form unrolls correctly
+        if 'Q' not in chart:
+            assert ReSubTune(song).measures_as_strings == Tune(song).measures_as_strings
+        assert ReSubTune(song).chord_string == Tune(song).chord_string
+    raw_strings = [Tune(song).raw_chord_string for song in SONGS]
+    number = 200
+
+    stages = [
+        ('cleanup', lambda cls: [cls._cleanup_chord_string(s) for s in raw_strings]),
+        ('annotations', lambda cls: [cls._remove_annotations(s) for s in raw_strings]),
+        ('measures', lambda cls: [cls._get_measures(s) for s in raw_strings]),
+        ('whole tune', lambda cls: [cls(song) for song in SONGS]),
+    ]
+    print('{:12} {:>12} {:>12} {:>8}'.format('per tune', 're.sub', 'tokens', 'speed-up'))
+    for name, stage in stages:
+        before = _time(lambda: stage(ReSubTune), number) / len(SONGS) * 1e6
+        after = _time(lambda: stage(Tune), number) / len(SONGS) * 1e6
+        print('{:12} {:>10.1f}us {:>10.1f}us {:>7.2f}x'.format(name, before, after, before / after))
+
+
+if __name__ == '__main__':
+    main()
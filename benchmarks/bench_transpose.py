@@ -0,0 +1,63 @@
+"""Times the transposition of a corpus of 1400 tunes into all 12 keys with Tune.transpose_many, with and without
+NumPy, and compares it with transposing the measure strings chord by chord.
+
+Run from the repository root:
+
+    python benchmarks/bench_transpose.py
+"""
+import re
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyRealParser import Tune  # noqa: E402
+import corpus  # noqa: E402
+
+_names = ('C', 'Db', 'D', 'Eb', 'E', 'F', 'Gb', 'G', 'Ab', 'A', 'Bb', 'B')
+_pitches = dict({name: pitch for pitch, name in enumerate(_names)}, **{'C#': 1, 'D#': 3, 'F#': 6, 'G#': 8, 'A#': 10})
+_note_regex = re.compile(r'(?<![A-Za-z])[A-G][#b]?')
+
+
+def transpose_strings(tunes, semitones):
+    """Transposes every note name in the measure strings, without any attention to spelling"""
+    def transpose_note(match):
+        return _names[(_pitches[match.group(0)] + semitones) % 12]
+    return [[_note_regex.sub(transpose_note, measure) for measure in tune.measures_as_strings] for tune in tunes]
+
+
+def _time(function):
+    start = time.perf_counter()
+    for semitones in range(12):
+        function(semitones)
+    return time.perf_counter() - start
+
+
+def main():
+    tunes = [Tune(song, compact=True) for song in corpus.songs(1400)]
+    chords = sum(len(tune.compact_chords) for tune in tunes)
+    Tune.transpose_many(tunes, 0)
+    measures = [tune.measures_as_strings for tune in tunes]
+    print('1400 tunes, {} chords, into all 12 keys'.format(chords))
+    # the first run makes the tables of every interval
+    print('transpose_many, first run     {:8.1f}ms'.format(_time(lambda s: Tune.transpose_many(tunes, s)) * 1e3))
+    print('transpose_many                {:8.1f}ms'.format(
+        min(_time(lambda s: Tune.transpose_many(tunes, s)) for _ in range(5)) * 1e3))
+    numpy = sys.modules.pop('numpy', None)
+    sys.modules['numpy'] = None
+    try:
+        print('transpose_many without NumPy  {:8.1f}ms'.format(
+            min(_time(lambda s: Tune.transpose_many(tunes, s)) for _ in range(5)) * 1e3))
+    finally:
+        del sys.modules['numpy']
+        if numpy is not None:
+            sys.modules['numpy'] = numpy
+    for tune, tune_measures in zip(tunes, measures):
+        tune.measures_as_strings = tune_measures
+    print('strings, chord by chord       {:8.1f}ms'.format(
+        min(_time(lambda s: transpose_strings(tunes, s)) for _ in range(5)) * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Compares the table-driven unscrambling of chord strings with the previous block-by-block loop.
+
+Run from the repository root:
+
+    python benchmarks/bench_unscramble.py
+"""
+import random
+import sys
+import os
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyRealParser import Tune  # noqa: E402
+
+
+def obfusc50_loop(block):
+    result = list(block)
+    for i in range(5):
+        result[i] = block[49 - i]
+        result[49 - i] = block[i]
+    for i in range(10, 24):
+        result[i] = block[49 - i]
+        result[49 - i] = block[i]
+    return ''.join(result)
+
+
+def unscramble_loop(scrambled_string):
+    """The previous implementation"""
+    unscrambled = ""
+    while len(scrambled_string) > 50:
+        temp = scrambled_string[:50]
+        scrambled_string = scrambled_string[50:]
+        if len(scrambled_string) < 2:
+            unscrambled += temp
+        else:
+            unscrambled += obfusc50_loop(temp)
+    unscrambled += scrambled_string
+    return unscrambled
+
+
+def main():
+    # chord strings in the Jazz 1400 playlist are mostly between 200 and 700 characters long
+    rng = random.Random(0)
+    alphabet = 'ABCDEFG-^7b#9 |XyQLZ*[]{}N12T44'
+    songs = [''.join(rng.choice(alphabet) for _ in range(rng.randint(200, 700))) for _ in range(1400)]
+    assert [unscramble_loop(song) for song in songs] == [Tune._unscramble_chord_string(song) for song in songs]
+    assert Tune._unscramble_chord_strings(songs) == [Tune._unscramble_chord_string(song) for song in songs]
+
+    def per_song(function):
+        return min(timeit.repeat(function, number=5, repeat=5)) / 5 / len(songs) * 1e6
+
+    loop = per_song(lambda: [unscramble_loop(song) for song in songs])
+    table = per_song(lambda: [Tune._unscramble_chord_string(song) for song in songs])
+    bulk = per_song(lambda: Tune._unscramble_chord_strings(songs))
+    print('per song, 1400 songs of 200-700 characters:')
+    print('block loop  {:7.2f}us'.format(loop))
+    print('table       {:7.2f}us  {:5.2f}x'.format(table, loop / table))
+    print('bulk        {:7.2f}us  {:5.2f}x'.format(bulk, loop / bulk))
+
+
+if __name__ == '__main__':
+    main()
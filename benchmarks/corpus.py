@@ -0,0 +1,140 @@
+"""A synthetic corpus of iReal songs for the benchmarks.
+
+The charts are made up from random chords, so there are no licensing issues, but they are built like real charts:
+sections with bar lines of all kinds, repeats with two or three endings, segno and coda signs, slashes, one- and
+two-measure repeats, N.C., alternate chords, comments and a mix of time signatures. The same seed always gives
+the same corpus.
+"""
+import random
+import sys
+import os
+import urllib.parse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyRealParser import Tune  # noqa: E402
+
+ROOTS = ['C', 'Db', 'D', 'Eb', 'E', 'F', 'F#', 'Gb', 'G', 'Ab', 'A', 'Bb', 'B']
+QUALITIES = ['', '7', '^7', '-7', 'h7', 'o7', '7b9', '7#9', '7alt', '7sus', '-6', '6', '^7#11', '13', '7b13', '+',
+             '-^7', '9', '69', '7susadd3', 'o', 'h', '-']
+TIME_SIGNATURES = ['T44'] * 6 + ['T34', 'T54', 'T68', 'T22', 'T78']
+STYLES = ['Medium Swing', 'Bossa Nova', 'Ballad', 'Up Tempo Swing', 'Waltz', 'Latin', 'Funk']
+COMMENTS = ['D.C. al Coda', 'Fine', '13 bar form', 'solo break', 'D.S. al 2nd End.']
+
+
+def _chord(rng):
+    chord = rng.choice(ROOTS) + rng.choice(QUALITIES)
+    if rng.random() < 0.08:
+        chord += '/' + rng.choice(ROOTS)
+    return chord
+
+
+def _measure(rng, beats, repeat_symbols=True):
+    r = rng.random()
+    if repeat_symbols and r < 0.05:
+        return ' x '
+    if repeat_symbols and r < 0.08:
+        return ' r'
+    if repeat_symbols and r < 0.10:
+        return 'n' + 'XyQ' * (beats - 1)
+    chord_count = rng.choice([1, 1, 1, 2, 2, 4]) if beats % 2 == 0 else rng.choice([1, 1, beats])
+    step = beats // chord_count if beats % chord_count == 0 else 1
+    cells = []
+    chords = 0
+    for beat in range(beats):
+        if beat % step == 0 and chords < chord_count:
+            chord = _chord(rng)
+            chords += 1
+            if rng.random() < 0.05:
+                chord = rng.choice(['s', 'l']) + chord
+            if rng.random() < 0.04:
+                chord += '(' + _chord(rng) + ')'
+            if rng.random() < 0.03:
+                chord += 'f'
+            cells.append(chord + rng.choice([' ', ',', ' ']))
+        elif cells and rng.random() < 0.1:
+            cells.append('p')
+        else:
+            cells.append(rng.choice(['XyQ', ' ']))
+    measure = ''.join(cells)
+    if rng.random() < 0.04:
+        measure += '<' + rng.choice(COMMENTS) + '>'
+    return measure
+
+
+def chart(rng):
+    """Makes an unscrambled chord string
+
+    :param rng: A random.Random object
+    :return: A chord string
+    """
+    time_signature = rng.choice(TIME_SIGNATURES)
+    beats = min(int(time_signature[1]), 6)
+    codas = rng.choice([0, 0, 0, 1, 2])
+    section_count = rng.randint(1, 4)
+    segno_section = rng.randrange(section_count) if codas == 2 and rng.random() < 0.5 else None
+    # only one repeat with endings per chart, as in most real charts
+    endings_left = 1
+    sections = []
+    for number in range(section_count):
+        bracket = rng.choice(['[', '[', '{'])
+        label = '*' + 'ABCD'[number]
+        start = bracket + label if rng.random() < 0.5 else label + bracket
+        if number == 0:
+            start += time_signature
+        if number == segno_section:
+            start += 'S'
+        body = ''
+        for index in range(rng.choice([4, 8, 8])):
+            if index:
+                body += rng.choice(['|', '|', 'LZ', 'LZ', 'K'])
+                if rng.random() < 0.05:
+                    body += 'Y'
+            body += _measure(rng, beats, repeat_symbols=index > 1)
+        if bracket == '{' and endings_left and rng.random() < 0.6:
+            endings_left -= 1
+            body += '|N1' + _measure(rng, beats, False) + ' }' + rng.choice(['XyQXyQ ', '']) + \
+                rng.choice(['LZ', '|']) + 'N2' + _measure(rng, beats, False) + rng.choice([' Z ', ' ]'])
+            if rng.random() < 0.3:
+                body += rng.choice(['', 'Y']) + '|N3' + _measure(rng, beats, False) + '|' + \
+                    _measure(rng, beats, False) + ' ]'
+        else:
+            body += ' }' if bracket == '{' else ' ]'
+        sections.append(start + body)
+    chord_string = ''.join(sections)
+    if codas:
+        position = chord_string.find('|', len(chord_string) // 3)
+        if position > 0:
+            position += rng.random() < 0.5
+            chord_string = chord_string[:position] + 'Q' + chord_string[position:]
+    if codas == 2:
+        chord_string += 'Y[Q' + _measure(rng, beats, False) + '|' + _measure(rng, beats, False) + ' Z '
+    else:
+        chord_string += 'Z ' if rng.random() < 0.7 else ' U'
+    return chord_string
+
+
+def songs(count=1000, seed=0):
+    """Makes a corpus of scrambled songs, as accepted by the constructor of Tune
+
+    :param count: The number of songs
+    :param seed: The random seed
+    :return: A list of strings
+    """
+    rng = random.Random(seed)
+    result = []
+    for number in range(count):
+        chord_string = Tune._unscramble_chord_string(chart(rng))
+        result.append('Song {}=Composer, Synthetic=={}={}==1r34LbKcu7{}=={}=0'.format(
+            number, rng.choice(STYLES), rng.choice(ROOTS), chord_string, rng.choice(['0', '120', '180'])))
+    return result
+
+
+def ireal_url(songs, name='Synthetic'):
+    """Makes an irealb:// url of a playlist, as accepted by ``Tune.parse_ireal_url``
+
+    :param songs: A list of songs
+    :param name: The name of the playlist
+    :return: A url
+    """
+    return 'irealb://' + urllib.parse.quote('==='.join(songs + [name]))
@@ -1 +1,26 @@
-from .pyRealParser import Tune
+import importlib
+
+from .pyRealParser import Tune, SongError, SongParseError, ParseReport
+from .compact import CompactChords, chord_vocabulary
+from .chords import Chord, parse_chord
+
+# these need modules that are slow to import (sqlite3, pickle, mmap, ...), so they are only imported on first use
+_lazy_modules = {'TuneCache': 'cache', 'Profiler': 'profiling', 'Corpus': 'corpus', 'TuneIndex': 'index',
+                 'SimilarityIndex': 'similarity', 'ChartEditor': 'editing',
+                 'timelines': 'timeline', 'MidiWriter': 'timeline'}
+
+__all__ = ['Tune', 'SongError', 'SongParseError', 'ParseReport', 'CompactChords', 'chord_vocabulary', 'Chord',
+           'parse_chord'] + list(_lazy_modules)
+
+
+def __getattr__(name):
+    module = _lazy_modules.get(name)
+    if module is None:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    value = getattr(importlib.import_module('.' + module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_modules))
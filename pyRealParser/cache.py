@@ -0,0 +1,125 @@
+import collections
+import hashlib
+import pickle
+import sqlite3
+
+from .pyRealParser import Tune, __version__, PARSER_REVISION
+
+__license__ = 'MIT'
+__docformat__ = 'reStructuredText'
+
+# entries are only used by the same version and revision of the parser
+_parser_version = '{}-r{}'.format(__version__, PARSER_REVISION)
+
+
+class TuneCache(object):
+    """Caches parsed tunes, so that songs which show up again (e.g. the same standard in different playlists)
+    are only parsed once. Songs are looked up by a hash of their scrambled string.
+
+    Recently used tunes are kept in memory, up to ``maxsize`` of them. If a ``path`` is given, all tunes are
+    also stored in an sqlite database there, which can be shared by several processes (each of them should
+    make its own TuneCache). Entries are stored with the version of the parser and its ``PARSER_REVISION``, and
+    only those of the same version are used, so parsers that parse songs differently can share a database.
+
+    :ivar hits: How many tunes were found in the cache (in memory or on disk)
+    :ivar misses: How many tunes had to be parsed
+
+    Example:
+
+    ``cache = TuneCache(path='tunes.sqlite')``
+    ``tunes = [cache.parse(song) for song in songs]``
+    """
+
+    def __init__(self, maxsize=1024, path=None, version=_parser_version):
+        """
+        :param maxsize: How many tunes to keep in memory
+        :param path: Optional path of an sqlite database to store tunes on disk
+        :param version: Version of the parser, entries with a different version are not used. Defaults to the
+           version and ``PARSER_REVISION`` of this parser.
+        """
+        self.maxsize = maxsize
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._tunes = collections.OrderedDict()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, timeout=60, isolation_level=None)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            # the table 'tunes' of earlier versions held one version per key, so it is left alone
+            self._db.execute('CREATE TABLE IF NOT EXISTS parsed_tunes '
+                             '(key TEXT, version TEXT, data BLOB, PRIMARY KEY (key, version))')
+
+    @staticmethod
+    def _key(song):
+        return hashlib.sha1(song.encode('utf-8')).hexdigest()
+
+    def parse(self, song, serialized=False):
+        """Returns the parsed tune for a song, from the cache if possible. The same Tune object may be returned
+        more than once, so it should not be modified.
+
+        :param song: Scrambled string for a single tune, as accepted by the constructor of Tune
+        :param serialized: If True, return the pickled tune instead of the Tune object
+        :return: A Tune object, or a bytes object if ``serialized`` is True
+        """
+        key = self._key(song)
+        tune = self._tunes.get(key)
+        if tune is not None:
+            self._tunes.move_to_end(key)
+            self.hits += 1
+            return pickle.dumps(tune) if serialized else tune
+        data = None
+        if self._db is not None:
+            row = self._db.execute('SELECT data FROM parsed_tunes WHERE key = ? AND version = ?',
+                                   (key, self.version)).fetchone()
+            if row is not None:
+                data = row[0]
+                tune = pickle.loads(data)
+        if tune is None:
+            self.misses += 1
+            tune = Tune(song)
+            if self._db is not None:
+                data = pickle.dumps(tune)
+                self._db.execute('INSERT OR REPLACE INTO parsed_tunes VALUES (?, ?, ?)', (key, self.version, data))
+        else:
+            self.hits += 1
+        self._remember(key, tune)
+        if serialized:
+            return data if data is not None else pickle.dumps(tune)
+        return tune
+
+    def _remember(self, key, tune):
+        self._tunes[key] = tune
+        if len(self._tunes) > self.maxsize:
+            self._tunes.popitem(last=False)
+
+    def __contains__(self, song):
+        key = self._key(song)
+        if key in self._tunes:
+            return True
+        return self._db is not None and \
+            self._db.execute('SELECT 1 FROM parsed_tunes WHERE key = ? AND version = ?',
+                             (key, self.version)).fetchone() is not None
+
+    def __len__(self):
+        """
+        :return: Number of tunes in the cache (on disk and of this version, if there is a database)
+        """
+        if self._db is not None:
+            return self._db.execute('SELECT COUNT(*) FROM parsed_tunes WHERE version = ?',
+                                    (self.version,)).fetchone()[0]
+        return len(self._tunes)
+
+    def clear(self):
+        """Removes all tunes of this version from the cache, including the database, and resets the counters"""
+        self._tunes.clear()
+        if self._db is not None:
+            self._db.execute('DELETE FROM parsed_tunes WHERE version = ?', (self.version,))
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        """Closes the database, if there is one. The in-memory cache can still be used afterwards."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
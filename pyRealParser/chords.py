@@ -0,0 +1,141 @@
+import collections
+import re
+
+from .compact import chord_vocabulary
+
+__license__ = 'MIT'
+__docformat__ = 'reStructuredText'
+
+
+class Chord(collections.namedtuple('Chord', ['symbol', 'root', 'quality', 'extensions', 'alterations', 'bass'])):
+    """A chord symbol, taken apart. Chords are immutable and shared, so the same symbol always gives the same object.
+
+    :ivar symbol: The symbol as in ``Tune.measures_as_strings``, e.g. 'F^7/A'
+    :ivar root: The root, e.g. 'F' or 'Bb'. None for N.C.
+    :ivar quality: One of ``chord_qualities``: 'major', 'minor', 'augmented', 'diminished', 'suspended', 'power',
+       'major7', 'dominant7', 'minor7', 'minor-major7', 'half-diminished7', 'diminished7', 'diminished-major7' and
+       'suspended7'. None for N.C.
+    :ivar extensions: Tuple of the added notes, e.g. ('6', '9') for C69, ('13',) for C13 or ('add9',) for Cadd9
+    :ivar alterations: Tuple of the altered notes, e.g. ('b9', '#11'), or ('alt',) for an altered dominant
+    :ivar bass: The bass note of a slash chord, e.g. 'A', or None
+    """
+
+    __slots__ = ()
+
+    def __str__(self):
+        return self.symbol
+
+
+# every value of Chord.quality
+chord_qualities = ('major', 'minor', 'augmented', 'diminished', 'suspended', 'power', 'major7', 'dominant7', 'minor7',
+                   'minor-major7', 'half-diminished7', 'diminished7', 'diminished-major7', 'suspended7')
+_natural_pitches = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}
+_accidentals = {'': 0, '#': 1, 'b': -1}
+
+
+def pitch_class(note):
+    """
+    :param note: A note, e.g. the root or bass of a Chord, such as 'Bb'
+    :return: Its pitch class, counting semitones from C, e.g. 10
+    """
+    return (_natural_pitches[note[0]] + _accidentals[note[1:]]) % 12
+
+
+class ChordTable(dict):
+    """Maps chord symbols to Chord objects. Every symbol is parsed only once, the first time it is looked up,
+    which is cheap because a whole corpus only has a few thousand different symbols.
+
+    Symbols that are not understood are not rejected: whatever cannot be read is left out of the Chord.
+    The root, quality and bass are taken from ``chord_vocabulary``, which splits every symbol only once.
+    """
+
+    _part_regex = re.compile(r'sus|alt|add\d+|[#b]\d+|\d+|[-^ho+]')
+    # qualities of triads and seventh chords, by (triad, seventh)
+    _qualities = {
+        ('major', None): 'major', ('major', 'major'): 'major7', ('major', 'minor'): 'dominant7',
+        ('minor', None): 'minor', ('minor', 'major'): 'minor-major7', ('minor', 'minor'): 'minor7',
+        ('augmented', None): 'augmented', ('augmented', 'major'): 'major7', ('augmented', 'minor'): 'dominant7',
+        ('diminished', None): 'diminished', ('diminished', 'minor'): 'half-diminished7',
+        ('diminished', 'diminished'): 'diminished7', ('diminished', 'major'): 'diminished-major7',
+        ('suspended', None): 'suspended', ('suspended', 'minor'): 'suspended7', ('suspended', 'major'): 'major7',
+        ('power', None): 'power', ('power', 'minor'): 'dominant7', ('power', 'major'): 'major7',
+    }
+
+    def __missing__(self, symbol):
+        chord = self.parse(symbol)
+        self[symbol] = chord
+        return chord
+
+    @classmethod
+    def parse(cls, symbol):
+        """Parses a chord symbol, without looking it up in the table
+
+        :param symbol: A chord symbol in iReal notation, e.g. 'Eh7', 'F^7/A', 'Bb7b9#11' or 'N.C.'
+        :return: A Chord object
+        """
+        chord_id = chord_vocabulary[symbol]
+        root = chord_vocabulary.roots[chord_id]
+        quality = chord_vocabulary.qualities[chord_id]
+        bass = chord_vocabulary.basses[chord_id]
+        if root is None:
+            return Chord(symbol, None, None, (), (), bass)
+        triad = 'major'
+        seventh = None
+        extensions = []
+        alterations = []
+        for part in cls._part_regex.findall(quality):
+            if part == '-':
+                triad = 'minor'
+            elif part == '^':
+                seventh = 'major'
+            elif part == 'h':
+                triad = 'diminished'
+                seventh = 'minor'
+            elif part == 'o':
+                triad = 'diminished'
+                seventh = 'diminished' if seventh == 'minor' else seventh
+            elif part == '+':
+                triad = 'augmented'
+            elif part == 'sus':
+                triad = 'suspended'
+            elif part == 'alt':
+                alterations.append(part)
+            elif part[0] in '#b' or part.startswith('add'):
+                if part == 'b5' and triad == 'minor' and seventh == 'minor':
+                    # -7b5 is the same as h7
+                    triad = 'diminished'
+                elif part == '#5' and triad == 'major':
+                    triad = 'augmented'
+                    alterations.append(part)
+                else:
+                    (alterations if part[0] in '#b' else extensions).append(part)
+            elif part == '5':
+                triad = 'power'
+            elif part == '69':
+                extensions.extend(('6', '9'))
+            elif part in ('6', '2'):
+                extensions.append(part)
+            else:
+                # 7, 9, 11 and 13 all have a seventh
+                if seventh is None:
+                    seventh = 'diminished' if triad == 'diminished' else 'minor'
+                if part != '7':
+                    extensions.append(part)
+        if triad == 'augmented' and '#5' not in alterations and seventh is not None:
+            # C+7 is the same as C7#5
+            alterations.insert(0, '#5')
+        return Chord(symbol, root, cls._qualities.get((triad, seventh)), tuple(extensions), tuple(alterations),
+                     bass)
+
+
+# shared by all tunes
+chord_table = ChordTable()
+
+
+def parse_chord(symbol):
+    """Returns the Chord object of a chord symbol, parsing it only the first time
+
+    :param symbol: A chord symbol in iReal notation, e.g. 'Eh7' or 'F^7/A'
+    :return: A Chord object
+    """
+    return chord_table[symbol]
@@ -0,0 +1,129 @@
+import array
+import re
+
+__license__ = 'MIT'
+__docformat__ = 'reStructuredText'
+
+
+class ChordVocabulary(dict):
+    """Interns chord symbols: maps every chord symbol to an integer id, which is added the first time
+    the symbol is seen. The symbol is split into root, quality and bass only once, when it is added.
+
+    :ivar symbols: The chord symbols, indexed by id
+    :ivar roots: The roots (e.g. 'Bb'), indexed by id. None for N.C. and other symbols without a root.
+    :ivar qualities: The qualities (e.g. '-7b5'), indexed by id
+    :ivar basses: The bass notes of slash chords, indexed by id. None if there is no bass note.
+    """
+
+    _symbol_regex = re.compile(r'([A-G][#b]?)?(.*?)(?:/([A-G][#b]?))?', re.DOTALL)
+
+    def __init__(self):
+        super().__init__()
+        self.symbols = []
+        self.roots = []
+        self.qualities = []
+        self.basses = []
+
+    def __missing__(self, symbol):
+        chord_id = len(self.symbols)
+        root, quality, bass = self._symbol_regex.fullmatch(symbol).groups()
+        self.symbols.append(symbol)
+        self.roots.append(root)
+        self.qualities.append(quality)
+        self.basses.append(bass)
+        self[symbol] = chord_id
+        return chord_id
+
+
+# shared by all tunes, so the ids can be compared across a whole corpus
+chord_vocabulary = ChordVocabulary()
+
+
+class CompactChords(object):
+    """The chords of a tune in three parallel arrays, with one entry per chord: the index of its measure, the beat
+    it starts on and its id in ``chord_vocabulary``. This takes a small fraction of the memory of a list of
+    measure strings.
+
+    The beats are not stored in the iReal format, so the chords are spread evenly over the measure, e.g. two chords
+    in 4/4 start on beats 0 and 2.
+
+    :ivar measures: array of the measure index of every chord
+    :ivar beats: array of the beat (counting from 0) of every chord
+    :ivar chords: array of the chord id of every chord
+    :ivar measure_count: The number of measures, including those without chords
+    """
+
+    __slots__ = ('measures', 'beats', 'chords', 'measure_count')
+
+    def __init__(self, measures, beats, chords, measure_count):
+        self.measures = measures
+        self.beats = beats
+        self.chords = chords
+        self.measure_count = measure_count
+
+    @classmethod
+    def from_measures(cls, measures_as_strings, beats_per_measure=4):
+        """Makes the compact representation of a list of measures
+
+        :param measures_as_strings: A list of measures, with chords separated by spaces, as in
+           ``Tune.measures_as_strings``
+        :param beats_per_measure: The number of beats in a measure, i.e. the numerator of the time signature
+        :return: A CompactChords object
+        """
+        measures = array.array('H')
+        beats = array.array('B')
+        chords = array.array('I')
+        for index, measure in enumerate(measures_as_strings):
+            if measure:
+                symbols = measure.split(' ')
+                count = len(symbols)
+                chords.extend(map(chord_vocabulary.__getitem__, symbols))
+                measures.extend([index] * count)
+                beats.extend([position * beats_per_measure // count for position in range(count)])
+        return cls(measures, beats, chords, len(measures_as_strings))
+
+    def __len__(self):
+        return len(self.chords)
+
+    def symbols(self):
+        """
+        :return: A list of the chord symbols
+        """
+        return [chord_vocabulary.symbols[chord_id] for chord_id in self.chords]
+
+    def measures_as_strings(self):
+        """
+        :return: A list of measures, with chords separated by spaces, as in ``Tune.measures_as_strings``
+        """
+        measures = [[] for _ in range(self.measure_count)]
+        for measure, symbol in zip(self.measures, self.symbols()):
+            measures[measure].append(symbol)
+        return [' '.join(symbols) for symbols in measures]
+
+    def to_numpy(self):
+        """Returns NumPy views of the arrays, without copying them
+
+        :return: A tuple of NumPy arrays (measures, beats, chords)
+        """
+        import numpy
+        return tuple(numpy.frombuffer(values, dtype=values.typecode) for values in (self.measures, self.beats,
+                                                                                      self.chords))
+
+    def __getstate__(self):
+        # chord ids are only valid in this process, so store the symbols instead
+        symbols = sorted(set(self.chords))
+        local_ids = {chord_id: local_id for local_id, chord_id in enumerate(symbols)}
+        return (self.measures, self.beats, array.array('I', [local_ids[chord_id] for chord_id in self.chords]),
+                [chord_vocabulary.symbols[chord_id] for chord_id in symbols], self.measure_count)
+
+    def __setstate__(self, state):
+        self.measures, self.beats, local_ids, symbols, self.measure_count = state
+        chord_ids = [chord_vocabulary[symbol] for symbol in symbols]
+        self.chords = array.array('I', [chord_ids[local_id] for local_id in local_ids])
+
+    def __eq__(self, other):
+        return isinstance(other, CompactChords) and (self.measures, self.beats, self.chords, self.measure_count) == \
+            (other.measures, other.beats, other.chords, other.measure_count)
+
+    def __repr__(self):
+        return 'CompactChords({} chords in {} measures)'.format(len(self), self.measure_count)
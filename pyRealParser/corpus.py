@@ -0,0 +1,216 @@
+"""A binary file format for a corpus of parsed tunes, which can be loaded without parsing anything.
+
+Layout (version 1). All integers are little-endian, and every array starts at an offset that is a multiple of its
+item size, so it can be viewed without copying:
+
+- header, 20 bytes: the magic bytes ``iRLC``, the format version (uint16), the ``PARSER_REVISION`` of the parser that
+  wrote the file (uint16), the number of tunes T (uint32), the number of distinct chord symbols C (uint32) and the
+  number of chords in all tunes together N (uint32)
+- chord offsets, uint32[T + 1]: the chords of tune i are the entries ``offsets[i]`` to ``offsets[i + 1]`` of the
+  chord arrays below
+- measure counts, uint32[T]: the number of measures of every tune, including those without chords
+- string offsets, uint32[9 T + C + 1]: string j is ``text[offsets[j]:offsets[j + 1]]``. Each tune has 9 strings:
+  title, composer, style, key, transpose, comp_style, bpm, repeats and the scrambled chords, where an empty string
+  stands for None in transpose, comp_style, bpm and repeats. They are followed by the C chord symbols.
+- chords, uint32[N]: index of every chord in the chord symbols
+- measures, uint16[N]: measure index of every chord
+- time signatures, uint8[2 T]: numerator and denominator of every tune
+- beats, uint8[N]: the beat every chord starts on
+- text: the strings, encoded in UTF-8
+
+The chord arrays are those of ``CompactChords``. The scrambled chords are stored as well, so that the other
+attributes of a tune can still be made from them when they are needed.
+"""
+import array
+import mmap
+import os
+import struct
+import sys
+
+from .pyRealParser import Tune, PARSER_REVISION
+from .compact import CompactChords, chord_vocabulary
+
+__license__ = 'MIT'
+__docformat__ = 'reStructuredText'
+
+MAGIC = b'iRLC'
+FORMAT_VERSION = 1
+_header = struct.Struct('<4sHHIII')
+_STRINGS_PER_TUNE = 9
+_tune_string_offsets = struct.Struct('<{}I'.format(_STRINGS_PER_TUNE + 1))
+
+
+def _to_bytes(values):
+    if sys.byteorder == 'big':
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(typecode, data):
+    values = array.array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def dump_corpus(tunes, path):
+    """Writes tunes to a file, see ``Tune.dump_corpus``
+
+    :param tunes: An iterable of Tune objects
+    :param path: Path of the file to write
+    """
+    chord_offsets = array.array('I', [0])
+    measure_counts = array.array('I')
+    time_signatures = array.array('B')
+    chords = array.array('I')
+    measures = array.array('H')
+    beats = array.array('B')
+    strings = []
+    # chord ids in this file, in the order in which they are first used
+    symbol_ids = {}
+    for tune in tunes:
+        compact = tune.compact_chords
+        chords.extend([symbol_ids.setdefault(chord_vocabulary.symbols[chord_id], len(symbol_ids))
+                       for chord_id in compact.chords])
+        measures.extend(compact.measures)
+        beats.extend(compact.beats)
+        chord_offsets.append(len(chords))
+        measure_counts.append(compact.measure_count)
+        time_signatures.extend(tune.time_signature)
+        strings.extend((tune.title, tune.composer, tune.style, tune.key,
+                        '' if tune.transpose is None else str(tune.transpose),
+                        tune.comp_style or '', tune.bpm or '', tune.repeats or '', tune._chords_scrambled))
+    strings.extend(symbol_ids)
+    encoded = [string.encode('utf-8') for string in strings]
+    string_offsets = array.array('I', [0])
+    for data in encoded:
+        string_offsets.append(string_offsets[-1] + len(data))
+
+    with open(path, 'wb') as file:
+        file.write(_header.pack(MAGIC, FORMAT_VERSION, PARSER_REVISION, len(measure_counts), len(symbol_ids),
+                                len(chords)))
+        for values in (chord_offsets, measure_counts, string_offsets, chords, measures, time_signatures, beats):
+            file.write(_to_bytes(values))
+        file.write(b''.join(encoded))
+
+
+class Corpus(object):
+    """A corpus of tunes in a file written by ``Tune.dump_corpus``. The file is memory-mapped, and a tune is only
+    read when it is accessed by its index. Every access makes a new Tune object.
+
+    A Corpus can be used as a context manager, which closes the file at the end.
+
+    Example:
+
+    ``with Tune.load_corpus('tunes.irlc') as corpus:``
+    ``    tune = corpus[42]``
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Path of a file written by ``Tune.dump_corpus``
+        """
+        with open(path, 'rb') as file:
+            # an empty file cannot be mapped
+            if os.fstat(file.fileno()).st_size < _header.size:
+                raise RuntimeError('{} is not a corpus of tunes'.format(path))
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, revision, self._count, chord_count, total = _header.unpack_from(self._map)
+            if magic != MAGIC:
+                raise RuntimeError('{} is not a corpus of tunes'.format(path))
+            if version != FORMAT_VERSION:
+                raise RuntimeError('Unsupported version {} of the corpus format in {}'.format(version, path))
+            # the chords and fields in the file are those of the parser that wrote it
+            if revision != PARSER_REVISION:
+                raise RuntimeError('{} was written by a different revision of the parser'.format(path))
+            self._chord_offsets = _header.size
+            self._measure_counts = self._chord_offsets + 4 * (self._count + 1)
+            self._string_offsets = self._measure_counts + 4 * self._count
+            self._chords = self._string_offsets + 4 * (_STRINGS_PER_TUNE * self._count + chord_count + 1)
+            self._measures = self._chords + 4 * total
+            self._time_signatures = self._measures + 2 * total
+            self._beats = self._time_signatures + 2 * self._count
+            self._text = self._beats + total
+            # the last string offset, just before the chords, is the size of the text
+            if len(self._map) < self._text or \
+                    len(self._map) < self._text + struct.unpack_from('<I', self._map, self._chords - 4)[0]:
+                raise RuntimeError('{} is truncated'.format(path))
+            # map the chord ids of the file to ids in the shared chord vocabulary
+            first_symbol = _STRINGS_PER_TUNE * self._count
+            self._chord_ids = [chord_vocabulary[self._string(first_symbol + index)] for index in range(chord_count)]
+        except Exception:
+            self._map.close()
+            raise
+
+    def _string(self, index):
+        start, end = struct.unpack_from('<II', self._map, self._string_offsets + 4 * index)
+        return self._map[self._text + start:self._text + end].decode('utf-8')
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        """
+        :param index: The index of a tune, or a slice
+        :return: A Tune object, or a list of them for a slice
+        """
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('corpus index out of range')
+        offsets = _tune_string_offsets.unpack_from(self._map, self._string_offsets + 4 * _STRINGS_PER_TUNE * index)
+        text = self._text
+        title, composer, style, key, transpose, comp_style, bpm, repeats, scrambled = \
+            [self._map[text + start:text + end].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+        start, end = struct.unpack_from('<II', self._map, self._chord_offsets + 4 * index)
+        measure_count, = struct.unpack_from('<I', self._map, self._measure_counts + 4 * index)
+        chord_ids = self._chord_ids
+        compact = CompactChords(
+            _from_bytes('H', self._map[self._measures + 2 * start:self._measures + 2 * end]),
+            _from_bytes('B', self._map[self._beats + start:self._beats + end]),
+            array.array('I', [chord_ids[chord] for chord in
+                              _from_bytes('I', self._map[self._chords + 4 * start:self._chords + 4 * end])]),
+            measure_count)
+
+        tune = Tune.__new__(Tune)
+        tune.title = title
+        tune.composer = composer
+        tune.style = style
+        tune.key = key
+        tune.transpose = int(transpose) if transpose else None
+        tune.comp_style = comp_style or None
+        tune.bpm = bpm or None
+        tune.repeats = repeats or None
+        tune._chords_scrambled = scrambled
+        time_signature = self._time_signatures + 2 * index
+        tune.time_signature = tuple(self._map[time_signature:time_signature + 2])
+        tune.compact_chords = compact
+        return tune
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index]
+
+    def close(self):
+        """Closes the file. Tunes that were already read can still be used."""
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load_corpus(path):
+    """Opens a file written by ``dump_corpus``, see ``Tune.load_corpus``
+
+    :param path: Path of the file
+    :return: A Corpus object
+    """
+    return Corpus(path)
@@ -0,0 +1,229 @@
+import bisect
+import functools
+import itertools
+
+from .pyRealParser import Tune
+from .form import Form
+
+__license__ = 'MIT'
+__docformat__ = 'reStructuredText'
+
+# kinds of tokens that change the form of a tune, or the number of measures that are played
+_structural_kinds = frozenset(('repeat_start', 'repeat_end', 'ending', 'section', 'empty_section', 'segno', 'coda',
+                               'end', 'final', 'time_signature', 'repeat_two', 'section_start', 'section_end', 'bar'))
+# kinds of tokens that may be between two measures that are replaced together
+_separator_kinds = frozenset(('bar', 'space', 'spacer'))
+
+
+class ChartEditor(object):
+    """Edits the chords of a parsed tune, and updates its ``measures_as_strings`` in place, without parsing the
+    whole chart again.
+
+    The chart is kept as the text of every written measure (as in ``Tune.form.measures``) and the text between them.
+    An edit that only changes chords, slashes, one-measure repeats and N.C., and keeps the number of measures, only
+    tokenizes the new text. It then fills repeats and slashes again in the measures as played that come from the
+    edited measures, and in those after them that repeat their chords, so it takes the same time however long the
+    chart is. Any other edit (e.g. adding a measure, a repeat or a coda) parses the chart again.
+
+    The other attributes of the tune that depend on the chords (``raw_chord_string``, ``chord_string``, ``form``,
+    ``chords``, ``compact_chords``) are updated as well, or made again when they are used next.
+
+    Example:
+
+    ``editor = ChartEditor(tune)``
+    ``editor.replace_measures(4, 6, 'Eh7 A7b9 |D-7 p G7')``
+    """
+
+    def __init__(self, tune):
+        """
+        :param tune: The Tune object to edit
+        """
+        self.tune = tune
+        raw = tune.raw_chord_string
+        tune._set_chord_string(raw, *self._build(raw))
+
+    def _build(self, raw):
+        """Parses the whole chart
+
+        :param raw: The chart, as in ``Tune.raw_chord_string``
+        :return: The form of the chart, and its measures as played
+        """
+        tokens = Tune._tokenize(raw)
+        kinds = [Tune._token_kind(token) for token in tokens]
+        mapped = [Tune._measure_table[token] for token in tokens]
+        chord_string = ''.join(mapped)
+        form = Form.parse(chord_string)
+        mapped_ends = list(itertools.accumulate(map(len, mapped)))
+        raw_offsets = [0] + list(itertools.accumulate(map(len, tokens)))
+        # the text between the measures and the text of every measure, alternating, starting and ending with the
+        # text between measures
+        self._pieces = []
+        self._editable = []
+        self._plain_gaps = []
+        gap_start = 0
+        for index, (start, end) in enumerate(form._spans(chord_string)):
+            first = bisect.bisect_right(mapped_ends, start)
+            stop = bisect.bisect_right(mapped_ends, end)
+            content = [position for position in range(first, stop) if kinds[position] != 'space' and
+                       kinds[position] not in _structural_kinds]
+            if content:
+                first, stop = content[0], content[-1] + 1
+            self._editable.append(
+                bool(content) and not _structural_kinds.intersection(kinds[first:stop]) and
+                Form._all_markers_regex.search(form._written[index]) is None)
+            self._plain_gaps.append(_separator_kinds.issuperset(kinds[gap_start:first]))
+            self._pieces.append(raw[raw_offsets[gap_start]:raw_offsets[first]])
+            self._pieces.append(raw[raw_offsets[first]:raw_offsets[stop]])
+            gap_start = stop
+        self._pieces.append(raw[raw_offsets[gap_start]:])
+        self._form = form
+        # where every written measure is played, as indices into the unrolled measures
+        unrolled = form._unroll()
+        self._unrolled = [measure for index, measure in unrolled]
+        self._positions = [[] for _ in form.measures]
+        for position, (index, measure) in enumerate(unrolled):
+            self._positions[index].append(position)
+        # index of the first measure of the result for every unrolled measure
+        self._offsets = [0] + list(itertools.accumulate(Tune._repeat_widths(self._unrolled)))
+        return form, Tune._fill_measures(list(self._unrolled))
+
+    def measure_text(self, index):
+        """
+        :param index: The index of a written measure
+        :return: The text of the measure in the chart, e.g. 'C^7 p A7'
+        """
+        return self._pieces[2 * index + 1]
+
+    def replace_section(self, number, text):
+        """Replaces the chords of a section, see ``replace_measures``
+
+        :param number: The number of the section in ``tune.form.sections``, counting from 0
+        :param text: The new measures
+        :return: See ``replace_measures``
+        """
+        sections = self._form.sections
+        start = sections[number][0]
+        end = sections[number + 1][0] if number + 1 < len(sections) else len(self._form.measures)
+        return self.replace_measures(start, end, text)
+
+    def replace_measures(self, start, end, text):
+        """Replaces the chords of some of the written measures of the tune. Section markers, repeats and other signs
+        before the first and after the last measure are kept.
+
+        :param start: The index of the first measure to replace, as in ``tune.form.measures``
+        :param end: The index after the last measure to replace
+        :param text: The new measures in the iReal format, separated by bar lines, e.g. 'C^7 |A-7 D7'
+        :return: The range (start, end) of ``tune.measures_as_strings`` that changed
+        """
+        if not 0 <= start < end <= len(self._form.measures):
+            raise IndexError('measure range {}:{} out of range'.format(start, end))
+        measures = self._split(text) if all(self._editable[start:end]) and all(self._plain_gaps[start + 1:end]) \
+            else None
+        # two-measure repeats change the number of measures that are played
+        if measures is None or len(measures) != end - start or 'r' in self._form.measures[start:end] or \
+                any(measure == 'r' for content, separator, measure in measures):
+            return self._replace_text(start, end, text)
+
+        changed = []
+        for index, (content, separator, measure) in enumerate(measures, start):
+            self._pieces[2 * index + 1] = content
+            if index > start:
+                self._pieces[2 * index] = separator
+            self._form._written[index] = self._form.measures[index] = measure
+            for position in self._positions[index]:
+                self._unrolled[position] = measure
+                changed.append(position)
+        # a one-measure repeat after a two-measure repeat is filled with two measures, so replacing one, or putting
+        # one there, changes where the following measures are in the result
+        if any(self._width(position) != self._offsets[position + 1] - self._offsets[position] for position in changed):
+            return self._replace_text(start, end, text)
+        result = None
+        done = 0
+        for position in sorted(changed):
+            if position < done:
+                continue
+            window_start, done = self._window(position)
+            filled = Tune._fill_measures(self._unrolled[window_start:done])
+            first, last = self._offsets[window_start], self._offsets[done]
+            if len(filled) != last - first:
+                return self._replace_text(start, end, text)
+            self.tune.measures_as_strings[first:last] = filled
+            result = (first, last) if result is None else (result[0], last)
+        self._changed()
+        return result
+
+    def _split(self, text):
+        """Splits new text into measures, if it can be put in place of measures without parsing the chart again
+
+        :return: A list of (text, text before it, measure as in ``Form.measures``) tuples, or None
+        """
+        measures = []
+        tokens = []
+        separator = ''
+        for token in itertools.chain(Tune._tokenize(text), ['|']):
+            kind = Tune._token_kind(token)
+            if kind == 'bar':
+                while tokens and Tune._token_kind(tokens[-1]) == 'space' and measures:
+                    separator += tokens.pop()
+                measure = ''.join(map(Tune._measure_table.__getitem__, tokens)).replace('+*', '+').replace(' ', '')
+                if not measure:
+                    return None
+                measures.append([''.join(tokens), separator, measure])
+                tokens = []
+                separator = token
+            elif kind in _structural_kinds:
+                return None
+            elif kind == 'space' and not tokens and measures:
+                separator += token
+            else:
+                tokens.append(token)
+        # the separator of the first measure stays as it is
+        return [tuple(measure) for measure in measures]
+
+    def _width(self, position):
+        """
+        :param position: The index of an unrolled measure
+        :return: How many measures it becomes in the result, as in ``Tune._repeat_widths``
+        """
+        previous = position
+        while previous > 0 and self._unrolled[previous] == 'x':
+            previous -= 1
+        return 2 if self._unrolled[previous] == 'r' and position >= 2 else 1
+
+    def _window(self, position):
+        """Finds the unrolled measures whose repeats and slashes have to be filled again after a measure changed
+
+        :param position: The index of the unrolled measure that changed
+        :return: (start, end), where the measure at ``start`` does not depend on the measures before it, and those
+           from ``end`` on do not depend on the measures before ``end``
+        """
+        unrolled = self._unrolled
+
+        def independent(index):
+            measure = unrolled[index]
+            return measure not in ('x', 'r') and not measure.startswith('p') and \
+                (index + 1 == len(unrolled) or unrolled[index + 1] != 'r')
+
+        start = position
+        # slashes are not filled in the first measure, so it must not have any
+        while start > 0 and not (independent(start) and 'p' not in unrolled[start]):
+            start -= 1
+        end = position + 1
+        while end < len(unrolled) and not independent(end):
+            end += 1
+        return start, end
+
+    def _replace_text(self, start, end, text):
+        """Replaces the text of measures and parses the chart again"""
+        self._pieces[2 * start + 1:2 * end] = [text]
+        raw = ''.join(self._pieces)
+        form, measures = self._build(raw)
+        self.tune.measures_as_strings[:] = measures
+        self.tune._set_chord_string(raw, form, self.tune.measures_as_strings)
+        return 0, len(self.tune.measures_as_strings)
+
+    def _changed(self):
+        """Gives the tune the edited chart, joined when it is used next, and keeps the form and the measures, which
+        are up to date"""
+        self.tune._set_chord_string(functools.partial(''.join, self._pieces), self._form,
+                                    self.tune.measures_as_strings)
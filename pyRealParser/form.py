@@ -0,0 +1,354 @@
+import bisect
+import collections
+import itertools
+import re
+
+__license__ = 'MIT'
+__docformat__ = 'reStructuredText'
+
+
+Repeat = collections.namedtuple('Repeat', ['start', 'end', 'endings'])
+Repeat.__doc__ = """A repeated span of measures, from measure ``start`` up to (not including) measure ``end``.
+``endings`` maps the numbers of its endings to the index of their first measure. The first ending lies within the
+span, the others follow after it."""
+
+
+class Form(object):
+    """The form of a tune as written: its measures, sections, repeats, endings, and the segno and coda signs.
+    It is parsed once, and can then be unrolled into the order in which the measures are played.
+
+    The positions of segno and coda signs are given as (measure index, after) tuples, where ``after`` is True if the
+    sign comes after the chords of the measure, and False if it comes before them.
+
+    :ivar measures: The chords of every written measure as a string, without separators and markers
+    :ivar sections: A list of (measure index, section label) tuples, e.g. (0, 'A')
+    :ivar repeats: A list of Repeat tuples
+    :ivar segno: The position of the segno sign, or None
+    :ivar codas: The positions of the coda signs
+    """
+
+    _bar_regex = re.compile(r'([{}|])')
+    _brace_regex = re.compile(r'([{}])')
+    _section_regex = re.compile(r'\*(\w)')
+    # markers that tell where to jump to, as opposed to the chords and the other symbols of a measure
+    _jump_marker_regex = re.compile(r'([SQ]|N\d)')
+    _all_markers_regex = re.compile(r'U|S|Q|N\d')
+    # markers that are never kept in the measures as played: endings, and the end of the chart
+    _endings_regex = re.compile(r'N\d|U')
+
+    def __init__(self):
+        self.measures = []
+        self._sections = None
+        self.repeats = []
+        self.segno = None
+        self.codas = []
+        # the measures as they are written, including markers, and the measure indices that start endings
+        self._written = []
+        self._endings = {}
+        # the indices of the written measures that have markers
+        self._marked = set()
+        # the number of the text between two bar lines in the parsed chord string, for every written measure
+        self._measure_pieces = []
+        # the text of the measures and the section labels, taking turns
+        self._section_parts = ['']
+
+    @property
+    def sections(self):
+        """A list of (measure index, section label) tuples, e.g. (0, 'A')"""
+        if self._sections is None:
+            labels = {}
+            number = 0
+            for part, label in zip(self._section_parts[::2], self._section_parts[1::2]):
+                number += part.count('|')
+                index = bisect.bisect_left(self._measure_pieces, number)
+                if index < len(self._measure_pieces):
+                    labels[index] = label
+            self._sections = sorted(labels.items())
+        return self._sections
+
+    @classmethod
+    def parse(cls, chord_string):
+        """Parses the form of a chord string, in which bar lines have been unified to '|' and annotations have been
+        removed (see ``Tune._measure_table``). Sections can be marked with '*' and a letter.
+
+        :param chord_string: A chord string
+        :return: A Form object
+        """
+        form = cls()
+        # every bar line, including the braces of repeats, becomes a '|', so the text of the measures can be cleaned
+        # up and split in one go, and the number of the piece of a position is the number of '|' before it. The
+        # text between the braces and the braces take turns.
+        braces = cls._brace_regex.split(chord_string)
+        text = '|'.join(braces[::2])
+        if '*' in text:
+            # the labels are only matched with their measures when the sections are used
+            form._section_parts = cls._section_regex.split(text)
+            text = ''.join(form._section_parts[::2])
+        text = text.replace('+*', '+').replace(' ', '')
+        contents = text.split('|')
+        measure_pieces = list(itertools.compress(range(len(contents)), contents))
+        written = list(filter(None, contents))
+
+        # only the pieces with markers need a closer look: markers in pieces without chords belong to the measure
+        # before or after them
+        marked = {}
+        number = 0
+        for part in cls._all_markers_regex.split(text)[:-1]:
+            number += part.count('|')
+            if number in marked:
+                continue
+            # the chords and the jump markers of the piece take turns
+            parts = cls._jump_marker_regex.split(contents[number])
+            measure = ''.join(parts[::2])
+            markers = []
+            after = False
+            for chords, marker in zip(parts[::2], parts[1::2]):
+                after = after or chords != ''
+                markers.append((marker, after))
+            # 'U' on its own is the end of the chart
+            marked[number] = (measure.replace('U', '') if measure not in ('', 'U') else None, markers)
+        # pieces with nothing but markers are not measures
+        dropped = {number for number, (measure, markers) in marked.items() if measure is None}
+        if dropped:
+            kept = [number not in dropped for number in measure_pieces]
+            measure_pieces = list(itertools.compress(measure_pieces, kept))
+            written = list(itertools.compress(written, kept))
+
+        form._measure_pieces = measure_pieces
+        form._written = written
+        form.measures = list(written)
+
+        pending = []
+        target = None
+        # the bar lines, only found when a segno or coda sign is on its own
+        separators = None
+        for number, (measure, markers) in marked.items():
+            index = bisect.bisect_left(measure_pieces, number)
+            if pending and (target < index or target == index and measure is not None):
+                for marker, after in pending:
+                    form._add_marker(marker, target, after)
+                pending = []
+            if measure is not None:
+                form.measures[index] = measure
+                form._marked.add(index)
+                for marker, after in markers:
+                    form._add_marker(marker, index, after)
+                continue
+            for marker, after in markers:
+                if marker[0] != 'N' and index > 0 and separators is None:
+                    separators = cls._bar_regex.findall(chord_string)
+                if marker[0] != 'N' and index > 0 and separators[number - 1] == '|':
+                    # a segno or coda sign on its own belongs to the end of the previous measure
+                    form._add_marker(marker, index - 1, True)
+                else:
+                    pending.append((marker, False))
+                    target = index
+        if pending:
+            if target < len(measure_pieces):
+                for marker, after in pending:
+                    form._add_marker(marker, target, after)
+            elif measure_pieces:
+                for marker, after in pending:
+                    form._add_marker(marker, len(measure_pieces) - 1, True)
+
+        if '{' in chord_string:
+            number = 0
+            repeat_start = None
+            for part, brace in zip(braces[::2], braces[1::2]):
+                # the brace ends piece ``number``
+                number += part.count('|')
+                if brace == '{' and repeat_start is None:
+                    repeat_start = bisect.bisect_right(measure_pieces, number)
+                elif brace == '}' and repeat_start is not None:
+                    form.repeats.append(Repeat(repeat_start, bisect.bisect_right(measure_pieces, number), {}))
+                    repeat_start = None
+                number += 1
+            form._assign_endings()
+        return form
+
+    def _spans(self, chord_string):
+        """
+        :param chord_string: The chord string that was parsed
+        :return: The (start, end) offsets of every written measure in the chord string
+        """
+        pieces = self._bar_regex.split(chord_string)
+        offsets = [0] + list(itertools.accumulate(map(len, pieces)))
+        return [(offsets[2 * number], offsets[2 * number] + len(pieces[2 * number]))
+                for number in self._measure_pieces]
+
+    def _add_marker(self, marker, index, after):
+        if marker == 'S':
+            if self.segno is None:
+                self.segno = (index, after)
+        elif marker == 'Q':
+            self.codas.append((index, after))
+        elif not after and index not in self._endings:
+            self._endings[index] = int(marker[1])
+
+    def _assign_endings(self):
+        """Assigns every ending to its repeat: the first ending lies within the repeat, the following endings come
+        after it, up to the next repeat."""
+        if not self._endings:
+            return
+        endings = sorted(self._endings)
+        for number, repeat in enumerate(self.repeats):
+            first = bisect.bisect_left(endings, repeat.start)
+            if first == len(endings) or endings[first] >= repeat.end:
+                continue
+            repeat.endings[1] = endings[first]
+            next_start = self.repeats[number + 1].start if number + 1 < len(self.repeats) else len(self._written)
+            for index in endings[bisect.bisect_left(endings, repeat.end):bisect.bisect_left(endings, next_start)]:
+                repeat.endings[len(repeat.endings) + 1] = index
+
+    def _walk(self):
+        """Unrolls the repeats and codas
+
+        :return: A tuple (segments, cut, number of coda signs). ``segments`` is a list of (start, end, first time)
+           tuples: the measures from ``start`` up to ``end`` are played in turn. ``first time`` is False for measures
+           that are played again because of a repeat, in which case the markers are not repeated. ``cut`` is None,
+           or the positions (segno, first coda sign, coda) in the played measures for the jump to the coda.
+        """
+        count = len(self._written)
+        if not self.repeats:
+            segments = [(0, count, True)]
+            codas = sorted(measure + after for measure, after in self.codas)
+            cut = None
+            if len(codas) >= 2:
+                cut = (sum(self.segno) if self.segno is not None else 0, codas[0], codas[-1])
+            return segments, cut, len(codas)
+        segments = []
+        # where the measures with endings start to be played, including the measures replayed before them
+        ending_starts = {}
+        played = 0
+        index = 0
+        # the repeats are in order, and their endings come before the next repeat
+        for repeat in self.repeats:
+            if repeat.end <= repeat.start:
+                continue
+            if index < repeat.start:
+                segments.append((index, repeat.start, True))
+                played += repeat.start - index
+            segments.append((repeat.start, repeat.end, True))
+            played += repeat.end - repeat.start
+            index = repeat.end
+            if not repeat.endings:
+                segments.append((repeat.start, repeat.end, False))
+                played += repeat.end - repeat.start
+                continue
+            # the measures to play before every ending after the first one
+            body = repeat.endings[1]
+            for ending in repeat.endings.values():
+                if ending < repeat.end:
+                    continue
+                if index < ending:
+                    segments.append((index, ending, True))
+                    played += ending - index
+                ending_starts[ending] = played
+                segments.append((repeat.start, body, False))
+                segments.append((ending, ending + 1, True))
+                played += body - repeat.start + 1
+                index = ending + 1
+        if index < count:
+            segments.append((index, count, True))
+
+        # where the first playing of every measure with a sign starts
+        signs = self.codas + [self.segno] if self.segno is not None else self.codas
+        wanted = sorted(set(measure for measure, after in signs))
+        starts = {}
+        played = 0
+        for start, end, first_time in segments:
+            if first_time:
+                for measure in wanted[bisect.bisect_left(wanted, start):bisect.bisect_left(wanted, end)]:
+                    starts[measure] = played + measure - start
+            played += end - start
+
+        def position(measure, after):
+            # where the first playing of a measure starts, or ends
+            if after:
+                return starts[measure] + 1
+            return ending_starts.get(measure, starts[measure])
+
+        codas = sorted(position(measure, after) for measure, after in self.codas)
+        cut = None
+        if len(codas) >= 2:
+            # play everything up to the coda, then jump back to the segno (or the top) and play until the first
+            # coda sign, then jump to the coda. Coda signs in between are ignored.
+            cut = (position(*self.segno) if self.segno is not None else 0, codas[0], codas[-1])
+        return segments, cut, len(codas)
+
+    @staticmethod
+    def _play(segments, cut, first_time, again):
+        """
+        :param segments: The segments from ``_walk``
+        :param cut: The jump to the coda from ``_walk``
+        :param first_time: A list with an item for every written measure, for the first time it is played
+        :param again: A list with an item for every written measure, for when it is played again
+        :return: The items in playback order
+        """
+        played = []
+        for start, end, first in segments:
+            played += (first_time if first else again)[start:end]
+        if cut is not None:
+            segno, jump, coda = cut
+            played = played[:coda] + played[segno:jump] + played[coda:]
+        return played
+
+    def playback_order(self):
+        """
+        :return: A list of measure indices, in the order in which they are played
+        """
+        segments, cut, coda_count = self._walk()
+        indices = range(len(self._written))
+        return self._play(segments, cut, indices, indices)
+
+    def _flatten(self):
+        """Unrolls the form into the measures as they are played, without the markers of endings. Segno and coda
+        signs are only kept if they are not used to jump.
+
+        :return: A list of non-empty measure strings
+        """
+        segments, cut, coda_count = self._walk()
+        first_time, again = self._texts(segments, coda_count)
+        measures = self._play(segments, cut, first_time, again)
+        return [measure for measure in measures if measure] if '' in again else measures
+
+    def _unroll(self):
+        """Like ``_flatten``, but also tells where every measure comes from
+
+        :return: A list of (measure index, measure string) tuples of the non-empty measures, as they are played
+        """
+        segments, cut, coda_count = self._walk()
+        first_time, again = self._texts(segments, coda_count)
+        indices = range(len(self._written))
+        return [(index, measure) for index, measure in zip(self._play(segments, cut, indices, indices),
+                                                           self._play(segments, cut, first_time, again))
+                if measure]
+
+    def _texts(self, segments, coda_count):
+        """
+        :param segments: The segments from ``_walk``
+        :param coda_count: The number of coda signs that are used
+        :return: Two lists with the text of every written measure: when it is played for the first time, and when
+           it is played again. Only measures with markers differ from the measures as written.
+        """
+        if not self._marked:
+            return self._written, self._written
+        marked = sorted(self._marked)
+        # the measures that are played again, without their markers
+        again = self._written
+        for start, end, first in segments:
+            if first:
+                continue
+            for index in marked[bisect.bisect_left(marked, start):bisect.bisect_left(marked, end)]:
+                if again is self._written:
+                    again = list(self._written)
+                again[index] = self._all_markers_regex.sub('', self._written[index])
+        first_time = list(self._written)
+        for index in marked:
+            measure = self._endings_regex.sub('', self._written[index])
+            if coda_count:
+                measure = measure.replace('Q', '')
+                if coda_count > 1:
+                    measure = measure.replace('S', '')
+            first_time[index] = measure
+        return first_time, again
@@ -0,0 +1,202 @@
+import array
+import pickle
+
+from .pyRealParser import __version__, PARSER_REVISION
+
+__license__ = 'MIT'
+__docformat__ = 'reStructuredText'
+
+
+class TuneIndex(object):
+    """An inverted index over parsed tunes, to search a large collection by meta-data and by chord content.
+
+    For every value of the title, composer, style, key and time signature, the index keeps the ids of the tunes that
+    have it. The chords of every tune, in the flattened order of ``measures_as_strings``, are indexed by all
+    sequences of up to ``n`` consecutive chords, and by whole measures. A query only looks up these lists of ids;
+    tunes are only looked at for chord sequences longer than ``n``, and only those which contain all of their
+    shorter sequences.
+
+    Removed tunes are left in the lists until the index is saved, and filtered out of the results.
+
+    Example:
+
+    ``index = TuneIndex(tunes)``
+    ``for tune_id in index.search(style='Bossa Nova', chords='Eb-7 Ab7 Db^7'):``
+    ``    print(index[tune_id].title)``
+    """
+
+    fields = ('title', 'composer', 'style', 'key', 'time_signature')
+
+    def __init__(self, tunes=(), n=3):
+        """
+        :param tunes: Tune objects to add
+        :param n: The longest sequence of chords that is indexed
+        """
+        self.n = n
+        self._tunes = {}
+        self._next_id = 0
+        self._removed = False
+        self._postings = {field: {} for field in self.fields}
+        self._chords = {}
+        self._measures = {}
+        for tune in tunes:
+            self.add(tune)
+
+    @staticmethod
+    def _chord_sequence(tune):
+        return [symbol for measure in tune.measures_as_strings if measure for symbol in measure.split(' ')]
+
+    @staticmethod
+    def _post(postings, key, tune_id):
+        values = postings.get(key)
+        if values is None:
+            values = postings[key] = array.array('I')
+        values.append(tune_id)
+
+    def add(self, tune):
+        """Adds a tune to the index
+
+        :param tune: A Tune object
+        :return: The id of the tune in the index
+        """
+        tune_id = self._next_id
+        self._next_id += 1
+        self._tunes[tune_id] = tune
+        for field in self.fields:
+            self._post(self._postings[field], getattr(tune, field), tune_id)
+        chords = self._chord_sequence(tune)
+        grams = set(chords)
+        for length in range(2, self.n + 1):
+            grams.update(map(' '.join, zip(*[chords[start:] for start in range(length)])))
+        post = self._post
+        for gram in grams:
+            post(self._chords, gram, tune_id)
+        for measure in set(tune.measures_as_strings):
+            post(self._measures, measure, tune_id)
+        return tune_id
+
+    def remove(self, tune_id):
+        """Removes a tune from the index
+
+        :param tune_id: The id returned by ``add``
+        """
+        del self._tunes[tune_id]
+        self._removed = True
+
+    def __getitem__(self, tune_id):
+        """
+        :param tune_id: The id returned by ``add`` or ``search``
+        :return: The Tune object
+        """
+        return self._tunes[tune_id]
+
+    def __len__(self):
+        return len(self._tunes)
+
+    def search(self, title=None, composer=None, style=None, key=None, time_signature=None, chords=None,
+               measure=None):
+        """Finds the tunes that match all of the given criteria. Meta-data has to match exactly.
+
+        :param title: The title
+        :param composer: The composer, as in ``Tune.composer``
+        :param style: The style, e.g. 'Bossa Nova'
+        :param key: The key, e.g. 'Db' or 'C-'
+        :param time_signature: The time signature as a tuple, e.g. (3, 4)
+        :param chords: A sequence of chords that follow each other, possibly across bar lines, as a string with the
+           chords separated by spaces (e.g. 'Eb-7 Ab7 Db^7') or as a list of chord symbols
+        :param measure: A whole measure, e.g. 'Eh7 A7b9'
+        :return: A sorted list of the ids of the matching tunes
+        """
+        lists = []
+        for field, value in zip(self.fields, (title, composer, style, key, time_signature)):
+            if value is not None:
+                lists.append(self._postings[field].get(value, ()))
+        if measure is not None:
+            lists.append(self._measures.get(measure, ()))
+        if chords is not None:
+            if isinstance(chords, str):
+                chords = chords.split(' ')
+            length = min(len(chords), self.n)
+            lists.extend(self._chords.get(' '.join(chords[start:start + length]), ())
+                         for start in range(len(chords) - length + 1))
+        if not lists:
+            return sorted(self._tunes)
+        lists.sort(key=len)
+        candidates = set(lists[0])
+        for values in lists[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(values)
+        if self._removed:
+            candidates = {tune_id for tune_id in candidates if tune_id in self._tunes}
+        if chords is not None and len(chords) > self.n:
+            # the shorter sequences could be in different places
+            wanted = ' {} '.format(' '.join(chords))
+            candidates = [tune_id for tune_id in candidates
+                          if wanted in ' {} '.format(' '.join(self._chord_sequence(self._tunes[tune_id])))]
+        return sorted(candidates)
+
+    def _compact(self):
+        """Takes removed tunes out of the lists of ids"""
+        if not self._removed:
+            return
+        for postings in list(self._postings.values()) + [self._chords, self._measures]:
+            for value, values in list(postings.items()):
+                kept = array.array('I', [tune_id for tune_id in values if tune_id in self._tunes])
+                if kept:
+                    postings[value] = kept
+                else:
+                    del postings[value]
+        self._removed = False
+
+    @staticmethod
+    def _join(postings):
+        """Puts all lists of ids into a single array, which is much faster to pickle than many small arrays
+
+        :return: A tuple of the keys, the length of every list and all ids
+        """
+        ids = array.array('I')
+        ids.frombytes(b''.join([values.tobytes() for values in postings.values()]))
+        return list(postings), array.array('I', map(len, postings.values())), ids
+
+    @staticmethod
+    def _split(joined):
+        keys, lengths, ids = joined
+        postings = {}
+        start = 0
+        for key, length in zip(keys, lengths):
+            postings[key] = ids[start:start + length]
+            start += length
+        return postings
+
+    def save(self, path):
+        """Writes the index, including the tunes, to a file
+
+        :param path: Path of the file
+        """
+        self._compact()
+        with open(path, 'wb') as file:
+            pickle.dump({'version': __version__, 'revision': PARSER_REVISION, 'n': self.n, 'tunes': self._tunes,
+                         'next_id': self._next_id,
+                         'postings': {field: self._join(postings) for field, postings in self._postings.items()},
+                         'chords': self._join(self._chords), 'measures': self._join(self._measures)},
+                        file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        """Reads an index written by ``save``
+
+        :param path: Path of the file
+        :return: A TuneIndex object
+        """
+        with open(path, 'rb') as file:
+            state = pickle.load(file)
+        if (state.get('version'), state.get('revision')) != (__version__, PARSER_REVISION):
+            raise RuntimeError('{} was written by a different version of the parser'.format(path))
+        index = cls(n=state['n'])
+        index._tunes = state['tunes']
+        index._next_id = state['next_id']
+        index._postings = {field: cls._split(joined) for field, joined in state['postings'].items()}
+        index._chords = cls._split(state['chords'])
+        index._measures = cls._split(state['measures'])
+        return index
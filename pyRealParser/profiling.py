@@ -0,0 +1,227 @@
+import json
+import re
+import sys
+import threading
+import time
+
+from . import pyRealParser as _parser_module
+from . import form as _form_module
+from .pyRealParser import Tune
+from .form import Form
+
+__license__ = 'MIT'
+__docformat__ = 'reStructuredText'
+
+
+# (name, class, method) of every instrumented stage, in pipeline order. 'form' reads the bar lines, repeats and
+# markers, 'unroll' expands repeats and codas; 'annotations' is only recorded when it is called directly.
+STAGES = (
+    ('unscramble', Tune, '_unscramble_chord_string'),
+    ('tokenize', Tune, '_tokenize'),
+    ('cleanup', Tune, '_cleanup_tokens'),
+    ('time signature', Tune, '_get_time_signature'),
+    ('annotations', Tune, '_remove_annotations'),
+    ('form', Tune, '_get_form_from_tokens'),
+    ('unroll', Form, '_flatten'),
+    ('single/double repeats', Tune, '_fill_single_double_repeats'),
+    ('slashes', Tune, '_fill_slashes'),
+    ('spacing', Tune, '_add_space_between_chords'),
+    ('N.C.', Tune, '_replace_no_chords'),
+)
+_REGEX_FUNCTIONS = ('compile', 'search', 'match', 'fullmatch', 'split', 'findall', 'finditer', 'sub', 'subn')
+_Pattern = type(re.compile(''))
+_PATTERN_METHODS = ('search', 'match', 'fullmatch', 'split', 'findall', 'finditer', 'sub', 'subn')
+
+
+def _size(value):
+    if isinstance(value, Form):
+        return len(value.measures)
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+class _Counting(object):
+    """Stands in for the re module or a compiled pattern, and counts the calls of its matching functions"""
+
+    def __init__(self, wrapped, names, profiler):
+        self._wrapped = wrapped
+        for name in names:
+            setattr(self, name, self._counted(getattr(wrapped, name), profiler))
+
+    @staticmethod
+    def _counted(function, profiler):
+        def counted(*args, **kwargs):
+            if threading.get_ident() == profiler._thread:
+                profiler._regex_calls += 1
+            return function(*args, **kwargs)
+        return counted
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+
+class Profiler(object):
+    """Records the wall time, the size of the input and output, and the number of regex calls of every stage
+    of the parser, for every tune and for all tunes together.
+
+    The stages are only instrumented while the profiler is active, in a ``with`` block; the rest of the time
+    the parser runs exactly as without it. Only one profiler can be active at a time, and it only sees the thread
+    that entered the ``with`` block (use ``workers=1`` with ``Tune.parse_many``, and not the asynchronous
+    functions, which parse in other threads). The instrumentation is shared by the whole process, so other threads
+    that parse at the same time are not measured, but run a little slower.
+
+    The time of a stage does not include the stages it calls, so the times of all stages add up. Sizes are the
+    length of the string or list that goes in and out, or the number of measures of a Form.
+
+    :ivar stages: Totals for every stage that was run, as a dict of dicts with the keys 'calls', 'seconds',
+       'input_size', 'output_size' and 'regex_calls'
+    :ivar tunes: Per tune: a dict with the 'title' and the 'stages' that were run while it was constructed. Stages
+       that run later, for tunes made with ``lazy=True``, only count towards the totals.
+
+    Example:
+
+    ``with Profiler() as profiler:``
+    ``    tunes = Tune.parse_ireal_url(url)``
+    ``print(profiler.to_json(indent=2))``
+    """
+
+    _active = None
+
+    def __init__(self, callback=None, per_tune=True):
+        """
+        :param callback: Optional function that is called after every stage with the name of the stage and a dict
+           of the measurements for this call, with the same keys as in ``stages``
+        :param per_tune: If False, only the totals are kept
+        """
+        self.callback = callback
+        self.per_tune = per_tune
+        self.stages = {}
+        self.tunes = []
+        self._regex_calls = 0
+        self._current_tune = None
+        # time and regex calls of the stages that are running, to subtract them from the stage that called them
+        self._nested = []
+        self._originals = []
+        # the thread that is measured
+        self._thread = None
+
+    def __enter__(self):
+        if Profiler._active is not None:
+            raise RuntimeError('Another Profiler is already active')
+        Profiler._active = self
+        self._thread = threading.get_ident()
+        for name, cls, method in STAGES:
+            self._patch(cls, method, self._instrumented(name, cls.__dict__[method]))
+        self._patch(Tune, '__init__', self._instrumented_init(Tune.__dict__['__init__']))
+        for module in (_parser_module, _form_module):
+            self._patch(module, 're', _Counting(module.re, _REGEX_FUNCTIONS, self))
+        for cls in (Tune, Form):
+            for attribute, value in list(vars(cls).items()):
+                if isinstance(value, _Pattern):
+                    self._patch(cls, attribute, _Counting(value, _PATTERN_METHODS, self))
+        return self
+
+    def __exit__(self, *exc_info):
+        for owner, attribute, original in reversed(self._originals):
+            setattr(owner, attribute, original)
+        self._originals = []
+        self._thread = None
+        Profiler._active = None
+
+    def _patch(self, owner, attribute, replacement):
+        self._originals.append((owner, attribute, owner.__dict__[attribute]))
+        setattr(owner, attribute, replacement)
+
+    def _instrumented(self, name, original):
+        profiler = self
+        is_classmethod = isinstance(original, classmethod)
+        function = original.__func__ if is_classmethod else original
+
+        def instrumented(cls_or_self, *args, **kwargs):
+            if threading.get_ident() != profiler._thread:
+                return function(cls_or_self, *args, **kwargs)
+            input_size = _size(args[0] if args else cls_or_self)
+            regex_calls = profiler._regex_calls
+            profiler._nested.append([0.0, 0])
+            start = time.perf_counter()
+            try:
+                result = function(cls_or_self, *args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                nested_seconds, nested_regex_calls = profiler._nested.pop()
+                if profiler._nested:
+                    profiler._nested[-1][0] += seconds
+                    profiler._nested[-1][1] += profiler._regex_calls - regex_calls
+            profiler._record(name, {'calls': 1, 'seconds': seconds - nested_seconds, 'input_size': input_size,
+                                    'output_size': _size(result),
+                                    'regex_calls': profiler._regex_calls - regex_calls - nested_regex_calls})
+            return result
+
+        instrumented.__name__ = function.__name__
+        instrumented.__doc__ = function.__doc__
+        return classmethod(instrumented) if is_classmethod else instrumented
+
+    def _instrumented_init(self, original):
+        profiler = self
+
+        def __init__(tune, *args, **kwargs):
+            if not profiler.per_tune or profiler._current_tune is not None or \
+                    threading.get_ident() != profiler._thread:
+                return original(tune, *args, **kwargs)
+            profiler._current_tune = {'title': None, 'stages': {}}
+            try:
+                original(tune, *args, **kwargs)
+                profiler._current_tune['title'] = tune.title
+                profiler.tunes.append(profiler._current_tune)
+            finally:
+                profiler._current_tune = None
+
+        return __init__
+
+    @staticmethod
+    def _add(stages, name, record):
+        total = stages.get(name)
+        if total is None:
+            stages[name] = dict(record)
+            return
+        for key, value in record.items():
+            if value is not None:
+                total[key] = (total[key] or 0) + value
+
+    def _record(self, name, record):
+        self._add(self.stages, name, record)
+        if self._current_tune is not None:
+            self._add(self._current_tune['stages'], name, record)
+        if self.callback is not None:
+            self.callback(name, record)
+
+    def as_dict(self):
+        """
+        :return: The measurements as plain dicts and lists, with the keys 'stages' and 'tunes'
+        """
+        return {'stages': {name: dict(record) for name, record in self.stages.items()},
+                'tunes': [{'title': tune['title'],
+                           'stages': {name: dict(record) for name, record in tune['stages'].items()}}
+                          for tune in self.tunes]}
+
+    def to_json(self, **kwargs):
+        """
+        :param kwargs: Passed on to ``json.dumps``
+        :return: The measurements as a JSON string, see ``as_dict``
+        """
+        return json.dumps(self.as_dict(), **kwargs)
+
+    def report(self, file=None):
+        """Prints a table of the totals for every stage
+
+        :param file: Where to print to, by default sys.stdout
+        """
+        file = file or sys.stdout
+        print('{:24} {:>8} {:>12} {:>12} {:>12}'.format('stage', 'calls', 'seconds', 'regex calls', 'output size'),
+              file=file)
+        for name, record in self.stages.items():
+            print('{:24} {:>8} {:>12.6f} {:>12} {:>12}'.format(name, record['calls'], record['seconds'],
+                                                               record['regex_calls'],
+                                                               record['output_size'] or '-'), file=file)
@@ -1,11 +1,65 @@
 import re
 import urllib.parse
 import itertools
+import functools
+import operator
+import os
+import codecs
+import io
+import collections
+import heapq
+import time
 
+from .compact import CompactChords
+from .chords import chord_table
+from .transposition import transpose_chords
+from .form import Form
+
+__version__ = '0.2.0'
+# revision of the output of the parser: bump it whenever the same song is parsed into a different Tune, so that tunes
+# cached or saved by another revision are not used. test_parser_revision fails until this is done.
+PARSER_REVISION = 4
 __license__ = 'MIT'
 __docformat__ = 'reStructuredText'
 
 
+class _TokenTable(dict):
+    """Maps tokens to their replacement in one stage of the parser, based on the kind of the token.
+    Tokens are classified the first time they are seen and remembered afterwards.
+    """
+
+    def __init__(self, replacements):
+        """
+        :param replacements: A dict mapping kinds of tokens to replacement strings. Tokens of other kinds are
+           kept as they are.
+        """
+        super().__init__()
+        self.replacements = replacements
+
+    def __missing__(self, token):
+        replacement = self.replacements.get(Tune._token_kind(token), token)
+        # comments and alternative chords rarely repeat, so don't remember them
+        if token[0] not in '<(':
+            self[token] = replacement
+        return replacement
+
+
+class _lazy_attribute(object):
+    """Like a read-only property, but the value is only computed once and then stored in the instance,
+    where it takes precedence over the descriptor.
+    """
+
+    def __init__(self, function):
+        self.function = function
+        self.__doc__ = function.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = instance.__dict__[self.function.__name__] = self.function(instance)
+        return value
+
+
 class Tune(object):
     """Represents the chords in a song, with functionality to import the iReal format.
 
@@ -22,16 +76,60 @@ class Tune(object):
     :ivar bpm: Tempo in BPM (usually empty)
     :ivar repeats: How many repeats (usually empty)
     :ivar time_signature: Time signature as a tuple (e.g. (3,4), (4, 4), (5, 8) etc.)
+    :ivar compact_chords: The flattened chords as a ``CompactChords`` object: arrays of measure indices, beats and
+       ids in a shared chord vocabulary, which can be handed to NumPy without copying
+    :ivar chords: The chords of every measure as a list of ``Chord`` objects, one list per measure of
+       ``measures_as_strings``
+    :ivar form: The form of the tune as written, as a ``Form`` object: sections, repeats, endings, segno and codas
 
 
     Notice, that some of these meta-data fields might
-    be empty, depending on the input url.
+    be empty, depending on the input url. The fields of a song are separated by '=', and empty fields are kept:
+    ``title=composer==style=key=transpose=1r34LbKcu7chords=comp_style=bpm=repeats``
     """
 
     _chords_prefix = """1r34LbKcu7"""
+    # _obfusc50 swaps characters 0-4 and 10-23 of a block with their mirror images 45-49 and 26-39
+    _obfusc50_permutation = tuple(49 - i if i < 5 or 10 <= i < 24 or 26 <= i < 40 or i >= 45 else i for i in range(50))
+    _obfusc50_getter = operator.itemgetter(*_obfusc50_permutation)
 
     chord_regex = re.compile(r'(?<!/)([A-GNn][^A-GN/]*(?:/[A-GN][#b]?)?)')
 
+    _token_regex = re.compile(r"""
+          [A-GW][#b]?[-+^ho\d#b]*(?:(?:sus|alt|add)[-+^ho\d#b]*)*(?:/[A-G][#b]?)?  # chord
+        | (?:XyQ|[\s,])+                                                       # empty space
+        | LZ | [K|]                                                            # bar lines
+        | N\d                                                                  # numbered ending
+        | \*(?:\s*\*|\w)                                                       # (empty) section marker
+        | T\d+                                                                 # time signature
+        | <[^>\n]*>                                                            # comment
+        | \([^)]*\)                                                            # alternative chord
+        | cl | al | lt | sus                                                   # keep these together
+        | .                                                                    # any other single character
+        """, re.VERBOSE | re.DOTALL)
+    _token_kinds = {'|': 'bar', 'LZ': 'bar', 'K': 'bar', '[': 'section_start', ']': 'section_end',
+                    '{': 'repeat_start', '}': 'repeat_end', 'Z': 'final', 'x': 'repeat_one', 'cl': 'repeat_one',
+                    'r': 'repeat_two', 'p': 'slash', 'n': 'no_chord', 'Y': 'spacer', 'S': 'segno', 'Q': 'coda',
+                    'U': 'end', 'f': 'fermata', 's': 'small', 'l': 'large'}
+    _annotation_kinds = ('comment', 'alternate', 'fermata', 'small', 'large', 'section', 'time_signature')
+
+    _empty_measure_regex = re.compile(r'\|\s*\|')
+    _space_after_bar_regex = re.compile(r'\|\s+')
+    _whitespace_regex = re.compile(r'\s+')
+    _time_signature_regex = re.compile(r'T(\d)(\d)')
+    _url_regex = re.compile(r'irealb://([^"]+)')
+    _markers_regex = re.compile(r'U|S|Q|N\d')
+
+    # replacements for every stage that works on tokens, by kind of token; other tokens are kept as they are
+    _cleanup_table = _TokenTable({'bar': '|', 'repeat_one': 'x', 'empty_section': '', 'spacer': '', 'space': ' '})
+    _annotation_table = _TokenTable(dict({'section_start': '|', 'section_end': '|'},
+                                         **dict.fromkeys(_annotation_kinds, '\x01')))
+    # section markers are kept for Form, which takes them out of the measures
+    _measure_table = _TokenTable(dict(_cleanup_table.replacements, section_start='|', section_end='|', final='',
+                                      **dict.fromkeys((kind for kind in _annotation_kinds if kind != 'section'), '')))
+    # set by _set_chord_string, to make the chart only when it is used
+    _make_chord_string = None
+
     @classmethod
     def _obfusc50(cls, block):
         """Unscrambles blocks of 50 by character substitution
@@ -39,16 +137,16 @@ class Tune(object):
         :param block: A string of 50 characters
         :return: An unscrambled string
         """
-        result = list(block)
-        # switch first 5 characters with last 5
-        for i in range(5):
-            result[i] = block[49 - i]
-            result[49 - i] = block[i]
-        # switch characters 10-24 like before:
-        for i in range(10, 24):
-            result[i] = block[49 - i]
-            result[49 - i] = block[i]
-        return ''.join(result)
+        return ''.join(cls._obfusc50_getter(block))
+
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _unscramble_getter(cls, blocks):
+        """Makes a function that unscrambles several blocks of 50 characters in one go
+        :param blocks: The number of blocks
+        :return: An itemgetter, which returns the unscrambled characters as a tuple
+        """
+        return operator.itemgetter(*[50 * block + i for block in range(blocks) for i in cls._obfusc50_permutation])
 
     @classmethod
     def _unscramble_chord_string(cls, scrambled_string):
@@ -57,47 +155,99 @@ class Tune(object):
         :param scrambled_string: A scrambled chord string, corresponding to one tune
         :return: An unscrambled chord string.
         """
-        unscrambled = ""
-        while len(scrambled_string) > 50:
-            temp = scrambled_string[:50]
-            scrambled_string = scrambled_string[50:]
-            if len(scrambled_string) < 2:
-                unscrambled += temp
-            else:
-                unscrambled += cls._obfusc50(temp)
-        unscrambled += scrambled_string
-        return unscrambled
+        # every full block of 50 is scrambled, unless less than two characters follow it
+        blocks = max(0, (len(scrambled_string) - 2) // 50)
+        if blocks == 0:
+            return scrambled_string
+        return ''.join(cls._unscramble_getter(blocks)(scrambled_string)) + scrambled_string[50 * blocks:]
 
     @classmethod
-    def _cleanup_chord_string(cls, chord_string):
-        """Removes excessive whitespace, unnecessary stuff, empty measures etc. and return a nice,
-        readable string
-        :param chord_string: unscrambled chords in string form
+    def _unscramble_chord_strings(cls, scrambled_strings):
+        """Unscrambles many songs at once. If NumPy is installed, the scrambled blocks of all songs are put into a
+        single array and unscrambled with one indexing operation.
+        :param scrambled_strings: A list of scrambled chord strings
+        :return: A list of unscrambled chord strings
+        """
+        try:
+            import numpy
+        except ImportError:
+            return [cls._unscramble_chord_string(scrambled_string) for scrambled_string in scrambled_strings]
+        lengths = [50 * max(0, (len(scrambled_string) - 2) // 50) for scrambled_string in scrambled_strings]
+        scrambled = ''.join([scrambled_string[:length] for scrambled_string, length in zip(scrambled_strings, lengths)])
+        # UTF-32 has one code unit per character, so a character's index stays the same in the array
+        characters = numpy.frombuffer(scrambled.encode('utf-32-le'), dtype=numpy.uint32).reshape(-1, 50)
+        unscrambled = characters[:, list(cls._obfusc50_permutation)].tobytes().decode('utf-32-le')
+        result = []
+        start = 0
+        for scrambled_string, length in zip(scrambled_strings, lengths):
+            result.append(unscrambled[start:start + length] + scrambled_string[length:])
+            start += length
+        return result
+
+    @classmethod
+    @functools.lru_cache(maxsize=4096)
+    def _token_kind(cls, token):
+        """Classifies a single token as returned by ``_tokenize``
+        :param token: The text of the token
+        :return: The kind of the token, e.g. 'chord', 'bar', 'space', 'comment' or 'other'
+        """
+        kind = cls._token_kinds.get(token)
+        if kind is not None:
+            return kind
+        first = token[0]
+        if first in 'ABCDEFGW':
+            return 'chord'
+        if first.isspace() or first == ',' or token.startswith('XyQ'):
+            return 'space'
+        if len(token) > 1:
+            if first == '*':
+                return 'empty_section' if token.endswith('*') else 'section'
+            if first == 'N':
+                return 'ending'
+            if first == 'T':
+                return 'time_signature'
+            if first == '<':
+                return 'comment'
+            if first == '(':
+                return 'alternate'
+        return 'other'
+
+    @classmethod
+    def _tokenize(cls, chord_string):
+        """Splits a chord string into tokens in a single pass. Every character ends up in exactly one token,
+        so joining the tokens gives back the original string. Use ``_token_kind`` to find out what a token is.
+        :param chord_string: An unscrambled chord string
+        :return: A list of tokens (as strings)
+        """
+        return cls._token_regex.findall(chord_string)
+
+    @classmethod
+    def _cleanup_tokens(cls, tokens):
+        """Builds the cleaned up chord string from a list of tokens, see ``_cleanup_chord_string``
+        :param tokens: A list of tokens, as returned by ``_tokenize``
         :return: cleaned up chord string
         """
-        # unify symbol for new measure to |
-        chord_string = re.sub(r'LZ|K', '|', chord_string)
-        # unify symbol for no chord to n
-        # chord_string = re.sub(r'[np]', 'n', chord_string)
-        # unify symbol for one-bar repeat to x
-        chord_string = re.sub(r'cl', 'x', chord_string)
-        # remove stars with empty space in between
-        chord_string = re.sub(r'\*\s*\*', '', chord_string)
-        # remove vertical spacers
-        chord_string = re.sub(r'Y+', '', chord_string)
-        # remove empty space
-        chord_string = re.sub(r'XyQ|,', ' ', chord_string)
+        # unify bar lines and one-bar repeats, remove empty sections, spacers and empty space
+        chord_string = ''.join(map(cls._cleanup_table.__getitem__, tokens))
         # remove empty measures
-        chord_string = re.sub(r'\|\s*\|', '|', chord_string)
+        chord_string = cls._empty_measure_regex.sub('|', chord_string)
         # remove end markers
-        chord_string = re.sub(r'Z', '', chord_string)
-        # remove spaces behing bar lines
-        chord_string = re.sub(r'\|\s+', '|', chord_string)
+        chord_string = chord_string.replace('Z', '')
+        # remove spaces behind bar lines
+        chord_string = cls._space_after_bar_regex.sub('|', chord_string)
         # remove multiple white-spaces
-        chord_string = re.sub(r'\s+', ' ', chord_string)
+        chord_string = cls._whitespace_regex.sub(' ', chord_string)
         # remove trailing white-space
-        chord_string = chord_string.rstrip()
-        return chord_string
+        return chord_string.rstrip()
+
+    @classmethod
+    def _cleanup_chord_string(cls, chord_string):
+        """Removes excessive whitespace, unnecessary stuff, empty measures etc. and return a nice,
+        readable string
+        :param chord_string: unscrambled chords in string form
+        :return: cleaned up chord string
+        """
+        return cls._cleanup_tokens(cls._tokenize(chord_string))
 
     @classmethod
     def _remove_annotations(cls, chord_string):
@@ -105,100 +255,17 @@ class Tune(object):
         :param chord_string: A chord string
         :return: A cleaned up chord string
         """
-        # unify symbol for new measure to |
-        chord_string = re.sub(r'[\[\]]', '|', chord_string)
-        # remove empty measures
-        chord_string = re.sub(r'\|\s*\|', '|', chord_string)
-        # remove comments
-        chord_string = re.sub(r'<.*?>', '', chord_string)
-        # remove alternative chords
-        chord_string = re.sub(r'\([^)]*\)', '', chord_string)
-        # remove unneeded single f (fermata)
-        chord_string = re.sub(r'f', '', chord_string)
-        # remove l unless it's part of an alt chord
-        chord_string = re.sub(r'(?<!a)l(?!t)', '', chord_string)
-        # remove s (for 'small), unless it's part of a sus chord
-        chord_string = re.sub(r'(?<!su)s(?!us)', '', chord_string)
-        # remove section markers
-        chord_string = re.sub(r'\*\w', '', chord_string)
-        # remove time signatures
-        chord_string = re.sub(r'T\d+', '', chord_string)
-        # remove the star that's sometimes after augmented chords
-        chord_string = re.sub(r'\+\*', '+', chord_string)
-        return chord_string
+        # unify symbol for new measure to |, mark annotations for removal
+        chord_string = ''.join(map(cls._annotation_table.__getitem__, cls._tokenize(chord_string)))
+        # remove empty measures (annotations still count as content here)
+        chord_string = cls._empty_measure_regex.sub('|', chord_string)
+        # remove the annotations and the star that's sometimes after augmented chords
+        return chord_string.replace('\x01', '').replace('+*', '+')
 
     @classmethod
     def _remove_markers(cls, chord_string):
         # remove part markers, segnos, codas etc
-        return re.sub(r'U|S|Q|N\d', '', chord_string)
-
-    @classmethod
-    def _fill_long_repeats(cls, chord_string):
-        """Replaces long repeats with multiple endings with the appropriate chords
-        :param chord_string: A chord string
-        :return: A chord string with filled repeats
-        """
-        repeat_match = re.search(r'{(.+?)}', chord_string)
-        if repeat_match is None:
-            return chord_string
-        # is there a first ending in the repeat?
-        number_match = re.search(r'N(\d)', repeat_match.group(1))
-        if number_match is not None:
-            first_repeat = repeat_match.group(1)
-            # first, get rid of the first repeat number and the curly braces
-            first_repeat = re.sub(r'N\d', '', first_repeat)
-            # add bar line after curly brace if required:
-            if re.match(r'\}\s*\|.*', chord_string[repeat_match.end()-1:]):
-                bar_line = ''
-            else:
-                bar_line = '|'
-            new_chord_string = chord_string[:repeat_match.start()] + '|' + first_repeat + bar_line + \
-                               chord_string[repeat_match.end():]
-
-            # remove the first repeat ending as well as segnos and codas from the saved repeat
-            repeat = cls._remove_markers(re.search(r'([^N]+)N\d', repeat_match.group(1)).group(1))
-            # find the next repeat ending markers and insert the repeated chords before them
-            while True:
-                if re.search(r'[|}]\s*N(\d)', new_chord_string) is None:
-                    break
-                new_chord_string = re.sub(r'\|\s*N(\d)', '|' + repeat, new_chord_string)
-            return new_chord_string
-        else:
-            # it's only a simple repeat: easy!
-            new_chord_string = chord_string[:repeat_match.start()] + '|' + repeat_match.group(1) + \
-                               ' |' + cls._remove_markers(repeat_match.group(1)) + chord_string[
-                                                                                   repeat_match.end():] + '|'
-            # there could be another repeat somewhere, so:
-            new_chord_string = cls._fill_long_repeats(new_chord_string)
-            return new_chord_string
-
-    @classmethod
-    def _fill_codas(cls, chord_string):
-        """Flatten D.C. al Coda and D.S. al Coda
-        :param chord_string: A chord string
-        :return: A chord string with filled D.C. or D.S.
-        """
-
-        qs = chord_string.count('Q')
-        if qs > 2:
-            raise RuntimeError('Could not parse codas: number of Qs expected to be 0, 1 or 2, not {}!'.format(qs))
-
-        # coda is used to indicate an outro: just get rid of it!
-        if qs == 1:
-            chord_string = chord_string.replace('Q', '')
-
-        # this implies a repeat from the head or a segno to the first 'Q' and then a jump to the second 'Q'
-        if qs == 2:
-            q1, q2 = [pos for pos, char in enumerate(chord_string) if char == 'Q']
-            segno = chord_string.find('S')
-            if segno == -1:
-                segno = 0
-            coda = chord_string[q2 + 1:]
-            repeat = chord_string[segno + 1:q1]
-            new_chord_string = chord_string[:q2] + repeat + ' |' + coda
-            new_chord_string = re.sub(r'[QS]', '', new_chord_string)
-            return new_chord_string
-        return chord_string
+        return cls._markers_regex.sub('', chord_string)
 
     @classmethod
     def _fill_single_double_repeats(cls, measures):
@@ -206,20 +273,38 @@ class Tune(object):
         :param measures: A list of measures (as strings)
         :return: A list of measures with filled repeats
         """
-        # single repeats:
-        for i in range(1, len(measures)):
-            if measures[i] == 'x':
-                measures[i] = cls._remove_markers(measures[i - 1])
-        # double repeats:
-        i = 2
-        while i < len(measures):
-            if measures[i] == 'r':
-                first = cls._remove_markers(measures[i-2])
-                second = cls._remove_markers(measures[i-1])
-                measures = measures[:i] + [first, second] + measures[i+1:]
-                i += 1
-            i += 1
-        return measures
+        filled = []
+        # the previous measure as written, with single repeats filled, but not double repeats
+        previous = None
+        for index, measure in enumerate(measures):
+            if measure == 'x' and index > 0:
+                measure = cls._remove_markers(previous)
+            previous = measure
+            if measure == 'r' and len(filled) >= 2:
+                first, second = filled[-2:]
+                filled.append(cls._remove_markers(first))
+                filled.append(cls._remove_markers(second))
+            else:
+                filled.append(measure)
+        return filled
+
+    @staticmethod
+    def _repeat_widths(measures):
+        """Counts how many measures every measure becomes in ``_fill_single_double_repeats``
+        :param measures: A list of measures (as strings)
+        :return: A list with 2 for every two-measure repeat (and one-measure repeat right after one) that is filled,
+           and 1 for every other measure
+        """
+        widths = []
+        count = 0
+        previous = None
+        for index, measure in enumerate(measures):
+            if measure != 'x' or index == 0:
+                previous = measure
+            width = 2 if previous == 'r' and count >= 2 else 1
+            widths.append(width)
+            count += width
+        return widths
 
     @classmethod
     def _fill_slashes(cls, measures):
@@ -227,17 +312,35 @@ class Tune(object):
         :param measures: List of measures (as strings)
         :return: A list of measures with filled slashes
         """
-        for i in range(1, len(measures)):
-            while measures[i].find('p') != -1:
-                slash = measures[i].find('p')
-                if slash == 0:
-                    prev_chord = cls.chord_regex.findall(measures[i - 1])[-1]
-                    measures[i] = prev_chord + measures[i][1:]
-                    measures[i] = re.sub(r'^(p+)', prev_chord, measures[i])
-                else:
-                    prev_chord = cls.chord_regex.findall(measures[i][:slash])[-1]
-                    measures[i] = measures[i][:slash] + prev_chord + measures[i][slash + 1:]
-        return measures
+        filled = measures[:1]
+        for measure in itertools.islice(measures, 1, None):
+            if 'p' in measure:
+                if measure[0] == 'p':
+                    # repeat the last chord of the previous measure
+                    measure = cls.chord_regex.findall(filled[-1])[-1] + measure[1:]
+                measure = cls._fill_slashes_in_measure(measure)
+            filled.append(measure)
+        return filled
+
+    @classmethod
+    @functools.lru_cache(maxsize=4096)
+    def _fill_slashes_in_measure(cls, measure):
+        """Replace the slash symbols in a single measure that starts with a chord, see ``_fill_slashes``
+        :param measure: A measure with at least one slash, but not at the start
+        :return: The measure with filled slashes
+        """
+        pieces = measure.split('p')
+        # the measure up to the next slash, starting with its last chord: scanning from there finds the same
+        # chords as scanning the whole measure, so every slash only looks at the text since the previous one
+        tail = pieces[0]
+        result = [tail]
+        for piece in itertools.islice(pieces, 1, None):
+            last_match = list(cls.chord_regex.finditer(tail))[-1]
+            chord = last_match.group(1)
+            tail = tail[last_match.start():] + chord + piece
+            result.append(chord)
+            result.append(piece)
+        return ''.join(result)
 
     @classmethod
     def _add_space_between_chords(cls, measures):
@@ -263,32 +366,53 @@ class Tune(object):
         return measures
 
     @classmethod
-    def _get_measures(cls, chord_string):
-        """Splits a chord string into a list of measures, where empty measures are discarded.
-        Cleans up the chord string, removes annotations, and handles repeats & codas as well.
-        :param chord_string: A chord string
+    def _get_form_from_tokens(cls, tokens):
+        """Parses the form of a tokenized chord string, see ``Form``
+        :param tokens: A list of tokens, as returned by ``_tokenize``
+        :return: A Form object
+        """
+        # cleanup and removal of annotations in one go: only bar lines, repeats, markers and chords are left
+        return Form.parse(''.join(map(cls._measure_table.__getitem__, tokens)))
+
+    @classmethod
+    def _get_measures_from_tokens(cls, tokens):
+        """Splits a tokenized chord string into a list of measures, see ``_get_measures``
+        :param tokens: A list of tokens, as returned by ``_tokenize``
         :return: A list of measures, with the contents of every measure as a string
         """
-        chord_string = cls._cleanup_chord_string(chord_string)
-        chord_string = cls._remove_annotations(chord_string)
-        chord_string = cls._fill_long_repeats(chord_string)
-        chord_string = cls._fill_codas(chord_string)
-        measures = re.split(r'\||LZ|K|Z|{|}|\[|\]', chord_string)
-        measures = [measure.replace(' ', '') for measure in measures if measure.strip() != '']
-        measures = cls._fill_single_double_repeats(measures)
-        measures = cls._fill_slashes(measures)
+        return cls._fill_measures(cls._get_form_from_tokens(tokens)._flatten())
+
+    @classmethod
+    def _fill_measures(cls, measures):
+        """Fills repeats and slashes in the unrolled measures, and separates the chords
+        :param measures: A list of measures as played, see ``Form._flatten``
+        :return: A list of measures, with the contents of every measure as a string
+        """
+        if 'x' in measures or 'r' in measures:
+            measures = cls._fill_single_double_repeats(measures)
+        if any('p' in measure for measure in measures):
+            measures = cls._fill_slashes(measures)
         measures = cls._add_space_between_chords(measures)
         measures = cls._replace_no_chords(measures)
 
         return measures
 
+    @classmethod
+    def _get_measures(cls, chord_string):
+        """Splits a chord string into a list of measures, where empty measures are discarded.
+        Cleans up the chord string, removes annotations, and handles repeats & codas as well.
+        :param chord_string: A chord string
+        :return: A list of measures, with the contents of every measure as a string
+        """
+        return cls._get_measures_from_tokens(cls._tokenize(chord_string))
+
     @classmethod
     def _get_time_signature(cls, chord_string):
         """Get the time signature form a chord string
         :param chord_string: A chord string containing a time signature
         :return: Time signature as a tuple, e.g. (3, 4)
         """
-        match = re.search(r'T(\d)(\d)', chord_string)
+        match = cls._time_signature_regex.search(chord_string)
         if match is not None:
             a = int(match.group(1))
             b = int(match.group(2))
@@ -296,31 +420,115 @@ class Tune(object):
         else:
             return 4, 4
 
-    def __init__(self, tune_string):
+    def __init__(self, tune_string, lazy=False, compact=False):
         """Make a new Tune object from a scrambled string extracted from a url, corresponding to a
         single tune. Note: This function will *not* accept a full iReal url, e.g. a string starting with *ireal://* -
         use ``parse_ireal_url`` for this.
         :param tune_string: Scrambled string for a single tune
+        :param lazy: If True, only the meta-data is read right away. The chords (``raw_chord_string``,
+           ``chord_string``, ``time_signature`` and ``measures_as_strings``) are parsed when they are first used.
+           Errors in the chords will then also only show up at that point.
+        :param compact: If True, only ``compact_chords`` is kept after parsing, and ``measures_as_strings`` is
+           made from it when it is first used. This saves a lot of memory for large collections of tunes.
+        """
+        # empty fields are kept, so that every field is read from its position
+        fields = tune_string.split('=')
+        chords = fields[6] if len(fields) > 6 else ''
+        if not chords.startswith(self._chords_prefix):
+            raise ValueError('Expected the chords in field 7 of the song, found {!r}'.format(chords[:20]))
+        self.title = fields[0]
+        self.composer = fields[1]
+        self.style = fields[3]
+        self.key = fields[4]
+        self.transpose = int(fields[5]) if fields[5] else None
+        self._chords_scrambled = chords[len(self._chords_prefix):]
+        comp_style, bpm, repeats = (fields[7:] + ['', '', ''])[:3]
+        self.comp_style = comp_style or None
+        self.bpm = bpm or None
+        self.repeats = repeats or None
+
+        if not lazy:
+            tokens = self._tokenize(self.raw_chord_string)
+            self.chord_string = self._cleanup_tokens(tokens)
+            self.time_signature = self._get_time_signature(self.chord_string)
+            form = self._get_form_from_tokens(tokens)
+            measures = self._fill_measures(form._flatten())
+            if compact:
+                self.compact_chords = CompactChords.from_measures(measures, self.time_signature[0])
+            else:
+                # kept, so that the chart is not parsed again when the form is used
+                self.form = form
+                self.measures_as_strings = measures
+
+    # with lazy=True, these are computed on first access
+    @_lazy_attribute
+    def _chords_scrambled(self):
+        # scrambling is its own inverse
+        return self._unscramble_chord_string(self.raw_chord_string)
+
+    @_lazy_attribute
+    def raw_chord_string(self):
+        if self._make_chord_string is not None:
+            return self._make_chord_string()
+        return self._unscramble_chord_string(self._chords_scrambled)
+
+    @_lazy_attribute
+    def chord_string(self):
+        return self._cleanup_chord_string(self.raw_chord_string)
+
+    @_lazy_attribute
+    def time_signature(self):
+        return self._get_time_signature(self.chord_string)
+
+    @_lazy_attribute
+    def measures_as_strings(self):
+        if 'compact_chords' in self.__dict__:
+            return self.compact_chords.measures_as_strings()
+        return self._fill_measures(self.form._flatten())
+
+    @_lazy_attribute
+    def chords(self):
+        return [[chord_table[symbol] for symbol in measure.split(' ')] if measure else []
+                for measure in self.measures_as_strings]
+
+    @_lazy_attribute
+    def form(self):
+        return self._get_form_from_tokens(self._tokenize(self.raw_chord_string))
+
+    @_lazy_attribute
+    def compact_chords(self):
+        return CompactChords.from_measures(self.measures_as_strings, self.time_signature[0])
+
+    def _set_chord_string(self, raw_chord_string, form=None, measures=None):
+        """Replaces the chart of the tune, e.g. after it was edited. Everything that depends on the chart is made
+        again when it is used next, unless it is given.
+
+        :param raw_chord_string: The new chart, unscrambled, or a function without arguments that returns it, which
+           is called when the chart is used next
+        :param form: The Form of the new chart, if it is known
+        :param measures: The measures of the new chart as played, if they are known
+        """
+        for attribute in ('raw_chord_string', '_chords_scrambled', 'chord_string', 'time_signature',
+                          'measures_as_strings', 'chords', 'form', 'compact_chords'):
+            self.__dict__.pop(attribute, None)
+        if callable(raw_chord_string):
+            self._make_chord_string = raw_chord_string
+        else:
+            self._make_chord_string = None
+            self.raw_chord_string = raw_chord_string
+        if form is not None:
+            self.form = form
+        if measures is not None:
+            self.measures_as_strings = measures
+
+    def transposed(self, target=None):
+        """Transposes the chords of the tune, see ``transpose_many``
+
+        :param target: The key to transpose to, e.g. 'Eb', or the number of semitones to transpose up. By default,
+           the tune is transposed by ``transpose``.
+        :return: The transposed chords as a ``CompactChords`` object
         """
-        parts = re.split(r"=+", tune_string)
-        self.title = parts[0]
-        self.composer = parts[1]
-        self.style = parts[2]
-        self.key = parts[3]
-        offset = 0
-        self.transpose = None
-        if parts[4].index(self._chords_prefix) != 0:
-            offset = 1
-            self.transpose = int(parts[4])
-        chords_scrambled = parts[4 + offset].split(self._chords_prefix)[1]
-        self.comp_style = len(parts) > 5 + offset and parts[5 + offset] or None
-        self.bpm = len(parts) > 6 + offset and parts[6 + offset] or None
-        self.repeats = len(parts) > 7 + offset and parts[7 + offset] or None
-
-        self.raw_chord_string = self._unscramble_chord_string(chords_scrambled)
-        self.chord_string = self._cleanup_chord_string(self.raw_chord_string)
-        self.time_signature = self._get_time_signature(self.chord_string)
-        self.measures_as_strings = self._get_measures(self.chord_string)
+        return self.transpose_many([self], target)[0]
 
     def __repr__(self):
         """A nice representation containing the meta-data and the chords
@@ -345,31 +553,680 @@ class Tune(object):
             result += '|\n'
         return result
 
+    def to_song(self):
+        """Makes the string of the tune in the iReal format, which can be put in an iReal url or passed to the
+        constructor. Empty fields are left empty, and empty fields at the end are left out, so parsing the string
+        gives the same tune again.
+
+        The chords are scrambled as in iReal. Scrambling is its own inverse, so it uses the same permutation as
+        unscrambling, and the scrambled chords of a tune that has not been edited are reused as they are.
+
+        :return: A song string, e.g. 'Title=Composer==Style=Key==1r34LbKcu7...=Medium Swing=120=0'
+        """
+        tail = [self.comp_style or '', self.bpm or '', self.repeats or '']
+        while tail and not tail[-1]:
+            tail.pop()
+        return '='.join([self.title, self.composer, '', self.style, self.key,
+                         '' if self.transpose is None else str(self.transpose),
+                         self._chords_prefix + self._chords_scrambled] + tail)
+
+    # iReal leaves ASCII letters, digits and the characters '-=<>' as they are in its urls, and escapes everything
+    # else, including the UTF-8 bytes of other letters. The escape of every byte of the UTF-8 encoded text, by the
+    # character with the same code; str.translate is faster than urllib.parse.quote.
+    _url_escapes = {byte: chr(byte) if chr(byte).isascii() and chr(byte).isalnum() or chr(byte) in '-=<>'
+                    else '%{:02X}'.format(byte) for byte in range(256)}
+
     @staticmethod
-    def parse_ireal_url(url):
-        """Parses iReal urls into human- and machine-readable formats
+    def _quote(text):
+        """
+        :return: The text, escaped for a url
+        """
+        return text.encode('utf-8').decode('latin-1').translate(Tune._url_escapes)
 
-        :param url: A url containing one or more tunes
-        :return: A list of Tune objects
+    @staticmethod
+    def _url_parts(tunes, name=None):
+        """
+        :return: A generator of the escaped parts of an iReal url, see ``to_ireal_url``
+        """
+        yield 'irealb://'
+        separator = Tune._quote('===')
+        first = True
+        for tune in tunes:
+            if not first:
+                yield separator
+            first = False
+            yield Tune._quote(tune.to_song())
+        if name is not None:
+            yield separator + Tune._quote(name)
+
+    @staticmethod
+    def to_ireal_url(tunes, name=None):
+        """Makes an iReal url from tunes, e.g. to merge playlists. ``parse_ireal_url`` reads it back.
+
+        :param tunes: Tune objects
+        :param name: The name of the playlist. iReal needs one if there is more than one tune. With an empty name,
+           the url ends with the separator '===', as after a single song.
+        :return: A url starting with 'irealb://', escaped as in the urls of the iReal app
 
         Example:
 
-        ``list_of_tunes = Tune.parse_ireal_url('irealb://Example%20Song=Composer...)```
+        ``url = Tune.to_ireal_url(Tune.parse_ireal_url(url_1) + Tune.parse_ireal_url(url_2), 'Merged')``
+        """
+        return ''.join(Tune._url_parts(tunes, name))
+
+    @staticmethod
+    def write_ireal(stream, tunes, name=None):
+        """Writes an iReal url to a file object, one tune at a time, so this works for playlists of any size and
+        for generators of tunes, e.g. ``iter_ireal``. ``iter_ireal`` reads it back.
+
+        :param stream: A file object in text or binary mode
+        :param tunes: Tune objects. SongError objects, e.g. from ``iter_ireal``, are left out.
+        :param name: The name of the playlist, see ``to_ireal_url``
+        :return: The number of tunes that were written
+
+        Example:
+
+        ``with open('playlist.html', 'rb') as f, open('normalized.txt', 'w') as out:``
+        ``    Tune.write_ireal(out, Tune.iter_ireal(f), 'Normalized')``
+        """
+        binary = not isinstance(stream, io.TextIOBase)
+        count = 0
+
+        def counted():
+            nonlocal count
+            for tune in tunes:
+                if tune:
+                    count += 1
+                    yield tune
+        for part in Tune._url_parts(counted(), name):
+            stream.write(part.encode('ascii') if binary else part)
+        return count
+
+    @staticmethod
+    def _split_ireal_url(url, offsets=False):
+        """Splits an iReal url into the strings of the individual songs. The name of the playlist, which comes after
+        the last song, is left out.
+        :param url: A url containing one or more tunes
+        :param offsets: If True, the offset of every song in the decoded url is returned as well
+        :return: A list of song strings, which can be passed to the constructor, or of (offset, song) tuples
         """
         url = urllib.parse.unquote(url)
-        match = re.match(r'irealb://([^"]+)', url)
+        match = Tune._url_regex.match(url)
         if match is None:
             raise RuntimeError('Provided string is not a valid iReal url!')
         # split url into individual songs along ===
-        songs = re.split("===", match.group(1))
-        tunes = []
-        for song in songs:
+        songs = []
+        offset = match.start(1)
+        for song in match.group(1).split('==='):
             if song != '':
-                try:
-                    tune = Tune(song)
-                    tunes.append(tune)
-                    print('Parsed {}'.format(tune.title))
-                except Exception as err:
-                    print('Could not import song', song)
-                    print(str(err))
+                songs.append((offset, song))
+            offset += len(song) + 3
+        if songs and '=' not in songs[-1][1]:
+            songs.pop()
+        return songs if offsets else [song for offset, song in songs]
+
+    @staticmethod
+    def parse_ireal_url(url, strict=False, report=None):
+        """Parses iReal urls into human- and machine-readable formats. Songs that cannot be parsed are left out,
+        and logged as warnings to the 'pyRealParser' logger.
+
+        :param url: A url containing one or more tunes
+        :param strict: If True, a song that cannot be parsed raises a ``SongParseError``
+        :param report: A ``ParseReport`` to which the outcome and parsing time of every song are added
+        :return: A list of Tune objects
+
+        Example:
+
+        ``list_of_tunes = Tune.parse_ireal_url('irealb://Example%20Song=Composer...)```
+        """
+        tunes = []
+        for offset, song in Tune._split_ireal_url(url, offsets=True):
+            result = _check_song(song, offset, False, strict, report)
+            if result:
+                tunes.append(result)
+            else:
+                result.log()
         return tunes
+
+    @staticmethod
+    def iter_ireal(stream, chunk_size=65536, lazy=False, strict=False, report=None):
+        """Reads an iReal url from a file object and yields the tunes one by one, as soon as they have been read.
+        Only one song at a time is kept in memory, so this works for playlists of any size. The url may also be
+        embedded in other text, e.g. in an html file.
+
+        :param stream: A file object in text or binary mode, e.g. an open file or ``socket.makefile('rb')``
+        :param chunk_size: How many characters or bytes to read at once
+        :param lazy: Passed on to the constructor: if True, the chords are only parsed when they are used
+        :param strict: If True, a song that cannot be parsed raises a ``SongParseError``
+        :param report: A ``ParseReport`` to which the outcome and parsing time of every song are added
+        :return: A generator of Tune objects, or SongError objects for songs that could not be parsed
+
+        Example:
+
+        ``with open('playlist.html', 'rb') as f:``
+        ``    for tune in Tune.iter_ireal(f):``
+        ``        print(tune.title)``
+        """
+        splitter = _SongSplitter()
+        while not splitter.finished:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            for offset, song in splitter.feed(chunk):
+                yield _check_song(song, offset, lazy, strict, report)
+        for offset, song in splitter.close():
+            yield _check_song(song, offset, lazy, strict, report)
+
+    @staticmethod
+    async def aparse_ireal_url(url, executor=None, concurrency=4, lazy=False):
+        """Parses an iReal url without blocking the event loop: the songs are parsed in an executor, and the loop
+        runs while they are parsed. Nothing is printed; songs that cannot be parsed are returned as SongError objects.
+
+        :param url: A url containing one or more tunes
+        :param executor: The ``concurrent.futures.Executor`` to parse in. Defaults to the default executor of the
+           loop, which is a thread pool. Pass a ``ProcessPoolExecutor`` to parse on several CPUs.
+        :param concurrency: How many songs are handed to the executor at a time
+        :param lazy: Passed on to the constructor: if True, the chords are only parsed when they are used
+        :return: A list with one entry per song, in order: a Tune object, or a SongError if the song could not be
+           parsed
+
+        Example:
+
+        ``tunes = await Tune.aparse_ireal_url('irealb://...')``
+        """
+        import asyncio
+        songs = await asyncio.get_running_loop().run_in_executor(executor, Tune._split_ireal_url, url, True)
+        return [tune async for tune in _aparse_songs(_aiter_list(songs), executor, concurrency, lazy)]
+
+    @staticmethod
+    async def aiter_ireal(reader, chunk_size=65536, executor=None, concurrency=4, lazy=False):
+        """Asynchronous version of ``iter_ireal``: reads an iReal url from an asyncio stream, and yields the tunes
+        in order while they are parsed in an executor. At most ``concurrency`` songs are parsed ahead of the
+        consumer, and the stream is only read as fast as the tunes are consumed. If the consumer stops early or is
+        cancelled, the songs that are still waiting are cancelled.
+
+        :param reader: An object with a coroutine ``read(n)``, e.g. an ``asyncio.StreamReader``, that returns
+           bytes or strings of an iReal url, possibly surrounded by other text (e.g. an html page)
+        :param chunk_size: How much to read at once
+        :param executor: The ``concurrent.futures.Executor`` to parse in, see ``aparse_ireal_url``
+        :param concurrency: How many songs are handed to the executor at a time
+        :param lazy: Passed on to the constructor: if True, the chords are only parsed when they are used
+        :return: An asynchronous generator of Tune objects, and SongError objects for songs that could not be parsed
+
+        Example:
+
+        ``async for tune in Tune.aiter_ireal(reader):``
+        ``    print(tune.title)``
+        """
+        async for tune in _aparse_songs(_aiter_stream(reader, chunk_size), executor, concurrency, lazy):
+            yield tune
+
+    @staticmethod
+    def parse_many(urls_or_songs, workers=None, executor=None, chunksize=None, lazy=False, strict=False,
+                   report=None):
+        """Parses many songs at once, using a pool of processes
+
+        :param urls_or_songs: An iterable of iReal urls (each containing one or more tunes) and/or strings of
+           single songs, as accepted by the constructor
+        :param workers: Number of worker processes. Defaults to the number of CPUs. With a single worker,
+           everything is parsed in the current process.
+        :param executor: An existing ``concurrent.futures.Executor`` to use instead of starting a new process
+           pool. It is not shut down afterwards.
+        :param chunksize: How many songs are sent to a worker at once. By default, the songs are split into about
+           four chunks per worker.
+        :param lazy: Passed on to the constructor: if True, the chords are only parsed when they are used
+        :param strict: If True, the first song that could not be parsed raises a ``SongParseError``, after all songs
+           have been parsed
+        :param report: A ``ParseReport`` to which the outcome and parsing time of every song are added. The songs
+           are timed in the worker processes.
+        :return: A list with one entry per song, in input order: a Tune object, or a SongError if the song could
+           not be parsed. The offsets of the songs are those in their url. A url that is not a valid iReal url
+           gives a single SongError with the stage 'url'.
+
+        Example:
+
+        ``results = Tune.parse_many(['irealb://...', 'irealb://...'], workers=4)``
+        """
+        songs = []
+        offsets = []
+        # the position in the results of every url that could not be split into songs, and its SongError
+        bad_urls = []
+        for url_or_song in urls_or_songs:
+            if url_or_song.startswith('irealb'):
+                try:
+                    split = Tune._split_ireal_url(url_or_song, offsets=True)
+                except RuntimeError as err:
+                    bad_urls.append((len(songs) + len(bad_urls), SongError(url_or_song, err, 'url')))
+                    continue
+                for offset, song in split:
+                    songs.append(song)
+                    offsets.append(offset)
+            else:
+                songs.append(url_or_song)
+                offsets.append(None)
+        parse_song = functools.partial(_parse_song if report is None else _parse_song_timed, lazy=lazy)
+        workers = workers or os.cpu_count() or 1
+        if executor is None and (workers == 1 or len(songs) < 2):
+            results = list(map(parse_song, songs, offsets))
+        else:
+            if chunksize is None:
+                chunksize = max(1, len(songs) // (4 * workers))
+            if executor is not None:
+                results = list(executor.map(parse_song, songs, offsets, chunksize=chunksize))
+            else:
+                import concurrent.futures
+                with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(parse_song, songs, offsets, chunksize=chunksize))
+        for index, song_error in bad_urls:
+            results.insert(index, song_error if report is None else (song_error, 0.0))
+        if report is not None:
+            for result, seconds in results:
+                report.add(result, seconds)
+            results = [result for result, seconds in results]
+        if strict:
+            for result in results:
+                if not result:
+                    raise SongParseError(result) from result.error
+        return results
+
+    @staticmethod
+    def dump_corpus(tunes, path):
+        """Writes parsed tunes to a compact binary file, which ``load_corpus`` can open without parsing them again.
+        The file holds the meta-data, the time signatures and ``compact_chords`` of the tunes, and their scrambled
+        chord strings, from which the other attributes can be made when they are needed. The format is described
+        in the ``corpus`` module.
+
+        :param tunes: An iterable of Tune objects
+        :param path: Path of the file to write
+
+        Example:
+
+        ``Tune.dump_corpus(Tune.parse_ireal_url(url), 'tunes.irlc')``
+        """
+        from .corpus import dump_corpus
+        dump_corpus(tunes, path)
+
+    @staticmethod
+    def load_corpus(path):
+        """Opens a file written by ``dump_corpus``. The file is memory-mapped, and every tune is only read when it is
+        accessed, so this is almost instant even for large corpora.
+
+        :param path: Path of the file
+        :return: A ``Corpus`` object, which gives the Tune objects by index, e.g. ``corpus[0]``, and can be
+           iterated over
+        """
+        from .corpus import load_corpus
+        return load_corpus(path)
+
+    @staticmethod
+    def transpose_many(tunes, target=None):
+        """Transposes the chords of many tunes, e.g. a whole corpus to a common key. The roots and bass notes keep
+        their function in the key, e.g. F#-7b5 in a tune in C becomes A-7b5 in Eb. If NumPy is installed, the chords
+        of all tunes are transposed in a single array operation.
+
+        :param tunes: An iterable of Tune objects
+        :param target: The key to transpose to, e.g. 'Eb'. Only the tonic is used, so a tune in C- goes to Eb-.
+           Can also be a number of semitones to transpose up. By default, every tune is transposed by its own
+           ``transpose``.
+        :return: A list with the transposed chords of every tune as a ``CompactChords`` object. The transposed key
+           can be found with ``transposition.transpose_key``.
+
+        Example:
+
+        ``all_keys = [Tune.transpose_many(tunes, semitones) for semitones in range(12)]``
+        """
+        tunes = list(tunes)
+        targets = [tune.transpose or 0 if target is None else target for tune in tunes]
+        return transpose_chords([tune.compact_chords for tune in tunes], [tune.key for tune in tunes], targets)
+
+
+class _SongSplitter(object):
+    """Splits an iReal url into songs, while the url arrives in chunks. Percent-escapes and multi-byte characters
+    that are cut in half by a chunk boundary are held back until the rest arrives.
+
+    :ivar finished: True once the end of the url (a double quote) has been seen
+    """
+
+    _prefix = 'irealb://'
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._pending = None
+        self._buffer = ''
+        # the offset of the buffer in the decoded url
+        self._offset = len(self._prefix)
+        self._started = False
+        self.finished = False
+
+    def feed(self, chunk):
+        """Adds the next chunk of the url
+        :param chunk: A string or bytes object
+        :return: A list of (offset in the decoded url, song) tuples of the songs that have been completed by this
+           chunk
+        """
+        if self.finished:
+            return []
+        if self._pending:
+            chunk = self._pending + chunk
+        # hold back a percent-escape that is cut off at the end of the chunk
+        percent = '%' if isinstance(chunk, str) else b'%'
+        if chunk[-1:] == percent:
+            hold = 1
+        elif chunk[-2:-1] == percent:
+            hold = 2
+        else:
+            hold = 0
+        self._pending = chunk[len(chunk) - hold:]
+        text = self._decoder.decode(urllib.parse.unquote_to_bytes(chunk[:len(chunk) - hold]))
+        return self._add_text(text)
+
+    def close(self):
+        """Signals the end of the url
+        :return: A list with the last song, if there is one, as an (offset, song) tuple
+        """
+        songs = []
+        if not self.finished:
+            songs = self._add_text(self._decoder.decode(urllib.parse.unquote_to_bytes(self._pending or ''), True))
+        if not self._started:
+            raise RuntimeError('Provided string is not a valid iReal url!')
+        last_song = self._buffer.strip()
+        self._buffer = ''
+        self.finished = True
+        return songs + self._last_song(last_song)
+
+    def _last_song(self, song):
+        # the name of the playlist comes after the last song
+        return [(self._offset, song)] if '=' in song else []
+
+    def _add_text(self, text):
+        if not self._started:
+            text = self._buffer + text
+            start = text.find(self._prefix)
+            if start == -1:
+                # keep enough to find the prefix if it is cut in half
+                self._buffer = text[-len(self._prefix) + 1:]
+                return []
+            self._started = True
+            self._buffer = ''
+            text = text[start + len(self._prefix):]
+        end = text.find('"')
+        if end != -1:
+            text = text[:end]
+        # a separator might start in the last two characters of what we already have
+        search_start = max(0, len(self._buffer) - 2)
+        self._buffer += text
+        songs = []
+        while True:
+            boundary = self._buffer.find('===', search_start)
+            if boundary == -1:
+                break
+            if boundary:
+                songs.append((self._offset, self._buffer[:boundary]))
+            self._buffer = self._buffer[boundary + 3:]
+            self._offset += boundary + 3
+            search_start = 0
+        if end != -1:
+            self.finished = True
+            songs += self._last_song(self._buffer)
+            self._buffer = ''
+        return songs
+
+
+class SongError(object):
+    """Takes the place of a song that could not be parsed in the results of ``Tune.parse_many``
+
+    :ivar song: The string of the song
+    :ivar title: The title of the song, as far as it could be found
+    :ivar error: The exception that was raised while parsing
+    :ivar stage: The stage of the parser that failed, e.g. 'url' (for a url that could not be split into songs),
+       'fields' (the meta-data), 'unscramble', 'form' or 'slashes', see ``profiling.STAGES``. None if the song
+       could be parsed when the stages were run one by one.
+    :ivar offset: The offset of the song in the decoded url, if it came from a url
+    """
+
+    def __init__(self, song, error, stage=None, offset=None):
+        self.song = song
+        self.title = song.split('=', 1)[0]
+        self.error = error
+        self.stage = stage
+        self.offset = offset
+
+    @property
+    def error_class(self):
+        """The name of the class of the exception, e.g. 'IndexError'"""
+        return type(self.error).__name__
+
+    def log(self, logger=None):
+        """Logs the error as a warning, without the song itself. The SongError is passed to the handlers as the
+        attribute ``song_error`` of the log record.
+
+        :param logger: A ``logging.Logger``. Defaults to the 'pyRealParser' logger.
+        """
+        if logger is None:
+            import logging
+            logger = logging.getLogger('pyRealParser')
+        logger.warning('Could not parse song %r at offset %s in stage %s: %s: %s', self.title, self.offset,
+                       self.stage, self.error_class, self.error, extra={'song_error': self})
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return 'SongError({!r}: {!r} in stage {!r})'.format(self.title, self.error, self.stage)
+
+
+class SongParseError(RuntimeError):
+    """Raised by the batch functions of Tune in strict mode, for the first song that could not be parsed. The
+    original exception is its ``__cause__``.
+
+    :ivar song_error: The SongError of the song
+    """
+
+    def __init__(self, song_error):
+        super().__init__('Could not parse song {!r} at offset {} in stage {}: {}: {}'.format(
+            song_error.title, song_error.offset, song_error.stage, song_error.error_class, song_error.error))
+        self.song_error = song_error
+
+
+class ParseReport(object):
+    """Sums up the parsing of a batch of songs: how many were parsed, the failures by stage and by exception, and
+    the slowest songs. Pass it as ``report`` to ``Tune.parse_ireal_url``, ``iter_ireal`` or ``parse_many``, or add
+    results to it yourself.
+
+    :ivar parsed: The number of songs that were parsed
+    :ivar failed: The number of songs that could not be parsed
+    :ivar seconds: The total time spent parsing
+    :ivar stages: A ``collections.Counter`` of the failed songs by stage
+    :ivar errors: A ``collections.Counter`` of the failed songs by the class of the exception
+
+    Example:
+
+    ``report = ParseReport()``
+    ``tunes = Tune.parse_ireal_url(url, report=report)``
+    ``report.log()``
+    """
+
+    def __init__(self, slowest=10):
+        """
+        :param slowest: How many of the slowest songs to keep
+        """
+        self.parsed = 0
+        self.failed = 0
+        self.seconds = 0.0
+        self.stages = collections.Counter()
+        self.errors = collections.Counter()
+        self._slowest_count = slowest
+        # a heap of (seconds, number, title) of the slowest songs
+        self._slowest = []
+
+    def add(self, result, seconds=0.0):
+        """Adds the result of one song
+
+        :param result: A Tune or SongError object
+        :param seconds: How long the song took to parse
+        """
+        if result:
+            self.parsed += 1
+        else:
+            self.failed += 1
+            self.stages[result.stage] += 1
+            self.errors[result.error_class] += 1
+        self.seconds += seconds
+        entry = (seconds, self.parsed + self.failed, result.title)
+        if len(self._slowest) < self._slowest_count:
+            heapq.heappush(self._slowest, entry)
+        elif self._slowest and entry > self._slowest[0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    @property
+    def songs(self):
+        """The number of songs"""
+        return self.parsed + self.failed
+
+    @property
+    def slowest(self):
+        """A list of (title, seconds) tuples of the slowest songs, the slowest first"""
+        return [(title, seconds) for seconds, number, title in sorted(self._slowest, reverse=True)]
+
+    def as_dict(self):
+        """
+        :return: The report as plain dicts and lists, e.g. for ``json.dumps``
+        """
+        return {'songs': self.songs, 'parsed': self.parsed, 'failed': self.failed, 'seconds': self.seconds,
+                'stages': dict(self.stages), 'errors': dict(self.errors),
+                'slowest': [list(entry) for entry in self.slowest]}
+
+    def __str__(self):
+        lines = ['{} songs, {} parsed, {} failed in {:.3f}s'.format(self.songs, self.parsed, self.failed,
+                                                                  self.seconds)]
+        if self.stages:
+            lines.append('failures by stage: ' + ', '.join('{}: {}'.format(stage, count)
+                                                           for stage, count in self.stages.most_common()))
+            lines.append('failures by error: ' + ', '.join('{}: {}'.format(error, count)
+                                                           for error, count in self.errors.most_common()))
+        if self._slowest:
+            lines.append('slowest: ' + ', '.join('{!r} ({:.2f}ms)'.format(title, seconds * 1e3)
+                                                 for title, seconds in self.slowest))
+        return '\n'.join(lines)
+
+    def log(self, logger=None, level=None):
+        """Logs the report, one line at a time
+
+        :param logger: A ``logging.Logger``. Defaults to the 'pyRealParser' logger.
+        :param level: The level of the messages, by default ``logging.INFO``
+        """
+        import logging
+        if logger is None:
+            logger = logging.getLogger('pyRealParser')
+        for line in str(self).split('\n'):
+            logger.log(logging.INFO if level is None else level, '%s', line, extra={'parse_report': self})
+
+
+async def _aiter_list(songs):
+    for song in songs:
+        yield song
+
+
+async def _aiter_stream(reader, chunk_size):
+    splitter = _SongSplitter()
+    while not splitter.finished:
+        chunk = await reader.read(chunk_size)
+        if not chunk:
+            break
+        for offset_and_song in splitter.feed(chunk):
+            yield offset_and_song
+    for offset_and_song in splitter.close():
+        yield offset_and_song
+
+
+async def _aparse_songs(songs, executor, concurrency, lazy):
+    """Parses songs in an executor, with at most ``concurrency`` of them in flight
+    :param songs: An asynchronous iterable of (offset, song) tuples
+    :return: An asynchronous generator of Tune and SongError objects, in the order of the songs
+    """
+    import asyncio
+    loop = asyncio.get_running_loop()
+    parse_song = functools.partial(_parse_song, lazy=lazy)
+    pending = collections.deque()
+    try:
+        async for offset, song in songs:
+            pending.append(loop.run_in_executor(executor, parse_song, song, offset))
+            if len(pending) >= concurrency:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _parse_song(song, offset=None, lazy=False):
+    """Parses a single song, returning a SongError instead of raising. Lives at module level,
+    so it can be sent to worker processes.
+    :param song: A scrambled string for a single tune
+    :param offset: The offset of the song in its url, for the SongError
+    :param lazy: Passed on to the constructor
+    :return: A Tune or SongError object
+    """
+    try:
+        return Tune(song, lazy)
+    except Exception as err:
+        return SongError(song, err, _failed_stage(song, lazy), offset)
+
+
+def _parse_song_timed(song, offset=None, lazy=False):
+    """Like ``_parse_song``, but also measures the time
+    :return: A tuple of the Tune or SongError object and the seconds it took
+    """
+    start = time.perf_counter()
+    result = _parse_song(song, offset, lazy)
+    return result, time.perf_counter() - start
+
+
+def _check_song(song, offset, lazy, strict, report):
+    """Parses a single song for the batch functions of Tune, see ``parse_ireal_url``"""
+    if report is None:
+        result = _parse_song(song, offset, lazy)
+    else:
+        result, seconds = _parse_song_timed(song, offset, lazy)
+        report.add(result, seconds)
+    if strict and not result:
+        raise SongParseError(result) from result.error
+    return result
+
+
+def _failed_stage(song, lazy=False):
+    """Finds the stage of the parser in which a song fails, by running the stages of the constructor one by one.
+    This is only done after the constructor has failed, so parsing songs that work does not get slower.
+    :param song: A scrambled string for a single tune
+    :param lazy: Passed on to the constructor
+    :return: The name of the stage, as in ``profiling.STAGES``, 'fields' for the meta-data, or None if the song
+       can be parsed
+    """
+    stage = 'fields'
+    try:
+        tune = Tune(song, lazy=True)
+        if not lazy:
+            stage = 'unscramble'
+            raw_chord_string = tune.raw_chord_string
+            stage = 'tokenize'
+            tokens = Tune._tokenize(raw_chord_string)
+            stage = 'cleanup'
+            chord_string = Tune._cleanup_tokens(tokens)
+            stage = 'time signature'
+            Tune._get_time_signature(chord_string)
+            stage = 'form'
+            form = Tune._get_form_from_tokens(tokens)
+            stage = 'unroll'
+            measures = form._flatten()
+            stage = 'single/double repeats'
+            measures = Tune._fill_single_double_repeats(measures)
+            stage = 'slashes'
+            measures = Tune._fill_slashes(measures)
+            stage = 'spacing'
+            measures = Tune._add_space_between_chords(measures)
+            stage = 'N.C.'
+            Tune._replace_no_chords(measures)
+    except Exception:
+        return stage
+    return None
@@ -0,0 +1,159 @@
+"""Similarity of chord progressions, e.g. to find contrafacts or variants of the blues in a large collection.
+
+Every tune is turned into a vector of fixed size: the counts of its chord qualities, and of the sequences of two and
+three chords, described by their qualities and the intervals between their roots. A chord that is held over several
+measures counts once. The counts are hashed into ``dim`` buckets, weighted by how rare they are in the collection
+and normalized, so the dot product of two vectors is their cosine similarity. As only intervals are used, a tune has
+the same vector in every key.
+
+NumPy is needed for this module.
+"""
+import array
+import numbers
+
+from .chords import chord_table, chord_qualities, pitch_class
+from .compact import chord_vocabulary
+
+__license__ = 'MIT'
+__docformat__ = 'reStructuredText'
+
+_qualities = sorted(chord_qualities)
+# the root (0-11, or 12 for none) and quality (index in _qualities, or len(_qualities) for none) by chord id
+_roots = array.array('B')
+_quality_indices = array.array('B')
+# separates the codes of sequences of different lengths before they are hashed
+_length_offset = 10 ** 7
+
+
+def _chord_features(size):
+    """
+    :param size: The arrays have to cover the chord ids up to this number
+    :return: The roots and qualities of all chords in ``chord_vocabulary`` as NumPy arrays
+    """
+    import numpy
+    for chord_id in range(len(_roots), size):
+        chord = chord_table[chord_vocabulary.symbols[chord_id]]
+        _roots.append(12 if chord.root is None else pitch_class(chord.root))
+        _quality_indices.append(_qualities.index(chord.quality) if chord.quality in _qualities else len(_qualities))
+    return numpy.frombuffer(_roots, dtype=numpy.uint8)[:size], numpy.frombuffer(_quality_indices,
+                                                                                  dtype=numpy.uint8)[:size]
+
+
+class SimilarityIndex(object):
+    """Finds the tunes with the most similar chord progressions, by the cosine similarity of their vectors.
+
+    :ivar tunes: The tunes, in the order of the rows of ``vectors``
+    :ivar vectors: A NumPy array with one normalized row for every tune
+    :ivar idf: The weight of every bucket
+
+    Example:
+
+    ``index = SimilarityIndex(tunes)``
+    ``for position, similarity in index.most_similar(tunes[0], k=5):``
+    ``    print(index.tunes[position].title, similarity)``
+    """
+
+    def __init__(self, tunes, dim=1024, n=3):
+        """
+        :param tunes: Tune objects
+        :param dim: The size of the vectors
+        :param n: The longest sequence of chords that is counted, up to 3
+        """
+        import numpy
+        self.tunes = list(tunes)
+        self.dim = dim
+        self.n = n
+        counts = self._counts([tune.compact_chords for tune in self.tunes])
+        frequencies = numpy.count_nonzero(counts, axis=0)
+        self.idf = (numpy.log((1 + len(self.tunes)) / (1 + frequencies)) + 1).astype(numpy.float32)
+        self.vectors = self._normalize(counts)
+
+    def _counts(self, compact_chords):
+        """
+        :param compact_chords: A list of ``CompactChords``
+        :return: A NumPy array with the counts of every bucket, one row for every tune
+        """
+        import numpy
+        lengths = [len(chords) for chords in compact_chords]
+        chord_ids = numpy.frombuffer(b''.join([chords.chords.tobytes() for chords in compact_chords]), dtype='I')
+        tunes = numpy.repeat(numpy.arange(len(compact_chords)), lengths)
+        # chords that are held count once
+        kept = numpy.ones(len(chord_ids), dtype=bool)
+        kept[1:] = (chord_ids[1:] != chord_ids[:-1]) | (tunes[1:] != tunes[:-1])
+        chord_ids = chord_ids[kept]
+        tunes = tunes[kept]
+        roots, qualities = _chord_features(len(chord_vocabulary.symbols))
+        roots = roots[chord_ids].astype(numpy.int64)
+        codes = qualities[chord_ids].astype(numpy.int64)
+        rows = [tunes]
+        columns = [codes]
+        quality_count = len(_qualities) + 1
+        for length in range(2, self.n + 1):
+            same_tune = tunes[length - 1:] == tunes[:1 - length]
+            root, previous_root = roots[length - 1:], roots[length - 2:-1]
+            interval = numpy.where((root == 12) | (previous_root == 12), 12, (root - previous_root) % 12)
+            codes = (codes[:-1] * 13 + interval) * quality_count + qualities[chord_ids[length - 1:]]
+            rows.append(tunes[length - 1:][same_tune])
+            columns.append(codes[same_tune] + (length - 1) * _length_offset)
+        # spread the codes evenly over the buckets
+        columns = numpy.concatenate(columns) * 2654435761 % 2 ** 32 % self.dim
+        counts = numpy.bincount(numpy.concatenate(rows) * self.dim + columns, minlength=len(compact_chords) * self.dim)
+        return counts.reshape(len(compact_chords), self.dim).astype(numpy.float32)
+
+    def _normalize(self, counts):
+        import numpy
+        vectors = numpy.sqrt(counts) * self.idf
+        norms = numpy.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+    def vectorize(self, tunes):
+        """Makes the vectors of other tunes, e.g. to search for them
+
+        :param tunes: Tune objects
+        :return: A NumPy array with one row for every tune
+        """
+        return self._normalize(self._counts([tune.compact_chords for tune in tunes]))
+
+    def nearest(self, vectors, k=10, block_size=4096):
+        """Finds the most similar tunes for many vectors at once. The similarities are computed by multiplying the
+        vectors with ``block_size`` rows of ``vectors`` at a time, so the memory does not grow with the collection.
+
+        :param vectors: A NumPy array of vectors, e.g. from ``vectorize`` or rows of ``vectors``
+        :param k: How many tunes to find for every vector
+        :param block_size: How many tunes are compared at once
+        :return: Two NumPy arrays with a row for every vector: the positions of the tunes in ``tunes``, and their
+           similarities, from the most similar tune on
+        """
+        import numpy
+        vectors = numpy.atleast_2d(numpy.asarray(vectors, dtype=numpy.float32))
+        k = min(k, len(self.vectors))
+        positions = numpy.zeros((len(vectors), 0), dtype=numpy.int64)
+        similarities = numpy.zeros((len(vectors), 0), dtype=numpy.float32)
+        for start in range(0, len(self.vectors), block_size):
+            block = self.vectors[start:start + block_size]
+            # the best k so far, and all tunes of this block
+            similarities = numpy.hstack([similarities, vectors @ block.T])
+            positions = numpy.hstack([positions, numpy.broadcast_to(numpy.arange(start, start + len(block)),
+                                                                    (len(vectors), len(block)))])
+            if similarities.shape[1] > k:
+                top = numpy.argpartition(-similarities, k - 1, axis=1)[:, :k]
+                similarities = numpy.take_along_axis(similarities, top, axis=1)
+                positions = numpy.take_along_axis(positions, top, axis=1)
+        order = numpy.argsort(-similarities, axis=1, kind='stable')
+        return numpy.take_along_axis(positions, order, axis=1), numpy.take_along_axis(similarities, order, axis=1)
+
+    def most_similar(self, tune, k=10):
+        """Finds the tunes with the most similar chord progression
+
+        :param tune: A Tune object, or the position of a tune in ``tunes``, which is then left out of the result
+        :param k: How many tunes to find
+        :return: A list of (position in ``tunes``, similarity) tuples, from the most similar tune on
+        """
+        if isinstance(tune, numbers.Integral):
+            positions, similarities = self.nearest(self.vectors[tune], k + 1)
+            return [(position, similarity) for position, similarity in zip(positions[0].tolist(),
+                                                                          similarities[0].tolist())
+                    if position != tune][:k]
+        positions, similarities = self.nearest(self.vectorize([tune]), k)
+        return list(zip(positions[0].tolist(), similarities[0].tolist()))
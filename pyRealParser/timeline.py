@@ -0,0 +1,308 @@
+"""Playback timelines: every chord of a tune as played, with its onset and duration in beats and in seconds.
+
+The timeline is made from ``Tune.compact_chords`` and ``Tune.time_signature``, so the chart is not parsed again. As
+in ``CompactChords``, the chords are spread evenly over their measure, e.g. two chords in 4/4 start on beats 0 and 2.
+A chord lasts until the next chord, or until the end of the tune. The beats are those of the time signature, e.g.
+eighth notes in 6/8, and the tempo is taken to count them as well. Changes of the time signature within a tune are not
+taken into account. The section labels come from ``Tune.form``, which is parsed the first time it is used.
+
+NumPy is needed for the timelines. ``MidiWriter`` writes them to a Standard MIDI File, one tune after the other, so
+only the events of one tune are kept in memory at a time.
+"""
+import bisect
+import functools
+import itertools
+import struct
+
+from .pyRealParser import Tune
+from .chords import chord_table, pitch_class
+from .compact import chord_vocabulary
+
+__license__ = 'MIT'
+__docformat__ = 'reStructuredText'
+
+# used for tunes without a tempo
+default_bpm = 120
+
+# semitones above the root of the notes of every chord quality
+_quality_intervals = {
+    'major': (0, 4, 7), 'minor': (0, 3, 7), 'augmented': (0, 4, 8), 'diminished': (0, 3, 6), 'suspended': (0, 5, 7),
+    'power': (0, 7), 'major7': (0, 4, 7, 11), 'dominant7': (0, 4, 7, 10), 'minor7': (0, 3, 7, 10),
+    'minor-major7': (0, 3, 7, 11), 'half-diminished7': (0, 3, 6, 10), 'diminished7': (0, 3, 6, 9),
+    'diminished-major7': (0, 3, 6, 11), 'suspended7': (0, 5, 7, 10),
+}
+_extension_intervals = {'2': 2, '6': 9, '9': 14, '11': 17, '13': 21}
+_alteration_intervals = {'b9': 13, '#9': 15, '#11': 18, 'b13': 20}
+
+
+def _dtype():
+    import numpy
+    return numpy.dtype([('tune', numpy.uint32), ('onset', numpy.float64), ('duration', numpy.float64),
+                        ('onset_seconds', numpy.float64), ('duration_seconds', numpy.float64),
+                        ('chord', numpy.uint32), ('measure', numpy.uint32), ('section', 'U1')])
+
+
+def _tempo(tune, bpm):
+    if bpm is not None:
+        return bpm
+    try:
+        tune_bpm = int(tune.bpm or 0)
+    except ValueError:
+        tune_bpm = 0
+    return tune_bpm if tune_bpm > 0 else default_bpm
+
+
+def measure_sections(tune):
+    """
+    :param tune: A Tune object
+    :return: A list with the label of the section (e.g. 'A', or '' before the first section) of every measure in
+       ``measures_as_strings``
+    """
+    form = tune.form
+    unrolled = form._unroll()
+    starts = [index for index, label in form.sections]
+    labels = [''] + [label for index, label in form.sections]
+    sections = []
+    for (index, measure), width in zip(unrolled, Tune._repeat_widths([measure for index, measure in unrolled])):
+        sections.extend([labels[bisect.bisect_right(starts, index)]] * width)
+    return sections
+
+
+def timelines(tunes, bpm=None, sections=True):
+    """Makes the timelines of many tunes at once, as one array
+
+    :param tunes: An iterable of Tune objects
+    :param bpm: The tempo in beats per minute. By default, the tempo of every tune (``Tune.bpm``) is used, or
+       ``default_bpm`` if it has none.
+    :param sections: If False, the section labels are left empty, which saves parsing the form of tunes that do not
+       have ``Tune.form`` yet
+    :return: A NumPy structured array with one row for every chord, in the order they are played, with the fields
+       ``tune`` (the position of the tune in ``tunes``), ``onset`` and ``duration`` (in beats, from the start of the
+       tune), ``onset_seconds``, ``duration_seconds``, ``chord`` (the id in ``chord_vocabulary``), ``measure`` (the
+       index in ``measures_as_strings``) and ``section`` (the label of the section)
+
+    Example:
+
+    ``events = timelines(tunes)``
+    ``first_tune = events[events['tune'] == 0]``
+    """
+    import numpy
+    tunes = list(tunes)
+    compact_chords = [tune.compact_chords for tune in tunes]
+    lengths = numpy.array([len(chords) for chords in compact_chords], dtype=numpy.int64)
+    measure_counts = numpy.array([chords.measure_count for chords in compact_chords], dtype=numpy.int64)
+    beats_per_measure = numpy.array([tune.time_signature[0] for tune in tunes], dtype=numpy.int64)
+    seconds_per_beat = numpy.array([60 / _tempo(tune, bpm) for tune in tunes], dtype=numpy.float64)
+
+    result = numpy.zeros(int(lengths.sum()), dtype=_dtype())
+    result['tune'] = tune_ids = numpy.repeat(numpy.arange(len(tunes), dtype=numpy.uint32), lengths)
+    measures = numpy.frombuffer(b''.join([chords.measures.tobytes() for chords in compact_chords]), dtype='H')
+    beats = numpy.frombuffer(b''.join([chords.beats.tobytes() for chords in compact_chords]), dtype='B')
+    result['chord'] = numpy.frombuffer(b''.join([chords.chords.tobytes() for chords in compact_chords]), dtype='I')
+    result['measure'] = measures
+    onsets = measures * beats_per_measure[tune_ids] + beats
+    # every chord lasts until the next chord of the same tune, and the last one until the end of the tune
+    ends = (measure_counts * beats_per_measure)[tune_ids]
+    same_tune = tune_ids[1:] == tune_ids[:-1]
+    ends[:-1][same_tune] = onsets[1:][same_tune]
+    result['onset'] = onsets
+    result['duration'] = ends - onsets
+    result['onset_seconds'] = result['onset'] * seconds_per_beat[tune_ids]
+    result['duration_seconds'] = result['duration'] * seconds_per_beat[tune_ids]
+    if sections and len(tunes):
+        labels = []
+        for tune, chords in zip(tunes, compact_chords):
+            tune_labels = measure_sections(tune)
+            # e.g. after the chords were changed without the chart
+            tune_labels = (tune_labels + [''] * chords.measure_count)[:chords.measure_count]
+            labels.extend(tune_labels)
+        first_measures = numpy.concatenate([[0], numpy.cumsum(measure_counts)[:-1]])
+        if labels:
+            result['section'] = numpy.array(labels, dtype='U1')[first_measures[tune_ids] + measures]
+    return result
+
+
+def timeline(tune, bpm=None, sections=True):
+    """Makes the timeline of a single tune, see ``timelines``
+
+    :param tune: A Tune object
+    :param bpm: The tempo in beats per minute, by default the tempo of the tune
+    :param sections: If False, the section labels are left empty
+    :return: A NumPy structured array with one row for every chord
+    """
+    return timelines([tune], bpm, sections)
+
+
+@functools.lru_cache(maxsize=4096)
+def chord_notes(symbol, octave=4):
+    """Voices a chord in close position above its root, with the bass note (or the root) an octave lower
+
+    :param symbol: A chord symbol, e.g. 'F^7/A'
+    :param octave: The octave of the root, as in MIDI note names (60 is C4)
+    :return: A tuple of MIDI note numbers, empty for N.C.
+    """
+    chord = chord_table[symbol]
+    if chord.root is None or chord.quality is None:
+        return ()
+    root = 12 * (octave + 1) + pitch_class(chord.root)
+    intervals = set(_quality_intervals[chord.quality])
+    for alteration in chord.alterations:
+        if alteration in ('b5', '#5'):
+            intervals.discard(7)
+            intervals.add(6 if alteration == 'b5' else 8)
+        elif alteration == 'alt':
+            intervals.update((13, 15))
+        elif alteration in _alteration_intervals:
+            intervals.add(_alteration_intervals[alteration])
+    for extension in chord.extensions:
+        interval = _extension_intervals.get(extension[3:] if extension.startswith('add') else extension)
+        if interval is not None:
+            intervals.add(interval)
+    bass = root - 12 if chord.bass is None else 12 * octave + pitch_class(chord.bass)
+    return (bass,) + tuple(root + interval for interval in sorted(intervals))
+
+
+class MidiWriter(object):
+    """Writes timelines to a Standard MIDI File (format 1) with one track per tune. The events are written while
+    they are made, and the lengths in the headers are filled in afterwards, so the file has to be seekable.
+
+    Example:
+
+    ``with MidiWriter('tunes.mid') as writer:``
+    ``    for tune in tunes:``
+    ``        writer.write_tune(tune)``
+    """
+
+    def __init__(self, file, ticks_per_quarter=480, velocity=80, channel=0):
+        """
+        :param file: Path of the file, or a binary file object
+        :param ticks_per_quarter: The resolution of the file
+        :param velocity: The velocity of all notes
+        :param channel: The MIDI channel (0-15)
+        """
+        if isinstance(file, (str, bytes)) or hasattr(file, '__fspath__'):
+            self._file = open(file, 'wb')
+            self._close_file = True
+        else:
+            self._file = file
+            self._close_file = False
+        if not self._file.seekable():
+            raise ValueError('MidiWriter needs a seekable file')
+        self.ticks_per_quarter = ticks_per_quarter
+        self.velocity = velocity
+        self.channel = channel
+        self.track_count = 0
+        self._chord_messages = {}
+        self._start = self._file.tell()
+        self._file.write(struct.pack('>4sIHHH', b'MThd', 6, 1, 0, ticks_per_quarter))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _variable_length(value):
+        data = bytearray([value & 0x7F])
+        value >>= 7
+        while value:
+            data.insert(0, value & 0x7F | 0x80)
+            value >>= 7
+        return bytes(data)
+
+    def _messages(self, chord_id):
+        """
+        :return: The note on and note off messages of a chord, for notes that all start and end at the same time,
+           without the time of the first message. False for N.C.
+        """
+        notes = chord_notes(chord_vocabulary.symbols[chord_id])
+        on = b'\x00'.join(bytes([0x90 | self.channel, note, self.velocity]) for note in notes)
+        off = b'\x00'.join(bytes([0x80 | self.channel, note, 0]) for note in notes)
+        messages = self._chord_messages[chord_id] = (on, off) if notes else False
+        return messages
+
+    def write_timeline(self, events, time_signature=(4, 4), bpm=default_bpm, name=''):
+        """Writes the chords of a timeline as a new track
+
+        :param events: Rows of a timeline, see ``timelines``. Only ``onset``, ``duration`` and ``chord`` are used.
+        :param time_signature: The time signature, as in ``Tune.time_signature``
+        :param bpm: The tempo in beats of the time signature per minute
+        :param name: The name of the track
+        """
+        import numpy
+        file = self._file
+        length_position = file.tell() + 4
+        file.write(struct.pack('>4sI', b'MTrk', 0))
+        start = file.tell()
+        numerator, denominator = time_signature
+        name = name.encode('utf-8')
+        microseconds = round(60e6 / bpm * denominator / 4)
+        file.write(b'\x00\xff\x03' + self._variable_length(len(name)) + name +
+                   b'\x00\xff\x51\x03' + microseconds.to_bytes(3, 'big') +
+                   bytes([0, 0xFF, 0x58, 4, numerator, max(denominator.bit_length() - 1, 0), 24, 8]))
+        ticks_per_beat = self.ticks_per_quarter * 4 / denominator
+        ons = numpy.rint(events['onset'] * ticks_per_beat).astype(numpy.int64)
+        offs = numpy.rint((events['onset'] + events['duration']) * ticks_per_beat).astype(numpy.int64)
+        variable_length = self._variable_length
+        chord_messages = self._chord_messages
+        data = []
+        time = 0
+        for on, off, chord_id in zip(ons.tolist(), offs.tolist(), events['chord'].tolist()):
+            messages = chord_messages.get(chord_id)
+            if messages is None:
+                messages = self._messages(chord_id)
+            if not messages or off <= on:
+                continue
+            data += (variable_length(on - time), messages[0], variable_length(off - on), messages[1])
+            time = off
+        data.append(b'\x00\xff\x2f\x00')
+        file.write(b''.join(data))
+        end = file.tell()
+        file.seek(length_position)
+        file.write(struct.pack('>I', end - start))
+        file.seek(end)
+        self.track_count += 1
+
+    def write_tune(self, tune, bpm=None):
+        """Writes the chords of a tune as a new track
+
+        :param tune: A Tune object
+        :param bpm: The tempo, by default the tempo of the tune
+        """
+        self.write_timeline(timeline(tune, bpm, sections=False), tune.time_signature, _tempo(tune, bpm), tune.title)
+
+    def close(self):
+        """Fills in the number of tracks, and closes the file if it was opened by the writer"""
+        end = self._file.tell()
+        self._file.seek(self._start + 10)
+        self._file.write(struct.pack('>H', self.track_count))
+        self._file.seek(end)
+        if self._close_file:
+            self._file.close()
+        else:
+            self._file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def write_midi(path, tunes, bpm=None, block_size=1000):
+    """Writes tunes to a MIDI file, one track per tune. The timelines are made for ``block_size`` tunes at a time,
+    so this also works for a corpus that is read lazily, e.g. from ``Corpus``.
+
+    :param path: Path of the file
+    :param tunes: An iterable of Tune objects
+    :param bpm: The tempo, by default the tempo of every tune
+    :param block_size: How many tunes are in memory at a time
+    :return: The number of tracks written
+    """
+    tunes = iter(tunes)
+    with MidiWriter(path) as writer:
+        while True:
+            block = list(itertools.islice(tunes, block_size))
+            if not block:
+                break
+            events = timelines(block, bpm, sections=False)
+            ends = events['tune'].searchsorted(range(1, len(block) + 1)).tolist()
+            for tune, start, end in zip(block, [0] + ends, ends):
+                writer.write_timeline(events[start:end], tune.time_signature, _tempo(tune, bpm), tune.title)
+    return writer.track_count
@@ -0,0 +1,200 @@
+"""Transposition of the chords of many tunes at once.
+
+Every chord id in ``chord_vocabulary`` is mapped to the id of the transposed chord by a table, which is made once per
+interval. The roots and bass notes are kept as a letter and a pitch class, so that the transposed notes keep their
+function in the key: with a tune in C, F#-7b5 becomes A-7b5 in Eb and E-7b5 in Bb. Notes that would need a double
+sharp or flat, and Cb, Fb, E# and B# unless they are in the scale of the target key, are spelled by the key signature
+of the target key instead.
+
+Transposing the chords of a tune is then a lookup in the table for each chord. With NumPy, the chords of all tunes are
+looked up with a single indexing operation.
+"""
+import array
+import functools
+import re
+
+from .chords import pitch_class
+from .compact import CompactChords, chord_vocabulary
+
+__license__ = 'MIT'
+__docformat__ = 'reStructuredText'
+
+_letters = 'CDEFGAB'
+_natural_pitches = (0, 2, 4, 5, 7, 9, 11)
+_key_regex = re.compile(r'([A-G][#b]?)(-?)')
+# the usual name of every key, by the pitch class of its tonic
+_major_keys = ('C', 'Db', 'D', 'Eb', 'E', 'F', 'Gb', 'G', 'Ab', 'A', 'Bb', 'B')
+_minor_keys = ('C', 'C#', 'D', 'Eb', 'E', 'F', 'F#', 'G', 'G#', 'A', 'Bb', 'B')
+_sharp_keys = frozenset(('G', 'D', 'A', 'E', 'B', 'F#', 'C#', 'E-', 'B-', 'F#-', 'C#-', 'G#-', 'D#-', 'A#-'))
+_sharp_names = ('C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B')
+_flat_names = ('C', 'Db', 'D', 'Eb', 'E', 'F', 'Gb', 'G', 'Ab', 'A', 'Bb', 'B')
+_unusual_names = frozenset(('Cb', 'Fb', 'E#', 'B#'))
+# semitones above the tonic of the degrees of the major and natural minor scale
+_major_steps = (0, 2, 4, 5, 7, 9, 11)
+_minor_steps = (0, 2, 3, 5, 7, 8, 10)
+
+# transposition tables by (letters, semitones, flats, allowed), see _interval
+_tables = {}
+# marks the entries of the tables that have not been made yet
+_missing = 0xFFFFFFFF
+
+
+def _note(name):
+    """
+    :param name: A note, e.g. 'Bb'
+    :return: The index of its letter in 'CDEFGAB' and its pitch class, e.g. (6, 10)
+    """
+    return _letters.index(name[0]), pitch_class(name)
+
+
+def _parse_key(key):
+    match = _key_regex.fullmatch(key or '')
+    if match is None:
+        raise ValueError('Not a key: {!r}'.format(key))
+    return match.groups()
+
+
+def transpose_key(key, semitones):
+    """Transposes a key, and spells it the usual way, e.g. Gb rather than F#, but F#- rather than Gb-
+
+    :param key: A key as in ``Tune.key``, e.g. 'Eb' or 'C-'
+    :param semitones: How many semitones to transpose up, can be negative
+    :return: The transposed key
+    """
+    tonic, minor = _parse_key(key)
+    if semitones % 12 == 0:
+        return key
+    pitch = (_note(tonic)[1] + semitones) % 12
+    return (_minor_keys if minor else _major_keys)[pitch] + minor
+
+
+@functools.lru_cache(maxsize=4096)
+def _interval(key, target):
+    """
+    :param key: The key of a tune
+    :param target: A key, or a number of semitones
+    :return: The interval as (letters, semitones, flats, allowed). flats tells how notes are spelled which can't
+       keep their letter, allowed are the notes among Cb, Fb, E# and B# that are in the scale of the target key.
+       letters is None if the tune has no key, then all notes are spelled by flats.
+    """
+    if not isinstance(target, str):
+        semitones = int(target) % 12
+        if _key_regex.fullmatch(key or '') is None:
+            return (0 if semitones == 0 else None), semitones, True, frozenset()
+        target = transpose_key(key, semitones)
+    tonic, minor = _parse_key(key)
+    target_tonic = _parse_key(target)[0]
+    letter, pitch = _note(tonic)
+    target_letter, target_pitch = _note(target_tonic)
+    scale = [_spell((target_letter + degree) % 7, target_pitch + step)
+             for degree, step in enumerate(_minor_steps if minor else _major_steps)]
+    return ((target_letter - letter) % 7, (target_pitch - pitch) % 12, target_tonic + minor not in _sharp_keys,
+            _unusual_names.intersection(scale))
+
+
+def _spell(letter, pitch):
+    """
+    :return: The name of a pitch class with the given letter, or None if that needs a double sharp or flat
+    """
+    accidental = (pitch - _natural_pitches[letter] + 6) % 12 - 6
+    if -1 <= accidental <= 1:
+        return _letters[letter] + ('', '#', 'b')[accidental]
+    return None
+
+
+def _transpose_note(name, interval):
+    letters, semitones, flats, allowed = interval
+    letter, pitch = _note(name)
+    pitch = (pitch + semitones) % 12
+    if letters is not None:
+        name = _spell((letter + letters) % 7, pitch)
+        if name is not None and (name not in _unusual_names or name in allowed):
+            return name
+    return (_flat_names if flats else _sharp_names)[pitch]
+
+
+def _transpose_symbol(chord_id, interval):
+    root = chord_vocabulary.roots[chord_id]
+    bass = chord_vocabulary.basses[chord_id]
+    if root is None and bass is None:
+        return chord_vocabulary.symbols[chord_id]
+    symbol = ('' if root is None else _transpose_note(root, interval)) + chord_vocabulary.qualities[chord_id]
+    if bass is not None:
+        symbol += '/' + _transpose_note(bass, interval)
+    return symbol
+
+
+def _table(interval, size):
+    """
+    :param interval: An interval as returned by ``_interval``
+    :param size: The table has to cover the chord ids up to this number
+    :return: An array with the id of the transposed chord for every chord id, or ``_missing`` if the chord has not
+       been transposed by this interval yet
+    """
+    table = _tables.setdefault(interval, array.array('I'))
+    if len(table) < size:
+        table.frombytes(b'\xff' * table.itemsize * (size - len(table)))
+    return table
+
+
+def _fill(table, interval, chord_id):
+    """Transposes a chord and stores it in the table
+
+    :return: The id of the transposed chord
+    """
+    if table[chord_id] == _missing:
+        table[chord_id] = chord_vocabulary[_transpose_symbol(chord_id, interval)]
+    return table[chord_id]
+
+
+def transpose_chords(compact_chords, keys, targets):
+    """Transposes the chords of many tunes
+
+    :param compact_chords: A list of ``CompactChords``
+    :param keys: The key of every tune, e.g. 'Eb' or 'C-'
+    :param targets: For every tune, the key to transpose to (only the tonic is used, so 'Eb' takes a tune in C- to
+       Eb-) or the number of semitones to transpose up
+    :return: A list of the transposed ``CompactChords``. They share the measures and beats with the original ones.
+    """
+    # index of the interval of every tune
+    interval_indices = {}
+    tune_intervals = [interval_indices.setdefault(_interval(key, target), len(interval_indices))
+                      for key, target in zip(keys, targets)]
+    intervals = list(interval_indices)
+    size = len(chord_vocabulary.symbols)
+    tables = [_table(interval, size) for interval in intervals]
+    try:
+        import numpy
+    except ImportError:
+        result = []
+        for chords, index in zip(compact_chords, tune_intervals):
+            transposed = array.array('I', map(tables[index].__getitem__, chords.chords))
+            if _missing in transposed:
+                for position, chord_id in enumerate(chords.chords):
+                    transposed[position] = _fill(tables[index], intervals[index], chord_id)
+            result.append(CompactChords(chords.measures, chords.beats, transposed, chords.measure_count))
+        return result
+    if not compact_chords:
+        return []
+    table = numpy.stack([numpy.frombuffer(table, dtype='I', count=size) for table in tables])
+    lengths = [len(chords) for chords in compact_chords]
+    chord_ids = numpy.frombuffer(b''.join([chords.chords.tobytes() for chords in compact_chords]), dtype='I')
+    which = numpy.repeat(tune_intervals, lengths)
+    transposed = table[which, chord_ids]
+    missing = numpy.flatnonzero(transposed == _missing)
+    if len(missing):
+        # transpose every chord that is not in the tables yet once, by (interval, chord id)
+        pairs, positions = numpy.unique(which[missing].astype(numpy.int64) * size + chord_ids[missing],
+                                        return_inverse=True)
+        transposed[missing] = numpy.array([_fill(tables[index], intervals[index], chord_id)
+                                           for index, chord_id in (divmod(pair, size) for pair in pairs.tolist())],
+                                          dtype=transposed.dtype)[positions]
+    all_chords = array.array('I')
+    all_chords.frombytes(transposed.tobytes())
+    result = []
+    start = 0
+    for chords, length in zip(compact_chords, lengths):
+        result.append(CompactChords(chords.measures, chords.beats, all_chords[start:start + length],
+                                    chords.measure_count))
+        start += length
+    return result
@@ -2,7 +2,7 @@ from setuptools import setup
 
 setup(
     name='pyRealParser',
-    version='0.1.0',
+    version='0.2.0',
     packages=['pyRealParser'],
     url='https://github.com/drs251/pyRealParser',
     license='MIT',
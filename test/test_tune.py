@@ -25,6 +25,26 @@ def test__unscramble_chord_string():
     assert unscrambled == Tune._unscramble_chord_string(scrambled)
 
 
+def test__unscramble_chord_strings():
+    from pyRealParser.pyRealParser import Tune
+    scrambled = ['', 'A7', 'Gé' * 25, 'Gé' * 26, 'ZLB A BLZCZLF EZLD CZLB ZALA ,GZLF EZLD G ALZA44T[C- DLZE '
+                 'FLZG A,LZA BLZC DLZE FLZG ALZA BLZC- D |E ', '0123456789' * 52]
+    assert Tune._unscramble_chord_strings(scrambled) == [Tune._unscramble_chord_string(s) for s in scrambled]
+
+
+def test__tokenize():
+    from pyRealParser.pyRealParser import Tune
+    test_string = '*A{T44C^7XyQ|N1D-7 G7sus<D.C. al Coda>LZ(Bb7)Q}|N2Eb7alt/G, pp|x Kcl  Z'
+    assert ''.join(Tune._tokenize(test_string)) == test_string
+    assert [(Tune._token_kind(token), token) for token in Tune._tokenize(test_string)] == [
+        ('section', '*A'), ('repeat_start', '{'), ('time_signature', 'T44'), ('chord', 'C^7'), ('space', 'XyQ'),
+        ('bar', '|'), ('ending', 'N1'), ('chord', 'D-7'), ('space', ' '), ('chord', 'G7sus'),
+        ('comment', '<D.C. al Coda>'), ('bar', 'LZ'), ('alternate', '(Bb7)'), ('coda', 'Q'), ('repeat_end', '}'),
+        ('bar', '|'), ('ending', 'N2'), ('chord', 'Eb7alt/G'), ('space', ', '), ('slash', 'p'), ('slash', 'p'),
+        ('bar', '|'), ('repeat_one', 'x'), ('space', ' '), ('bar', 'K'), ('repeat_one', 'cl'), ('space', '  '),
+        ('final', 'Z')]
+
+
 def test__cleanup_chord_string():
     from pyRealParser.pyRealParser import Tune
     test_string = 'T34N1A-7 |x XyQ|lC7, |cl *  *[N2F7 ][D7s *A|r |r } N4 F7sus YYY|B-7 |  E7b9'
@@ -50,40 +70,15 @@ def test__remove_markers():
     assert Tune._remove_markers(test_string) == expected_result
 
 
-def test__fill_long_repeats():
+def test__get_measures_repeats_and_codas():
     from pyRealParser.pyRealParser import Tune
     test_string = '{A-7 |B-7 |N1C7 |C7 } |N2F7 |x ][D7 |G7 |C7 |F7 ] |N3B-7 |E7b9'
-    expected_result = '|A-7 |B-7 |C7 |C7 |A-7 |B-7 |F7 |x |D7 |G7 |C7 |F7 |A-7 |B-7 |B-7 |E7b9'
-    result = Tune._fill_long_repeats(test_string)
-    result = Tune._remove_annotations(Tune._cleanup_chord_string(result))
-    assert expected_result == result
-
-    test_string = '{A-7 |B-7Q |N1C7 |C7 } |N2F7 |x'
-    expected_result = '|A-7 |B-7Q |C7 |C7 |A-7 |B-7 |F7 |x'
-    result = Tune._fill_long_repeats(test_string)
-    result = Tune._remove_annotations(Tune._cleanup_chord_string(result))
-    assert expected_result == result
-
+    expected_result = Tune._get_measures('A-7 |B-7 |C7 |C7 |A-7 |B-7 |F7 |x |D7 |G7 |C7 |F7 |A-7 |B-7 |B-7 |E7b9')
+    assert Tune._get_measures(test_string) == expected_result
     test_string = '{A-7 |B-7Q |N1C7 |C7 } N2F7 |x'
-    expected_result = '|A-7 |B-7Q |C7 |C7 |A-7 |B-7 |F7 |x'
-    result = Tune._fill_long_repeats(test_string)
-    result = Tune._remove_annotations(Tune._cleanup_chord_string(result))
-    assert result == expected_result
-
-    test_string = '|A-7 |C7 |QD7 |G7 {QC7 |E7b9}'
-    expected_result = '|A-7 |C7 |QD7 |G7 |QC7 |E7b9 |C7 |E7b9|'
-    result = Tune._fill_long_repeats(test_string)
-    result = Tune._remove_annotations(Tune._cleanup_chord_string(result))
-    assert expected_result == result
-
-
-def test__fill_codas():
-    from pyRealParser.pyRealParser import Tune
+    assert Tune._get_measures(test_string) == ['A-7', 'B-7', 'C7', 'C7', 'A-7', 'B-7', 'F7', 'F7']
     test_string = 'A7 |A7S |B7 |B7Q |C7 |C7Q |D7 |D7'
-    expected_result = 'A7 |A7 |B7 |B7 |C7 |C7 |B7 |B7 |D7 |D7'
-    result = Tune._fill_codas(test_string)
-    result = Tune._cleanup_chord_string(result)
-    assert expected_result == result
+    assert Tune._get_measures(test_string) == Tune._get_measures('A7 |A7 |B7 |B7 |C7 |C7 |B7 |B7 |D7 |D7')
 
 
 def test__fill_single_double_repeats():
@@ -132,7 +127,7 @@ def test__replace_no_chords():
 def test__get_measures():
     from pyRealParser.pyRealParser import Tune
     test_string = 'A-7 |x |C7 |x |N1F7 |D7 |r ][F7 ||B-7 |E7b9'
-    expected_result = ['A-7', 'A-7', 'C7', 'C7', 'N1 F7', 'D7', 'F7', 'D7', 'F7', 'B-7', 'E7b9']
+    expected_result = ['A-7', 'A-7', 'C7', 'C7', 'F7', 'D7', 'F7', 'D7', 'F7', 'B-7', 'E7b9']
     assert Tune._get_measures(test_string) == expected_result
 
 
@@ -155,6 +150,21 @@ def test_parse_ireal_url():
     str(Tune.parse_ireal_url(test_string))
 
 
+def test_fields():
+    import pytest
+    from pyRealParser.pyRealParser import Tune
+    tune = Tune('Test=McTest Testy==Up Tempo Swing=Eb==1r34LbKcu7[T44C^7 |A-7 Z==0=0', lazy=True)
+    assert (tune.title, tune.composer, tune.style, tune.key, tune.transpose) == \
+        ('Test', 'McTest Testy', 'Up Tempo Swing', 'Eb', None)
+    assert (tune.comp_style, tune.bpm, tune.repeats) == (None, '0', '0')
+    # empty fields do not move the fields after them
+    tune = Tune('Test===Swing==-3=1r34LbKcu7[T44C^7 |A-7 Z=Jazz-Bossa=160', lazy=True)
+    assert (tune.composer, tune.style, tune.key, tune.transpose) == ('', 'Swing', '', -3)
+    assert (tune.comp_style, tune.bpm, tune.repeats) == ('Jazz-Bossa', '160', None)
+    with pytest.raises(ValueError):
+        Tune('Test=Composer=Swing=C==1r34LbKcu7[T44C^7 |A-7 Z==0=0')
+
+
 def test_parse_ireal_url_as_long():
     from pyRealParser.pyRealParser import Tune
     url = 'irealb://%41%73%20%4C%6F%6E%67%20%41%73%20%49%20%4C%69%76%65=%41%72%6C%65%6E%20%48%61%72%6F%6C%64==%4D%6' \
@@ -170,3 +180,571 @@ def test_parse_ireal_url_as_long():
     raw = tune.raw_chord_string
     flat = tune.measures_as_strings
     pass
+
+
+def test_parse_many():
+    from pyRealParser.pyRealParser import Tune, SongError
+    url = 'irealb://Test=McTest%20Testy==Up%20Tempo%20Swing=Eb==1r34LbKcu7X7bB%7C4Eb%5E7FZL5%237C%209bB' + \
+          '%7CQy1X1-F%7CQyX7-C%7CQyX-7XyQ4TA%2A%7Bb7C%7CQ7%20B7L7-G%7CQyX7oA%7CQyX%5E7bAZL5b7A%207-bBZ%' + \
+          '2FBbXy-C%7CQy%20QyXQY%7CF-77bB%207-FZL7bG%207G-1N%7CQyX%2C7bB%7CQyX%2C%20%7DXy%7CQyX9EZL6-b6' + \
+          'XyQ%7Cr%20ZL%20%7Cr%20ZL%2C7bZEL7-bBB%2A%5B%5D%20%20lcK%20LZBbE2NZL%20dr3%20b%5E7LZ%2ED<%2C7' + \
+          'FZLxZLxZL%5E7bAl%7C%2C7bE%2C7-bBsC%2E%20alAZL7bEnd%2E>LZBb7sus%2CLZBb7%20%5DXyQXyQ%20%20Y%7C' + \
+          'N3Eb6XyQ%7CBb7XyQZ%20==0=0==='
+    expected = Tune.parse_ireal_url(url)[0].measures_as_strings
+    song = 'Song=Composer==Swing=C==1r34LbKcu7[T44C^7 |A-7 |D-7 |G7 Z==0=0'
+    inputs = [url, 'Broken==Swing=C==1r34LbKcu7', song, url]
+
+    for results in (Tune.parse_many(inputs, workers=1), Tune.parse_many(inputs, workers=2, chunksize=1)):
+        assert [type(result) for result in results] == [Tune, SongError, Tune, Tune]
+        assert results[0].measures_as_strings == expected
+        assert results[2].measures_as_strings == ['C^7', 'A-7', 'D-7', 'G7']
+        assert results[3].measures_as_strings == expected
+        assert results[1].title == 'Broken'
+        assert not results[1]
+    # a malformed url only takes its own place
+    results = Tune.parse_many([song, 'irealbook:/broken', song], workers=1)
+    assert [type(result) for result in results] == [Tune, SongError, Tune]
+    assert results[1].stage == 'url' and results[1].error_class == 'RuntimeError'
+
+
+def test_iter_ireal():
+    import io
+    from pyRealParser.pyRealParser import Tune
+    url = 'irealb://%41%73%20%4C%6F%6E%67%20%41%73%20%49%20%4C%69%76%65=%41%72%6C%65%6E%20%48%61%72%6F%6C%64==%4D%6' \
+          '5%64%69%75%6D%20%53%77%69%6E%67=%46==%31%72%33%34%4C%62%4B%63%75%37%20%37%2D%47%7C%34%46%5E%37%58%6C%5' \
+          'A%4C%37%44%20%37%2D%41%7C%51%79%58%37%5A%44%4C%2C%39%62%37%41%20%37%68%45%6C%7C%51%79%47%37%58%79%51%3' \
+          '4%54%41%2A%5B%5B%5D%51%79%58%31%46%5E%37%20%62%42%20%37%5E%46%32%4E%5A%4C%20%51%79%58%79%51%58%7D%20%3' \
+          '7%43%20%37%2D%47%5A%4C%37%2D%44%37%4C%5A%46%36%4E%5A%4C%37%43%37%47%7C%51%79%20%46%37%4C%5A%7C%2C%37%4' \
+          '1%2C%68%45%73%20%37%5E%46%5A%4C%62%37%45%20%37%2D%62%42%7C%51%79%58%37%5E%62%42%6C%44%2D%37%58%37%2D%4' \
+          '3%42%2A%44%20%37%2D%41%2D%37%58%79%51%44%5A%4C%2C%39%62%37%41%20%37%68%45%6C%7C%79%51%58%37%5E%46%41%2' \
+          'A%5B%5D%51%79%58%37%43%7C%37%58%79%51%7C%47%7C%51%79%58%37%4C%5A%6C%47%37%58%79%51%7C%47%2D%37%20%43%3' \
+          '7%4C%5A%46%5E%37%20%42%62%37%4C%5A%46%36%58%79%51%5A%20==%30=%30===' \
+          'Caf%C3%A9=Composer==Swing=C==1r34LbKcu7[T44C^7 |A-7 |D-7 |G7 Z==0=0==='
+    expected = [(tune.title, tune.measures_as_strings) for tune in Tune.parse_ireal_url(url)]
+    assert expected[1][0] == 'Café'
+
+    html = '<html><a href="' + url + '">Playlist</a>\n</html>'
+    for stream in (io.StringIO(url), io.BytesIO(html.encode()), io.StringIO(html + '\n')):
+        for chunk_size in (1, 2, 7, 65536):
+            stream.seek(0)
+            tunes = [(tune.title, tune.measures_as_strings) for tune in Tune.iter_ireal(stream, chunk_size)]
+            assert tunes == expected
+
+
+def test_lazy():
+    from pyRealParser.pyRealParser import Tune
+    song = 'Test=McTest Testy==Up Tempo Swing=Eb==1r34LbKcu7*A[T34Eb^7 |C-7 |F-7 |Bb7 Z==0=0'
+    eager = Tune(song)
+    lazy = Tune(song, lazy=True)
+    assert (lazy.title, lazy.composer, lazy.style, lazy.key) == ('Test', 'McTest Testy', 'Up Tempo Swing', 'Eb')
+    assert 'measures_as_strings' not in vars(lazy) and 'raw_chord_string' not in vars(lazy)
+    assert lazy.measures_as_strings == eager.measures_as_strings
+    assert lazy.time_signature == eager.time_signature == (3, 4)
+    assert lazy.chord_string == eager.chord_string
+    assert lazy.raw_chord_string == eager.raw_chord_string
+
+
+def test_tune_cache(tmp_path):
+    import pickle
+    from pyRealParser.pyRealParser import Tune
+    from pyRealParser.cache import TuneCache
+    songs = ['Song {}=Composer==Swing=C==1r34LbKcu7[T44C^7 |A-7 |D-{} |G7 Z==0=0'.format(i, i) for i in range(3)]
+
+    cache = TuneCache(maxsize=2)
+    assert cache.parse(songs[0]).measures_as_strings == Tune(songs[0]).measures_as_strings
+    assert cache.parse(songs[0]) is cache.parse(songs[0])
+    cache.parse(songs[1])
+    cache.parse(songs[2])
+    assert songs[0] not in cache and songs[2] in cache and len(cache) == 2
+    assert (cache.hits, cache.misses) == (2, 3)
+
+    path = str(tmp_path / 'tunes.sqlite')
+    cache = TuneCache(path=path)
+    for song in songs:
+        cache.parse(song)
+    cache.close()
+    cache = TuneCache(path=path)
+    assert pickle.loads(cache.parse(songs[1], serialized=True)).title == 'Song 1'
+    assert (cache.hits, cache.misses, len(cache)) == (1, 0, 3)
+    cache.close()
+    # entries from a different version of the parser are not used, nor removed
+    cache = TuneCache(path=path, version='old')
+    assert len(cache) == 0 and songs[1] not in cache
+    cache.parse(songs[1])
+    assert (cache.hits, cache.misses) == (0, 1)
+    current = TuneCache(path=path)
+    assert len(current) == 3 and len(cache) == 1
+    current.clear()
+    assert len(current) == 0 and songs[1] in cache and songs[0] not in cache
+    current.parse(songs[0])
+    assert (current.hits, current.misses) == (0, 1) and songs[0] not in cache
+
+
+def test_parser_revision():
+    import hashlib
+    from pyRealParser.pyRealParser import Tune, PARSER_REVISION
+    # a digest of what the parser makes of these songs, for every revision: if this test fails, the output of the
+    # parser changed, so PARSER_REVISION has to be bumped (and the new digest added), or cached tunes go stale
+    digests = {3: '20c0a6cd521a1d3b9afe9247c3fbe60b41c308cc', 4: '20c0a6cd521a1d3b9afe9247c3fbe60b41c308cc'}
+    charts = ['*A{T44C^7 |SA-7 |N1D-7 G7 }|N2D-7 Db7 ]*B[F^7 |Bb7 Q]Y[QC6 Z',
+              '[T34C^7 |A-7 D7/F# |n |Bb7#11 Eb7 Ab7 Z', '{*AT44D- |Eh7 A7b9 |x |r| |G-7 p C7 |p p F^7 }',
+              '*i[T54Eb^7XyQKcl LZDh7XyQ|G7b9XyQ|(Ab7)C-7,XyQ Z', '[T44C |Q D |Q E |F Q|G Z',
+              '[T68<D.C. al Fine>C7sus |F6 ]{T22 W/C G/B |N1A-7 }|N2D7 Z']
+    songs = ['Song {}=Composer {}==Swing=Eb={}=1r34LbKcu7{}={}'.format(
+        number, number, '' if number % 3 else number - 2, Tune._unscramble_chord_string(chart),
+        ['', '=0=0', 'Jazz-Waltz=160=3'][number % 3]) for number, chart in enumerate(charts)]
+    output = [(tune.title, tune.composer, tune.style, tune.key, tune.transpose, tune.comp_style, tune.bpm,
+               tune.repeats, tune.time_signature, tune.chord_string, tune.measures_as_strings)
+              for tune in map(Tune, songs)]
+    digest = hashlib.sha1(repr(output).encode('utf-8')).hexdigest()
+    assert digests.get(PARSER_REVISION) == digest
+
+
+def test_compact_chords():
+    import pickle
+    import pytest
+    from pyRealParser.pyRealParser import Tune
+    from pyRealParser.compact import CompactChords, chord_vocabulary
+    song = 'Test=Composer==Swing=C==1r34LbKcu7*A[T34C^7 |A-7 D7/F# |n |Bb7#11 Eb7 Ab7 Z==0=0'
+    tune = Tune(song)
+    compact = Tune(song, compact=True)
+    assert 'measures_as_strings' not in vars(compact)
+    assert compact.compact_chords == tune.compact_chords
+    assert compact.measures_as_strings == tune.measures_as_strings == \
+        ['C^7', 'A-7 D7/F#', 'N.C.', 'Bb7#11 Eb7 Ab7']
+    chords = compact.compact_chords
+    assert list(chords.measures) == [0, 1, 1, 2, 3, 3, 3]
+    assert list(chords.beats) == [0, 0, 1, 0, 0, 1, 2]
+    d7 = chords.chords[2]
+    assert (chord_vocabulary.roots[d7], chord_vocabulary.qualities[d7], chord_vocabulary.basses[d7]) == \
+        ('D', '7', 'F#')
+    assert chord_vocabulary.roots[chords.chords[3]] is None
+    assert pickle.loads(pickle.dumps(chords)) == chords
+    assert CompactChords.from_measures(['', 'C', '']).measures_as_strings() == ['', 'C', '']
+
+    numpy = pytest.importorskip('numpy')
+    measures, beats, chord_ids = chords.to_numpy()
+    assert numpy.shares_memory(chord_ids, numpy.frombuffer(chords.chords, dtype=chord_ids.dtype))
+    assert list(numpy.bincount(measures)) == [1, 2, 1, 3]
+
+
+def test_form():
+    from pyRealParser.pyRealParser import Tune
+    chart = '*A{T44C^7 |SA-7 |N1D-7 G7 }|N2D-7 Db7 ]*B[F^7 |Bb7 Q]Y[QC6 Z'
+    tune = Tune('Test=Composer==Swing=C==1r34LbKcu7' + Tune._unscramble_chord_string(chart) + '==0=0')
+    form = tune.form
+    assert form.measures == ['C^7', 'A-7', 'D-7G7', 'D-7Db7', 'F^7', 'Bb7', 'C6']
+    assert form.sections == [(0, 'A'), (4, 'B')]
+    assert [(repeat.start, repeat.end, repeat.endings) for repeat in form.repeats] == [(0, 3, {1: 2, 2: 3})]
+    assert form.segno == (1, False)
+    assert form.codas == [(5, True), (6, False)]
+    # D.S. al Coda: from the segno to the first coda sign, then on to the coda
+    assert form.playback_order() == [0, 1, 2, 0, 1, 3, 4, 5, 1, 2, 0, 1, 3, 4, 5, 6]
+    assert tune.measures_as_strings[-3:] == ['F^7', 'Bb7', 'C6']
+    # simple repeats after a repeat with endings are played twice as well
+    assert Tune._get_measures('{C |N1D }|N2E ]{F |G }') == ['C', 'D', 'C', 'E', 'F', 'G', 'F', 'G']
+    # with more than two coda signs, the first one is where to jump from and the last one is the coda
+    assert Tune._get_measures('C |Q D |Q E |F Q|G ') == ['C', 'D', 'E', 'F', 'C', 'G']
+
+
+def test_profiler():
+    import json
+    import threading
+    import pytest
+    import pyRealParser.pyRealParser
+    import pyRealParser.form
+    from pyRealParser.pyRealParser import Tune
+    from pyRealParser.form import Form
+    from pyRealParser.profiling import Profiler
+    chart = '{*AT44C^7 |A-7 p |N1D-7 G7 }|N2D-7 Db7 Z'
+    song = 'Test=Composer==Swing=C==1r34LbKcu7' + Tune._unscramble_chord_string(chart) + '==0=0'
+    original = Tune.__dict__['_tokenize']
+    calls = []
+    with Profiler(callback=lambda stage, record: calls.append(stage)) as profiler:
+        tune = Tune(song)
+        Tune(song, lazy=True).measures_as_strings
+    assert Tune.__dict__['_tokenize'] is original
+    assert Tune(song).measures_as_strings == tune.measures_as_strings
+    assert profiler.stages['tokenize']['calls'] == 2
+    assert profiler.stages['tokenize']['regex_calls'] == 2
+    assert profiler.stages['unroll']['output_size'] == 2 * len(tune.measures_as_strings)
+    assert [t['title'] for t in profiler.tunes] == ['Test', 'Test']
+    assert 'slashes' in profiler.tunes[0]['stages'] and 'slashes' not in profiler.tunes[1]['stages']
+    assert calls.count('slashes') == 2
+    assert json.loads(profiler.to_json()) == profiler.as_dict()
+
+    # other threads are not measured
+    with Profiler() as profiler:
+        thread = threading.Thread(target=Tune, args=(song,))
+        thread.start()
+        thread.join()
+    assert profiler.stages == {} and profiler.tunes == []
+    # everything is put back when an exception leaves the with block
+    patched = [(Tune, '_tokenize'), (Tune, '__init__'), (Tune, '_url_regex'), (Form, '_flatten'),
+               (pyRealParser.pyRealParser, 're'), (pyRealParser.form, 're')]
+    originals = [owner.__dict__[attribute] for owner, attribute in patched]
+    with pytest.raises(ZeroDivisionError):
+        with Profiler():
+            1 / 0
+    assert [owner.__dict__[attribute] for owner, attribute in patched] == originals
+    assert Profiler._active is None
+
+
+def test_corpus(tmp_path):
+    import pytest
+    from pyRealParser.pyRealParser import Tune
+    from pyRealParser.corpus import Corpus
+    songs = ['Test=Composer==Swing=C==1r34LbKcu7' + Tune._unscramble_chord_string(chart) + '==0=0' for chart in
+             ['*A{T44C^7 |A-7 p |N1D-7 G7 }|N2D-7 Db7 Z', '[T34Bb7 |Eb^7 |n |x Z']]
+    tunes = [Tune(song) for song in songs]
+    path = str(tmp_path / 'tunes.irlc')
+    Tune.dump_corpus(tunes, path)
+    with Tune.load_corpus(path) as corpus:
+        assert isinstance(corpus, Corpus)
+        assert len(corpus) == 2
+        loaded = corpus[-1]
+        assert [tune.measures_as_strings for tune in corpus] == [tune.measures_as_strings for tune in tunes]
+    assert loaded.time_signature == (3, 4)
+    assert loaded.compact_chords == tunes[1].compact_chords
+    assert (loaded.title, loaded.transpose, loaded.comp_style) == (tunes[1].title, None, tunes[1].comp_style)
+    assert loaded.chord_string == tunes[1].chord_string
+
+    with open(path, 'rb') as file:
+        data = file.read()
+    # not a corpus, empty, cut off in the header, and cut off after it
+    for content in (b'not a corpus', b'', data[:10], data[:-1], data[:len(data) // 2]):
+        with open(path, 'wb') as file:
+            file.write(content)
+        with pytest.raises(RuntimeError):
+            Tune.load_corpus(path)
+
+
+def test_async():
+    import asyncio
+    import urllib.parse
+    from pyRealParser.pyRealParser import Tune, SongError
+    charts = ['[T44C^7 |A-7 |D-7 |G7 Z', '[T34Bb7 |Eb^7 |n |x Z', '{*AC |N1D }|N2E Z']
+    songs = ['Song {}=Composer==Swing=C==1r34LbKcu7{}==0=0'.format(number, Tune._unscramble_chord_string(chart))
+             for number, chart in enumerate(charts)] + ['Broken=Composer']
+    url = 'irealb://' + urllib.parse.quote('==='.join(songs))
+    expected = [Tune(song).measures_as_strings for song in songs[:-1]]
+
+    class Reader(object):
+        def __init__(self, data):
+            self.data = data
+            self.reads = 0
+
+        async def read(self, n):
+            self.reads += 1
+            chunk, self.data = self.data[:n], self.data[n:]
+            return chunk
+
+    async def main():
+        tunes = await Tune.aparse_ireal_url(url, concurrency=2)
+        assert [tune.measures_as_strings for tune in tunes[:-1]] == expected
+        assert isinstance(tunes[-1], SongError) and tunes[-1].title == 'Broken'
+
+        reader = Reader(('<a href="' + url + '">playlist</a>').encode())
+        streamed = [tune async for tune in Tune.aiter_ireal(reader, chunk_size=50)]
+        assert [tune.title for tune in streamed] == ['Song 0', 'Song 1', 'Song 2', 'Broken']
+
+        # only as much is read as is needed for the tunes that are consumed
+        reader = Reader(url.encode())
+        async for tune in Tune.aiter_ireal(reader, chunk_size=20, concurrency=1):
+            break
+        assert tune.title == 'Song 0'
+        assert reader.data
+
+    asyncio.run(main())
+
+
+def test_chords():
+    from pyRealParser.pyRealParser import Tune
+    from pyRealParser.chords import Chord, ChordTable, parse_chord, pitch_class, chord_qualities
+    assert parse_chord('F^7/A') == Chord('F^7/A', 'F', 'major7', (), (), 'A')
+    assert parse_chord('Eh7') is parse_chord('Eh7')
+    assert tuple(ChordTable.parse('Bb7b9#11'))[1:] == ('Bb', 'dominant7', (), ('b9', '#11'), None)
+    assert ChordTable.parse('C-7b5').quality == ChordTable.parse('Ch').quality == 'half-diminished7'
+    assert tuple(ChordTable.parse('F#-69'))[1:] == ('F#', 'minor', ('6', '9'), (), None)
+    assert tuple(ChordTable.parse('G7susadd3'))[1:] == ('G', 'suspended7', ('add3',), (), None)
+    assert ChordTable.parse('C+7').alterations == ('#5',)
+    assert ChordTable.parse('N.C.').root is None
+    assert set(ChordTable._qualities.values()) == set(chord_qualities)
+    assert [pitch_class(note) for note in ('C', 'Bb', 'F#', 'Cb', 'B#')] == [0, 10, 6, 11, 0]
+
+    chart = '[T44C7susA7b9 |n |F^7/A p Z'
+    tune = Tune('Test=Composer==Swing=C==1r34LbKcu7' + Tune._unscramble_chord_string(chart) + '==0=0')
+    assert [[str(chord) for chord in measure] for measure in tune.chords] == \
+        [['C7sus', 'A7b9'], ['N.C.'], ['F^7/A', 'F^7/A']]
+    assert tune.chords[0][1].alterations == ('b9',)
+
+
+def test_transpose(monkeypatch):
+    import sys
+    from pyRealParser.pyRealParser import Tune
+    from pyRealParser.transposition import transpose_key
+    tune = Tune('Test=Composer==Swing=C==1r34LbKcu7[T44C^7 F#-7b5 B7b9 |D-7/F G7 |Ab^7 Z==0=0')
+    assert tune.transposed('Eb').measures_as_strings() == ['Eb^7 A-7b5 D7b9', 'F-7/Ab Bb7', 'B^7']
+    assert tune.transposed('Gb').measures_as_strings() == ['Gb^7 C-7b5 F7b9', 'Ab-7/Cb Db7', 'D^7']
+    assert tune.transposed(-1).measures_as_strings() == ['B^7 F-7b5 A#7b9', 'C#-7/E F#7', 'G^7']
+    assert tune.transposed().measures_as_strings() == tune.measures_as_strings
+    assert transpose_key('C-', 6) == 'F#-'
+    assert transpose_key('C', 6) == 'Gb'
+
+    # the transpose field comes before the chords
+    transposed = Tune('Test=Composer==Swing=E-=2=1r34LbKcu7[T44E-7 A7 |C^7/G Z==0=0')
+    assert transposed.transpose == 2
+    assert transposed.transposed().measures_as_strings() == ['F#-7 B7', 'D^7/A']
+
+    tunes = [tune, transposed, Tune('Test=Composer==Swing=Bb-==1r34LbKcu7[T44n |Bb-7 Z==0=0')]
+    expected = [['F^7 B-7b5 E7b9', 'G-7/Bb C7', 'Db^7'], ['A-7 D7', 'F^7/C'], ['N.C.', 'Eb-7']]
+    assert [chords.measures_as_strings() for chords in Tune.transpose_many(tunes, 5)] == expected
+    monkeypatch.setitem(sys.modules, 'numpy', None)
+    assert [chords.measures_as_strings() for chords in Tune.transpose_many(tunes, 5)] == expected
+
+
+def test_tune_index(tmp_path):
+    import pytest
+    from pyRealParser.pyRealParser import Tune
+    from pyRealParser.index import TuneIndex
+    tunes = [Tune('Blue=Composer A==Bossa Nova=Db==1r34LbKcu7[T44Eb-7 |Ab7 |Db^7 |Eh7 A7b9 Z==0=0'),
+             Tune('Green=Composer B==Swing=C==1r34LbKcu7[T34D-7 G7 |C^7 |Eh7 A7b9 |D-7 Z==0=0'),
+             Tune('Red=Composer A==Swing=Db==1r34LbKcu7[T44Eb-7 Ab7 |Gb^7 |Db^7 Z==0=0')]
+    index = TuneIndex(tunes, n=2)
+    assert index.search(composer='Composer A') == [0, 2]
+    assert index.search(style='Swing', key='Db') == [2]
+    assert index.search(time_signature=(3, 4)) == [1]
+    assert index.search(chords='Eb-7 Ab7') == [0, 2]
+    assert index.search(chords=['Eb-7', 'Ab7', 'Db^7']) == [0]
+    assert index.search(chords='Ab7 Db^7 Eh7 A7b9') == [0]
+    assert index.search(measure='Eh7 A7b9') == [0, 1]
+    assert index.search(measure='Eh7 A7b9', composer='Composer B') == [1]
+    assert index.search(chords='Bb7') == []
+
+    index.remove(0)
+    assert index.search(chords='Eb-7 Ab7') == [2]
+    assert index.add(tunes[0]) == 3
+    assert index.search(chords='Eb-7 Ab7 Db^7') == [3]
+    assert len(index) == 3
+
+    path = str(tmp_path / 'index.pickle')
+    index.save(path)
+    loaded = TuneIndex.load(path)
+    assert loaded.search(measure='Eh7 A7b9') == [1, 3]
+    assert loaded[3].title == 'Blue'
+    with pytest.raises(KeyError):
+        loaded[0]
+
+
+def test_similarity_index():
+    import pytest
+    pytest.importorskip('numpy')
+    from pyRealParser.pyRealParser import Tune
+    from pyRealParser.similarity import SimilarityIndex
+
+    def song(title, key, chart):
+        scrambled = Tune._unscramble_chord_string('[T44{} Z'.format(chart))
+        return Tune('{}=Composer==Swing={}==1r34LbKcu7{}==0=0'.format(title, key, scrambled))
+    tunes = [song('Rhythm', 'Bb', 'Bb^7 G7 |C-7 F7 |D-7 G7 |C-7 F7 |F-7 Bb7 |Eb^7 Ab7 |D-7 G7 |C-7 F7 |D7 |x |G7 |x '
+                                  '|C7 |x |F7 |x'),
+             song('Blues', 'F', 'F7 |Bb7 |F7 |x |Bb7 |x |F7 |D7 |G-7 |C7 |F7 D7 |G-7 C7'),
+             song('Cycle', 'C', 'C^7 |A-7 |D-7 |G7 |E-7 |A7 |D-7 |G7'),
+             song('Rhythm in F', 'F', 'F^7 D7 |G-7 C7 |A-7 D7 |G-7 C7 |C-7 F7 |Bb^7 Eb7 |A-7 D7 |G-7 C7 |A7 |x |D7 '
+                                      '|x |G7 |x |C7 |x'),
+             song('Blues in C', 'C', 'C7 |F7 |C7 |x |F7 |x |C7 |A7 |D-7 |G7 |C7 A7 |D-7 G7')]
+    index = SimilarityIndex(tunes, dim=256)
+    assert index.vectors.shape == (5, 256)
+    assert tunes[0].measures_as_strings[9] == 'D7'
+    # the same changes in another key have the same vector
+    assert index.most_similar(0, k=1) == [(3, pytest.approx(1.0))]
+    assert index.most_similar(4, k=1) == [(1, pytest.approx(1.0))]
+    assert index.most_similar(2, k=1)[0][1] < 0.9
+    assert [position for position, _ in index.most_similar(2, k=4)] == [position for position, _ in
+                                                                       index.most_similar(tunes[2], k=5)][1:]
+    positions, similarities = index.nearest(index.vectors, k=2, block_size=2)
+    assert set(positions[0]) == set(positions[3]) == {0, 3}
+    assert set(positions[1]) == set(positions[4]) == {1, 4}
+    assert positions[2, 0] == 2
+    assert (similarities[:, 0] >= similarities[:, 1]).all()
+    # the positions that nearest returns are NumPy integers
+    assert index.most_similar(positions[0, 0], k=1) == index.most_similar(0, k=1)
+
+
+def test_lazy_imports():
+    import os
+    import subprocess
+    import sys
+    code = ('import sys, pyRealParser\n'
+            'assert not {"asyncio", "concurrent.futures", "sqlite3", "mmap", "logging"} & set(sys.modules)\n'
+            'assert pyRealParser.TuneCache.__module__ == "pyRealParser.cache" and "sqlite3" in sys.modules\n'
+            'from pyRealParser import *\n'
+            'assert TuneIndex and Corpus\n')
+    subprocess.run([sys.executable, '-c', code], check=True, cwd=os.path.join(os.path.dirname(__file__), '..'))
+
+
+def test_chart_editor():
+    from pyRealParser.pyRealParser import Tune
+    from pyRealParser.editing import ChartEditor
+
+    def song(chart):
+        return '{}=Composer==Swing=C==1r34LbKcu7{}==0=0'.format(chart[:10], Tune._unscramble_chord_string(chart))
+    chart = '*A{T44C^7 |A-7 |D-7 |G7 |N1E-7 A7 |D-7 G7 }|N2C^7 |x ]*B[F^7 |p |r|D-7 G7 Z'
+    tune = Tune(song(chart))
+    editor = ChartEditor(tune)
+    assert editor.measure_text(1) == 'A-7'
+    # the measures are played twice, so both times change
+    assert editor.replace_measures(1, 3, 'A7b9 |D-7 p G7') == (1, 9)
+    assert tune.measures_as_strings[7:9] == ['A7b9', 'D-7 D-7 G7']
+    changed = '*A{T44C^7 |A7b9 |D-7 p G7 |G7 |N1E-7 A7 |D-7 G7 }|N2C^7 |x ]*B[F^7 |p |r|D-7 G7 Z'
+    assert tune.raw_chord_string == changed
+    assert tune.measures_as_strings == Tune(song(changed)).measures_as_strings
+    assert tune.chord_string == Tune(song(changed)).chord_string
+    assert tune.form.measures == Tune(song(changed)).form.measures
+    assert editor.replace_measures(8, 9, 'C7') == (12, 16)
+    assert tune.measures_as_strings[12:16] == ['C7', 'C7', 'C7', 'C7']
+    assert tune.compact_chords.measures_as_strings() == tune.measures_as_strings
+    # a change of the form parses the chart again
+    editor.replace_section(1, 'Bb7 |Eb^7')
+    changed = '*A{T44C^7 |A7b9 |D-7 p G7 |G7 |N1E-7 A7 |D-7 G7 }|N2C^7 |x ]*B[Bb7 |Eb^7 Z'
+    assert tune.raw_chord_string == changed
+    assert tune.measures_as_strings == Tune(song(changed)).measures_as_strings
+    assert editor.replace_measures(9, 10, 'F7') == (13, 14)
+    assert tune.measures_as_strings[12:] == ['Bb7', 'F7']
+    # the scrambled chords are made again from the edited chart
+    assert Tune(tune.to_song()).measures_as_strings == tune.measures_as_strings
+
+    # a one-measure repeat after a two-measure repeat becomes two measures, which moves the measures after it
+    tune = Tune(song('[T44C7 |D7 |r |x |E7 |F7 Z'))
+    editor = ChartEditor(tune)
+    for index, text in ((3, 'G7'), (4, 'x'), (3, 'x'), (4, 'A7'), (5, 'x')):
+        editor.replace_measures(index, index + 1, text)
+        assert tune.measures_as_strings == Tune(song(tune.raw_chord_string)).measures_as_strings
+
+
+def test_timelines():
+    import io
+    import struct
+    import pytest
+    pytest.importorskip('numpy')
+    from pyRealParser.pyRealParser import Tune
+    from pyRealParser.compact import chord_vocabulary
+    from pyRealParser.timeline import timeline, timelines, chord_notes, MidiWriter
+
+    def song(chart, bpm):
+        return 'X=Composer==Swing=C==1r34LbKcu7{}=Medium Swing={}=0'.format(Tune._unscramble_chord_string(chart), bpm)
+    waltz = Tune(song('*A[T34C^7 |D-7 G7 |r|*B[F^7 |x |E-7 A7 Z', '90'))
+    events = timeline(waltz)
+    assert [chord_vocabulary.symbols[chord_id] for chord_id in events['chord']] == \
+        ['C^7', 'D-7', 'G7', 'C^7', 'D-7', 'G7', 'F^7', 'F^7', 'E-7', 'A7']
+    assert events['onset'].tolist() == [0, 3, 4, 6, 9, 10, 12, 15, 18, 19]
+    assert events['duration'].tolist() == [3, 1, 2, 3, 1, 2, 3, 3, 1, 2]
+    assert events['onset_seconds'][3] == pytest.approx(4.0)
+    assert ''.join(events['section']) == 'AAAAAABBBB'
+    blues = Tune(song('[T44F7 |Bb7 |F7 |x Z', '0'))
+    both = timelines([waltz, blues], bpm=60)
+    assert both['tune'].tolist() == [0] * 10 + [1] * 4
+    assert both['duration_seconds'][10:].tolist() == [4, 4, 4, 4]
+    assert set(both['section'][10:]) == {''}
+    assert chord_notes('C^7') == (48, 60, 64, 67, 71)
+    assert chord_notes('F7b9/A') == (57, 65, 69, 72, 75, 78)
+    assert chord_notes('N.C.') == ()
+
+    file = io.BytesIO()
+    with MidiWriter(file) as writer:
+        writer.write_tune(waltz)
+        writer.write_tune(blues)
+    data = file.getvalue()
+    assert struct.unpack('>4sIHHH', data[:14]) == (b'MThd', 6, 1, 2, 480)
+    position = 14
+    for _ in range(2):
+        chunk, length = struct.unpack('>4sI', data[position:position + 8])
+        assert chunk == b'MTrk' and data[position + 8 + length - 3:position + 8 + length] == b'\xff\x2f\x00'
+        position += 8 + length
+    assert position == len(data)
+
+
+def test_parse_report(capsys, caplog):
+    import io
+    import logging
+    import urllib.parse
+    import pytest
+    from pyRealParser.pyRealParser import Tune, SongError, SongParseError, ParseReport
+    charts = ['[T44C^7 |A-7 |D-7 |G7 Z', '[C7 |(p Z', '[T34Bb7 |Eb^7 |n |x Z']
+    songs = ['Song {}=Composer==Swing=C==1r34LbKcu7{}==0=0'.format(number, Tune._unscramble_chord_string(chart))
+             for number, chart in enumerate(charts)]
+    songs.insert(2, 'Broken=Composer')
+    url = 'irealb://' + urllib.parse.quote('==='.join(songs + ['My Playlist']))
+    decoded = urllib.parse.unquote(url)
+
+    report = ParseReport(slowest=2)
+    with caplog.at_level(logging.WARNING, logger='pyRealParser'):
+        tunes = Tune.parse_ireal_url(url, report=report)
+    assert [tune.title for tune in tunes] == ['Song 0', 'Song 2']
+    # failures are logged instead of printed, and the playlist name is not a song
+    assert capsys.readouterr().out == ''
+    errors = [record.song_error for record in caplog.records]
+    assert [(error.title, error.stage, error.error_class) for error in errors] == \
+        [('Song 1', 'slashes', 'IndexError'), ('Broken', 'fields', 'ValueError')]
+    assert [decoded[error.offset:error.offset + len(error.song)] for error in errors] == [songs[1], songs[2]]
+    assert (report.songs, report.parsed, report.failed) == (4, 2, 2)
+    assert report.stages == {'slashes': 1, 'fields': 1}
+    assert len(report.slowest) == 2 and report.slowest[0][1] >= report.slowest[1][1]
+    assert report.as_dict()['errors'] == {'IndexError': 1, 'ValueError': 1}
+    assert '4 songs, 2 parsed, 2 failed' in str(report)
+
+    with pytest.raises(SongParseError) as info:
+        Tune.parse_ireal_url(url, strict=True)
+    assert info.value.song_error.stage == 'slashes' and isinstance(info.value.__cause__, IndexError)
+
+    streamed = list(Tune.iter_ireal(io.StringIO(url), chunk_size=7))
+    assert [type(result) for result in streamed] == [Tune, SongError, SongError, Tune]
+    assert [result.offset for result in streamed[1:3]] == [error.offset for error in errors]
+    with pytest.raises(SongParseError):
+        list(Tune.iter_ireal(io.StringIO(url), strict=True))
+    report = ParseReport()
+    results = Tune.parse_many([url, songs[2]], workers=2, chunksize=1, report=report)
+    assert [bool(result) for result in results] == [True, False, False, True, False]
+    assert results[4].offset is None and report.stages == {'slashes': 1, 'fields': 2}
+
+
+def test_to_ireal_url():
+    import io
+    import urllib.parse
+    from pyRealParser import Tune, ChartEditor
+    charts = ['[T44C^7 |A-7 |D-7 |G7 Z', '{*AT34Bb7 |Eb^7 |n |x }', '[T44D-7 G7 |C^7 |r| Z']
+    songs = ['Song 0=Composer==Swing=C==1r34LbKcu7{}==0=0'.format(Tune._unscramble_chord_string(charts[0])),
+             'Café / 2=Composer==Waltz=Bb=2=1r34LbKcu7{}=Jazz-Waltz=160=3'.format(
+                 Tune._unscramble_chord_string(charts[1] * 20)),
+             'Song 2=Composer==Bossa=C==1r34LbKcu7{}'.format(Tune._unscramble_chord_string(charts[2] * 3))]
+    tunes = [Tune(song) for song in songs]
+    # the fields after the chords are read by their position
+    assert [(tune.comp_style, tune.bpm, tune.repeats) for tune in tunes] == \
+        [(None, '0', '0'), ('Jazz-Waltz', '160', '3'), (None, None, None)]
+    assert [tune.to_song() for tune in tunes] == songs
+
+    url = Tune.to_ireal_url(tunes, 'My Playlist')
+    assert urllib.parse.unquote(url) == 'irealb://' + '==='.join(songs + ['My Playlist'])
+    assert url.startswith('irealb://Song%200=Composer==Swing=C==1r34LbKcu7') and 'Caf%C3%A9%20%2F%202=' in url
+
+    # a url from the iReal app comes out byte for byte
+    fixture = 'irealb://Test=McTest%20Testy==Up%20Tempo%20Swing=Eb==1r34LbKcu7X7bB%7C4Eb%5E7FZL5%237C%209bB' + \
+              '%7CQy1X1-F%7CQyX7-C%7CQyX-7XyQ4TA%2A%7Bb7C%7CQ7%20B7L7-G%7CQyX7oA%7CQyX%5E7bAZL5b7A%207-bBZ%' + \
+              '2FBbXy-C%7CQy%20QyXQY%7CF-77bB%207-FZL7bG%207G-1N%7CQyX%2C7bB%7CQyX%2C%20%7DXy%7CQyX9EZL6-b6' + \
+              'XyQ%7Cr%20ZL%20%7Cr%20ZL%2C7bZEL7-bBB%2A%5B%5D%20%20lcK%20LZBbE2NZL%20dr3%20b%5E7LZ%2ED<%2C7' + \
+              'FZLxZLxZL%5E7bAl%7C%2C7bE%2C7-bBsC%2E%20alAZL7bEnd%2E>LZBb7sus%2CLZBb7%20%5DXyQXyQ%20%20Y%7C' + \
+              'N3Eb6XyQ%7CBb7XyQZ%20==0=0==='
+    assert Tune.to_ireal_url(Tune.parse_ireal_url(fixture), '') == fixture
+    assert [tune.to_song() for tune in Tune.parse_ireal_url(url)] == songs
+    for stream in (io.StringIO(), io.BytesIO()):
+        assert Tune.write_ireal(stream, iter(tunes), 'My Playlist') == 3
+        written = stream.getvalue()
+        assert (written if isinstance(written, str) else written.decode()) == url
+        stream.seek(0)
+        assert [tune.to_song() for tune in Tune.iter_ireal(stream, chunk_size=5)] == songs
+
+    # edited tunes are scrambled again
+    ChartEditor(tunes[1]).replace_measures(0, 2, 'F7 |Bb^7')
+    edited = Tune(tunes[1].to_song())
+    assert edited.raw_chord_string == tunes[1].raw_chord_string
+    assert edited.measures_as_strings == tunes[1].measures_as_strings
+    assert (edited.transpose, edited.bpm) == (2, '160')